@@ -0,0 +1,3 @@
+"""
+Suite de benchmarks offline con dobles en proceso de Bedrock, Knowledge Base y S3
+"""
@@ -0,0 +1,208 @@
+"""
+Perfil de tiempo de importación (cold start) de los paquetes Lambda
+
+Lanza un intérprete nuevo por repetición con `python -X importtime`, descuenta
+los módulos que el intérprete ya carga al arrancar y reporta el tiempo de
+importación de cada punto de entrada junto con los módulos más costosos.
+El resultado se guarda en el mismo formato que benchmarks.harness, así que
+puede compararse con benchmarks.compare.
+
+Ejemplo:
+    python -m benchmarks.cold_start --repeat 10
+    python -m benchmarks.cold_start --target rag_handler --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .fakes import ROOT_DIR
+from .harness import RESULTS_DIR, current_git_commit, save_result
+from .stats import percentile, summarize
+
+INCIDENT_ANALYZER_DIR = ROOT_DIR / "src" / "incident_analyzer"
+# El analizador recibe src/shared como paquete "shared" desde su capa Lambda
+INCIDENT_ANALYZER_PATH = (INCIDENT_ANALYZER_DIR, ROOT_DIR / "src")
+
+# Punto de entrada -> (módulo a importar, directorios añadidos a PYTHONPATH)
+TARGETS: Dict[str, Tuple[str, Tuple[Path, ...]]] = {
+    "rag_handler": ("src.lambda.handler", (ROOT_DIR,)),
+    "incident_handler": ("lambda_handler", INCIDENT_ANALYZER_PATH),
+    "incident_health": ("health", INCIDENT_ANALYZER_PATH),
+    "rag_health": ("src.lambda.health", (ROOT_DIR,)),
+    "document_processor": ("src.shared.document_processor", (ROOT_DIR,)),
+    "cli": ("src.cli.main", (ROOT_DIR,))
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Interpreta la salida de -X importtime
+    
+    Args:
+        stderr: Salida de error del intérprete
+    
+    Returns:
+        Lista de (módulo, self_us, cumulative_us, nivel_de_anidamiento)
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def _run_importtime(code: str, pythonpath: Sequence[Path] = ()) -> str:
+    env = dict(os.environ)
+    if pythonpath:
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [*map(str, pythonpath), env.get("PYTHONPATH")]))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        last_line = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else ""
+        raise RuntimeError(f"La importación falló: {last_line}")
+    return completed.stderr
+
+
+def startup_modules() -> set:
+    """Módulos que el intérprete importa antes de ejecutar cualquier código"""
+    return {name for name, _, _, _ in parse_importtime(_run_importtime("pass"))}
+
+
+def profile_target(module: str, pythonpath: Sequence[Path], baseline: set) -> Tuple[float, Dict[str, float], List[Tuple[str, int, int, int]]]:
+    """
+    Mide la importación de un módulo en un intérprete nuevo
+    
+    Args:
+        module: Módulo a importar
+        pythonpath: Directorios raíz de imports del paquete
+        baseline: Módulos de arranque que se descuentan
+    
+    Returns:
+        Tupla (tiempo_total_ms, {módulo_de_primer_nivel: cumulative_ms}, entradas de importtime)
+    """
+    code = f"import importlib; importlib.import_module({module!r})"
+    entries = parse_importtime(_run_importtime(code, pythonpath))
+    
+    top_level = {
+        name: cumulative_us / 1000
+        for name, _, cumulative_us, depth in entries
+        if depth == 0 and name not in baseline and name != "importlib"
+    }
+    return sum(top_level.values()), top_level, entries
+
+
+def heaviest_modules(entries: List[Tuple[str, int, int, int]], baseline: set, top: int) -> List[Dict[str, float]]:
+    """
+    Lista los módulos con mayor tiempo propio de importación
+    
+    Args:
+        entries: Entradas de importtime de una ejecución
+        baseline: Módulos de arranque que se descuentan
+        top: Número de módulos a devolver
+    
+    Returns:
+        Módulos ordenados por tiempo propio (self) descendente
+    """
+    ranked = sorted(
+        (entry for entry in entries if entry[0] not in baseline),
+        key=lambda entry: entry[1],
+        reverse=True
+    )
+    return [
+        {"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cumulative_us / 1000, 2)}
+        for name, self_us, cumulative_us, _ in ranked[:top]
+    ]
+
+
+def run_cold_start(target: str, repeat: int = 5, top: int = 10) -> Dict[str, object]:
+    """
+    Perfila el cold start de un punto de entrada
+    
+    Args:
+        target: Nombre del punto de entrada (ver TARGETS)
+        repeat: Intérpretes nuevos a lanzar
+        top: Módulos más costosos a reportar
+    
+    Returns:
+        Resultado serializable compatible con benchmarks.compare
+    """
+    module, pythonpath = TARGETS[target]
+    baseline = startup_modules()
+    
+    samples = []
+    breakdown: Dict[str, List[float]] = {}
+    entries: List[Tuple[str, int, int, int]] = []
+    for _ in range(repeat):
+        total_ms, top_level, entries = profile_target(module, pythonpath, baseline)
+        samples.append(total_ms)
+        for name, cumulative_ms in top_level.items():
+            breakdown.setdefault(name, []).append(cumulative_ms)
+    
+    return {
+        "benchmark": f"cold_start-{target}",
+        "timestamp": datetime.now().astimezone().isoformat(),
+        "git_commit": current_git_commit(),
+        "config": {"module": module, "repeat": repeat, "python": sys.version.split()[0]},
+        "iterations": repeat,
+        "errors": 0,
+        "latency_ms": summarize(samples),
+        "stages_ms": {
+            name: summarize(values)
+            for name, values in sorted(breakdown.items(), key=lambda item: -percentile(item[1], 50))
+        },
+        "heaviest_modules": heaviest_modules(entries, baseline, top),
+        "samples_ms": [round(value, 3) for value in samples]
+    }
+
+
+def print_report(result: Dict[str, object]) -> None:
+    """Muestra el perfil de importación"""
+    latency = result["latency_ms"]
+    print("=" * 80)
+    print(f"COLD START - {result['config']['module']}")
+    print("=" * 80)
+    print(f"Importación p50: {latency['p50']:.1f} ms | max: {latency['max']:.1f} ms ({result['iterations']} intérpretes)")
+    print()
+    print(f"{'Módulo (self)':<50}{'self (ms)':>12}{'cum. (ms)':>12}")
+    for entry in result["heaviest_modules"]:
+        print(f"{entry['module']:<50}{entry['self_ms']:>12.1f}{entry['cumulative_ms']:>12.1f}")
+    print("=" * 80)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Perfil de importación (cold start) con -X importtime")
+    parser.add_argument("--target", "-t", action="append", choices=sorted(TARGETS),
+                        help="Punto de entrada (repetible; por defecto todos)")
+    parser.add_argument("--repeat", "-n", type=int, default=5, help="Intérpretes nuevos por punto de entrada")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más costosos a mostrar")
+    parser.add_argument("--output-dir", type=Path, default=RESULTS_DIR, help="Directorio de resultados")
+    args = parser.parse_args(argv)
+    
+    exit_code = 0
+    for target in args.target or sorted(TARGETS):
+        try:
+            result = run_cold_start(target, repeat=args.repeat, top=args.top)
+        except RuntimeError as e:
+            print(f"Error perfilando {target}: {str(e)}", file=sys.stderr)
+            exit_code = 2
+            continue
+        
+        print_report(result)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = save_result(result, args.output_dir / f"cold_start-{target}-{stamp}.json")
+        print(f"Resultado guardado en {path}\n")
+    
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Comparación de ejecuciones de benchmark con umbral de regresión
+
+Carga dos ficheros de resultados (benchmarks.harness o benchmarks.loadgen),
+calcula intervalos de confianza bootstrap del cambio relativo de p50/p95 y
+termina con código distinto de cero si la regresión supera el umbral con la
+confianza indicada.
+
+Códigos de salida:
+    0  Sin regresión significativa
+    1  Regresión por encima del umbral
+    2  Ficheros inválidos o sin muestras suficientes
+
+Ejemplo:
+    python -m benchmarks.compare benchmarks/results/analyzer-base.json benchmarks/results/analyzer-fase2.json \\
+        --threshold 10 --metric p50 --metric p95
+"""
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .stats import bootstrap_percentile_change, percentile
+
+MIN_SAMPLES = 20
+
+METRIC_PERCENTILES = {
+    "p50": 50.0,
+    "p90": 90.0,
+    "p95": 95.0,
+    "p99": 99.0
+}
+
+
+def load_result(path: Path) -> Dict[str, Any]:
+    """
+    Carga un fichero de resultados y valida que contiene muestras
+    
+    Args:
+        path: Ruta al fichero JSON
+    
+    Returns:
+        Resultado del benchmark
+    
+    Raises:
+        ValueError: Si el fichero no contiene muestras de latencia
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    
+    if not result.get("samples_ms"):
+        raise ValueError(f"{path} no contiene muestras de latencia (samples_ms)")
+    
+    return result
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    metrics: List[str],
+    threshold_pct: float,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Compara dos ejecuciones métrica a métrica
+    
+    Una métrica es regresión cuando el límite inferior del intervalo de
+    confianza del cambio relativo supera el umbral, es decir, cuando el
+    empeoramiento es mayor que el umbral con la confianza pedida.
+    
+    Args:
+        baseline: Resultado de referencia
+        candidate: Resultado a evaluar
+        metrics: Métricas a comparar (p50, p90, p95, p99)
+        threshold_pct: Empeoramiento máximo tolerado en porcentaje
+        resamples: Réplicas bootstrap
+        confidence: Nivel de confianza
+        seed: Semilla para resultados reproducibles
+    
+    Returns:
+        Informe con el veredicto de cada métrica y el global
+    """
+    rng = random.Random(seed)
+    base_samples = baseline["samples_ms"]
+    candidate_samples = candidate["samples_ms"]
+    threshold = threshold_pct / 100
+    
+    report: Dict[str, Any] = {
+        "baseline": {"benchmark": baseline.get("benchmark"), "git_commit": baseline.get("git_commit"),
+                     "samples": len(base_samples)},
+        "candidate": {"benchmark": candidate.get("benchmark"), "git_commit": candidate.get("git_commit"),
+                      "samples": len(candidate_samples)},
+        "threshold_pct": threshold_pct,
+        "confidence": confidence,
+        "metrics": {},
+        "regression": False
+    }
+    
+    for metric in metrics:
+        pct = METRIC_PERCENTILES[metric]
+        observed, lower, upper = bootstrap_percentile_change(
+            base_samples, candidate_samples, pct,
+            resamples=resamples, confidence=confidence, rng=rng
+        )
+        
+        if lower > threshold:
+            verdict = "regression"
+        elif upper < 0:
+            verdict = "improvement"
+        elif observed > threshold:
+            verdict = "inconclusive"
+        else:
+            verdict = "no_change"
+        
+        report["metrics"][metric] = {
+            "baseline_ms": round(percentile(base_samples, pct), 2),
+            "candidate_ms": round(percentile(candidate_samples, pct), 2),
+            "change_pct": round(observed * 100, 2),
+            "ci_low_pct": round(lower * 100, 2),
+            "ci_high_pct": round(upper * 100, 2),
+            "verdict": verdict
+        }
+        report["regression"] = report["regression"] or verdict == "regression"
+    
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Muestra la comparación en formato tabla"""
+    confidence = int(report["confidence"] * 100)
+    print("=" * 80)
+    print("COMPARACIÓN DE BENCHMARKS")
+    print("=" * 80)
+    print(f"Referencia: {report['baseline']['benchmark']} @ {report['baseline']['git_commit']} "
+          f"({report['baseline']['samples']} muestras)")
+    print(f"Candidato:  {report['candidate']['benchmark']} @ {report['candidate']['git_commit']} "
+          f"({report['candidate']['samples']} muestras)")
+    print(f"Umbral de regresión: +{report['threshold_pct']:.1f}% (IC {confidence}%)")
+    print()
+    print(f"{'Métrica':<8}{'Base (ms)':>12}{'Cand. (ms)':>12}{'Cambio':>10}{'IC':>22}  Veredicto")
+    for metric, data in report["metrics"].items():
+        interval = f"[{data['ci_low_pct']:+.1f}%, {data['ci_high_pct']:+.1f}%]"
+        print(f"{metric:<8}{data['baseline_ms']:>12.1f}{data['candidate_ms']:>12.1f}"
+              f"{data['change_pct']:>+9.1f}%{interval:>22}  {data['verdict']}")
+    print("=" * 80)
+    print("❌ Regresión detectada" if report["regression"] else "✅ Sin regresión significativa")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmark")
+    parser.add_argument("baseline", type=Path, help="Resultado de referencia (JSON)")
+    parser.add_argument("candidate", type=Path, help="Resultado a evaluar (JSON)")
+    parser.add_argument("--metric", "-m", action="append", choices=sorted(METRIC_PERCENTILES),
+                        help="Métrica a comparar (repetible; por defecto p50 y p95)")
+    parser.add_argument("--threshold", "-t", type=float, default=10.0,
+                        help="Empeoramiento máximo tolerado en porcentaje")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Nivel de confianza del intervalo")
+    parser.add_argument("--resamples", type=int, default=2000, help="Réplicas bootstrap")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES,
+                        help="Muestras mínimas exigidas en cada ejecución")
+    parser.add_argument("--json", dest="json_output", type=Path, default=None,
+                        help="Guardar el informe de comparación en JSON")
+    args = parser.parse_args(argv)
+    
+    try:
+        baseline = load_result(args.baseline)
+        candidate = load_result(args.candidate)
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+    
+    for name, result in (("referencia", baseline), ("candidato", candidate)):
+        if len(result["samples_ms"]) < args.min_samples:
+            print(f"Error: la ejecución de {name} tiene menos de {args.min_samples} muestras", file=sys.stderr)
+            return 2
+    
+    report = compare_results(
+        baseline,
+        candidate,
+        metrics=args.metric or ["p50", "p95"],
+        threshold_pct=args.threshold,
+        resamples=args.resamples,
+        confidence=args.confidence,
+        seed=args.seed
+    )
+    print_report(report)
+    
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    
+    return 1 if report["regression"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Dobles en proceso de Bedrock Runtime, Bedrock Agent Runtime (Knowledge Base) y S3
+
+Reproducen respuestas grabadas con latencias configurables para poder medir
+el código local sin depender de AWS.
+"""
+import io
+import json
+import math
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+RECORDINGS_DIR = Path(__file__).resolve().parent / "recordings"
+SAMPLE_METADATA_DIR = ROOT_DIR / "sample-data" / "incidents-metadata"
+
+# Caracteres por evento content_block_delta en las respuestas simuladas en streaming
+STREAM_CHUNK_CHARS = 40
+
+
+@dataclass
+class LatencyDistribution:
+    """Distribución de latencia en milisegundos"""
+    kind: str = "constant"
+    params: List[float] = field(default_factory=lambda: [0.0])
+    
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Crea una distribución a partir de una especificación textual
+        
+        Formatos soportados:
+            const:<ms>
+            uniform:<min_ms>:<max_ms>
+            normal:<media_ms>:<desviación_ms>
+            lognormal:<mediana_ms>:<sigma>
+        
+        Args:
+            spec: Especificación (ej: "lognormal:800:0.35")
+        
+        Returns:
+            Distribución de latencia
+        """
+        parts = spec.split(":")
+        kind = parts[0].lower()
+        expected = {"const": 1, "constant": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        
+        if kind not in expected:
+            raise ValueError(f"Distribución de latencia no soportada: {spec}")
+        
+        params = [float(value) for value in parts[1:]]
+        if len(params) != expected[kind]:
+            raise ValueError(f"Número de parámetros incorrecto para '{kind}': {spec}")
+        
+        return cls(kind="constant" if kind == "const" else kind, params=params)
+    
+    def sample(self, rng: random.Random) -> float:
+        """
+        Obtiene una muestra de latencia (nunca negativa)
+        
+        Args:
+            rng: Generador aleatorio a usar
+        
+        Returns:
+            Latencia en milisegundos
+        """
+        if self.kind == "constant":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            value = rng.gauss(self.params[0], self.params[1])
+        else:
+            value = rng.lognormvariate(math.log(max(self.params[0], 1e-9)), self.params[1])
+        return max(value, 0.0)
+    
+    def __str__(self) -> str:
+        return ":".join([self.kind] + [f"{value:g}" for value in self.params])
+
+
+@dataclass
+class FakeProfile:
+    """Perfil de latencias y velocidad de generación de los servicios simulados"""
+    kb_latency: LatencyDistribution = field(
+        default_factory=lambda: LatencyDistribution("lognormal", [450.0, 0.3])
+    )
+    s3_latency: LatencyDistribution = field(
+        default_factory=lambda: LatencyDistribution("lognormal", [35.0, 0.4])
+    )
+    bedrock_ttft: LatencyDistribution = field(
+        default_factory=lambda: LatencyDistribution("lognormal", [900.0, 0.35])
+    )
+    tokens_per_second: float = 60.0
+    # Factor de velocidad de los modelos rápidos (Haiku) respecto al resto
+    fast_model_speedup: float = 2.5
+    time_scale: float = 1.0
+    seed: Optional[int] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación serializable del perfil"""
+        return {
+            "kb_latency": str(self.kb_latency),
+            "s3_latency": str(self.s3_latency),
+            "bedrock_ttft": str(self.bedrock_ttft),
+            "tokens_per_second": self.tokens_per_second,
+            "fast_model_speedup": self.fast_model_speedup,
+            "time_scale": self.time_scale,
+            "seed": self.seed
+        }
+
+
+class FakeStreamingBody:
+    """Imita botocore.response.StreamingBody"""
+    
+    def __init__(self, payload: bytes):
+        self._stream = io.BytesIO(payload)
+    
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._stream.read(amt)
+    
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _FakeService:
+    """Base común: generador aleatorio propio y espera simulada"""
+    
+    def __init__(self, profile: FakeProfile, rng: random.Random):
+        self.profile = profile
+        self._rng = rng
+        self._lock = threading.Lock()
+        self.calls = 0
+    
+    def _sample(self, distribution: LatencyDistribution) -> float:
+        with self._lock:
+            self.calls += 1
+            return distribution.sample(self._rng)
+    
+    def _sleep_ms(self, milliseconds: float) -> None:
+        if milliseconds > 0 and self.profile.time_scale > 0:
+            time.sleep(milliseconds * self.profile.time_scale / 1000)
+
+
+class FakeBedrockRuntime(_FakeService):
+    """Cliente bedrock-runtime simulado que reproduce respuestas grabadas"""
+    
+    def __init__(self, profile: FakeProfile, rng: random.Random, recordings: Dict[str, List[Dict[str, Any]]]):
+        super().__init__(profile, rng)
+        self.recordings = recordings
+        self._cursors: Dict[str, int] = {}
+    
+    def _next_recording(self, kind: str) -> Dict[str, Any]:
+        responses = self.recordings[kind]
+        with self._lock:
+            index = self._cursors.get(kind, 0)
+            self._cursors[kind] = index + 1
+        return responses[index % len(responses)]
+    
+    def _speedup(self, model_id: str) -> float:
+        return self.profile.fast_model_speedup if "haiku" in model_id.lower() else 1.0
+    
+    @staticmethod
+    def _classify(body: Dict[str, Any]) -> str:
+        """Decide qué tipo de respuesta grabada corresponde a la petición"""
+        text = ""
+        for message in body.get("messages", []):
+            for item in message.get("content", []):
+                if item.get("type") == "text":
+                    text += item.get("text", "")
+        if "<user_query>" in text:
+            return "query_optimization"
+        if "confidence_score" in text:
+            return "incident_analysis"
+        return "rag_query"
+    
+    def invoke_model(self, modelId: str, body: Any, **kwargs) -> Dict[str, Any]:
+        """Simula InvokeModel: primer token + generación a la velocidad configurada"""
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode("utf-8")
+        if hasattr(body, "read"):
+            body = body.read()
+        request = json.loads(body)
+        
+        recording = self._next_recording(self._classify(request))
+        output_tokens = min(
+            recording.get("usage", {}).get("output_tokens", 0),
+            request.get("max_tokens", 4096)
+        )
+        
+        latency_ms = self._sample(self.profile.bedrock_ttft)
+        if self.profile.tokens_per_second > 0:
+            latency_ms += output_tokens / self.profile.tokens_per_second * 1000
+        self._sleep_ms(latency_ms / self._speedup(modelId))
+        
+        payload = json.dumps(dict(recording, model=modelId)).encode("utf-8")
+        return {
+            "body": FakeStreamingBody(payload),
+            "contentType": "application/json",
+            "ResponseMetadata": {"HTTPStatusCode": 200}
+        }
+    
+    def invoke_model_with_response_stream(self, modelId: str, body: Any, **kwargs) -> Dict[str, Any]:
+        """Simula InvokeModelWithResponseStream: los fragmentos llegan tras el primer token"""
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode("utf-8")
+        if hasattr(body, "read"):
+            body = body.read()
+        request = json.loads(body)
+        
+        recording = self._next_recording(self._classify(request))
+        usage = recording.get("usage", {})
+        output_tokens = min(usage.get("output_tokens", 0), request.get("max_tokens", 4096))
+        text = "".join(item.get("text", "") for item in recording.get("content", []) if item.get("type") == "text")
+        ttft_ms = self._sample(self.profile.bedrock_ttft)
+        
+        return {
+            "body": self._stream_events(modelId, recording, text, output_tokens, ttft_ms),
+            "contentType": "application/json",
+            "ResponseMetadata": {"HTTPStatusCode": 200}
+        }
+    
+    def _stream_events(
+        self,
+        model_id: str,
+        recording: Dict[str, Any],
+        text: str,
+        output_tokens: int,
+        ttft_ms: float
+    ) -> Iterator[Dict[str, Any]]:
+        """Eventos de Claude en streaming con la latencia repartida entre los fragmentos"""
+        def event(data: Dict[str, Any]) -> Dict[str, Any]:
+            return {"chunk": {"bytes": json.dumps(data).encode("utf-8")}}
+        
+        input_tokens = recording.get("usage", {}).get("input_tokens", 0)
+        speedup = self._speedup(model_id)
+        self._sleep_ms(ttft_ms / speedup)
+        yield event({
+            "type": "message_start",
+            "message": {"model": model_id, "role": "assistant", "usage": {"input_tokens": input_tokens}}
+        })
+        
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+        generation_ms = output_tokens / self.profile.tokens_per_second * 1000 if self.profile.tokens_per_second > 0 else 0.0
+        for chunk in chunks:
+            self._sleep_ms(generation_ms / speedup / len(chunks))
+            yield event({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}})
+        
+        yield event({
+            "type": "message_delta",
+            "delta": {"stop_reason": recording.get("stop_reason", "end_turn")},
+            "usage": {"output_tokens": output_tokens}
+        })
+        yield event({
+            "type": "message_stop",
+            "amazon-bedrock-invocationMetrics": {"inputTokenCount": input_tokens, "outputTokenCount": output_tokens}
+        })
+
+
+class FakeBedrockAgentRuntime(_FakeService):
+    """Cliente bedrock-agent-runtime simulado basado en sample-data"""
+    
+    def __init__(self, profile: FakeProfile, rng: random.Random, incidents: List[Dict[str, Any]]):
+        super().__init__(profile, rng)
+        self.incidents = incidents
+    
+    def retrieve(self, knowledgeBaseId: str, retrievalQuery: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Simula Retrieve devolviendo incidencias de ejemplo con scores decrecientes"""
+        configuration = kwargs.get("retrievalConfiguration", {}).get("vectorSearchConfiguration", {})
+        number_of_results = configuration.get("numberOfResults", 5)
+        
+        self._sleep_ms(self._sample(self.profile.kb_latency))
+        
+        with self._lock:
+            selected = self._rng.sample(self.incidents, min(number_of_results, len(self.incidents)))
+        
+        results = []
+        for position, incident in enumerate(selected):
+            results.append({
+                "content": {"text": incident.get("description", "")},
+                "score": round(0.92 - position * 0.07, 3),
+                "metadata": {key: value for key, value in incident.items() if key != "attachments_metadata"}
+            })
+        
+        return {"retrievalResults": results}
+
+
+class FakeS3(_FakeService):
+    """Cliente S3 simulado con los adjuntos de sample-data"""
+    
+    def __init__(self, profile: FakeProfile, rng: random.Random, incidents: List[Dict[str, Any]]):
+        super().__init__(profile, rng)
+        self.keys = [
+            f"incidents-files/{attachment['filename']}"
+            for incident in incidents
+            for attachment in incident.get("attachments_metadata", [])
+        ]
+    
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", **kwargs) -> Dict[str, Any]:
+        """Simula ListObjectsV2 filtrando por prefijo"""
+        self._sleep_ms(self._sample(self.profile.s3_latency))
+        contents = [{"Key": key, "Size": 0} for key in self.keys if key.startswith(Prefix)]
+        return {"Contents": contents, "KeyCount": len(contents)}
+
+
+def load_recordings(path: Optional[Path] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Carga las respuestas grabadas de Bedrock
+    
+    Args:
+        path: Fichero JSON con las grabaciones (por defecto, el incluido)
+    
+    Returns:
+        Respuestas agrupadas por tipo
+    """
+    path = path or RECORDINGS_DIR / "bedrock_responses.json"
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_sample_incidents(directory: Path = SAMPLE_METADATA_DIR) -> List[Dict[str, Any]]:
+    """
+    Carga los metadatos de incidencias de ejemplo
+    
+    Args:
+        directory: Directorio con ficheros *_metadata.json
+    
+    Returns:
+        Lista de incidencias
+    """
+    incidents = []
+    for metadata_file in sorted(directory.glob("*_metadata.json")):
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            incidents.append(json.load(f))
+    return incidents
+
+
+class FakeAWS:
+    """Fábrica de clientes AWS simulados que comparten perfil y semilla"""
+    
+    def __init__(self, profile: Optional[FakeProfile] = None, recordings_path: Optional[Path] = None):
+        self.profile = profile or FakeProfile()
+        rng = random.Random(self.profile.seed)
+        incidents = load_sample_incidents()
+        
+        self.bedrock_runtime = FakeBedrockRuntime(
+            self.profile, random.Random(rng.random()), load_recordings(recordings_path)
+        )
+        self.bedrock_agent_runtime = FakeBedrockAgentRuntime(
+            self.profile, random.Random(rng.random()), incidents
+        )
+        self.s3 = FakeS3(self.profile, random.Random(rng.random()), incidents)
+    
+    def client(self, service_name: str, *args, **kwargs) -> Any:
+        """Sustituto de boto3.client"""
+        services = {
+            "bedrock-runtime": self.bedrock_runtime,
+            "bedrock-agent-runtime": self.bedrock_agent_runtime,
+            "s3": self.s3
+        }
+        if service_name not in services:
+            raise ValueError(f"Servicio no simulado: {service_name}")
+        return services[service_name]
+    
+    def session(self, *args, **kwargs) -> Any:
+        """Sustituto de boto3.Session"""
+        return mock.Mock(client=self.client)
+    
+    @contextmanager
+    def patch_boto3(self) -> Iterator["FakeAWS"]:
+        """
+        Redirige boto3.client y boto3.Session a los servicios simulados
+        
+        Yields:
+            La propia fábrica, para inspeccionar contadores de llamadas
+        """
+        _clear_shared_clients()
+        try:
+            with mock.patch("boto3.client", self.client), mock.patch("boto3.Session", self.session):
+                yield self
+        finally:
+            # Los clientes compartidos creados durante el parche son dobles: no deben sobrevivirle
+            _clear_shared_clients()
+
+
+def _clear_shared_clients() -> None:
+    """Vacía la caché de clientes de aws_clients (importado como src.shared por la CLI y la Lambda RAG y como shared por el analizador)"""
+    for name in ("src.shared.aws_clients", "shared.aws_clients"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.clear_clients()
@@ -0,0 +1,371 @@
+"""
+Harness de benchmarks offline para IncidentAnalyzer y los handlers Lambda
+
+Ejecuta los escenarios contra los servicios simulados de benchmarks.fakes y
+guarda los resultados en JSON para poder comparar ejecuciones.
+
+Ejemplo:
+    python -m benchmarks.harness --scenario analyzer --iterations 50 --time-scale 0.05
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from .fakes import FakeAWS, FakeProfile, LatencyDistribution, ROOT_DIR
+from .stats import summarize
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+INCIDENT_DESCRIPTION = (
+    "El servidor de aplicaciones está consumiendo mucha CPU, alrededor del 95% constantemente. "
+    "La aplicación se pone muy lenta y algunos procesos se quedan colgados."
+)
+
+BENCHMARK_ENV = {
+    "KNOWLEDGE_BASE_ID": "BENCHKB0001",
+    "S3_BUCKET": "benchmark-incidents",
+    "AWS_REGION": "eu-west-1",
+    "LOG_LEVEL": "WARNING",
+    "ENABLE_STAGE_TIMINGS": "true"
+}
+
+
+@dataclass
+class Sample:
+    """Resultado de una invocación individual"""
+    latency_ms: float
+    ok: bool
+    stages_ms: Dict[str, float] = field(default_factory=dict)
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+def _import_incident_analyzer_module(name: str) -> Any:
+    """Importa un módulo del paquete Lambda de incidencias (imports planos, shared como en su capa)"""
+    for package_dir in (str(ROOT_DIR / "src"), str(ROOT_DIR / "src" / "incident_analyzer")):
+        if package_dir not in sys.path:
+            sys.path.insert(0, package_dir)
+    return importlib.import_module(name)
+
+
+def _import_rag_handler() -> Any:
+    """Importa el handler de la Lambda RAG (paquete src.lambda)"""
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    return importlib.import_module("src.lambda.handler")
+
+
+class _FakeLambdaContext:
+    """Contexto mínimo de Lambda para invocar los handlers"""
+    function_name = "benchmark"
+    aws_request_id = "benchmark-request"
+    
+    def get_remaining_time_in_millis(self) -> int:
+        return 300000
+
+
+def _analyzer_scenario() -> Callable[[], Sample]:
+    """IncidentAnalyzer.analyze_incident directamente (contenedor caliente)"""
+    module = _import_incident_analyzer_module("incident_analyzer")
+    analyzer = module.IncidentAnalyzer(
+        knowledge_base_id=BENCHMARK_ENV["KNOWLEDGE_BASE_ID"],
+        s3_bucket=BENCHMARK_ENV["S3_BUCKET"],
+        enable_timings=True
+    )
+    request = module.IncidentAnalysisRequest(incident_description=INCIDENT_DESCRIPTION)
+    
+    def call() -> Sample:
+        start = time.perf_counter()
+        response = analyzer.analyze_incident(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+        return Sample(
+            latency_ms=latency_ms,
+            ok=True,
+            stages_ms=response.timings_ms,
+            input_tokens=response.input_tokens,
+            output_tokens=response.output_tokens
+        )
+    
+    return call
+
+
+def _incident_handler_scenario() -> Callable[[], Sample]:
+    """Handler Lambda de análisis de incidencias con evento de API Gateway"""
+    module = _import_incident_analyzer_module("lambda_handler")
+    event = {
+        "httpMethod": "POST",
+        "body": json.dumps({
+            "incident_description": INCIDENT_DESCRIPTION,
+            "optimize_query": False,
+            "max_similar_incidents": 3
+        })
+    }
+    context = _FakeLambdaContext()
+    
+    def call() -> Sample:
+        start = time.perf_counter()
+        result = module.lambda_handler(event, context)
+        latency_ms = (time.perf_counter() - start) * 1000
+        body = json.loads(result["body"])
+        model_info = body.get("model_info", {})
+        return Sample(
+            latency_ms=latency_ms,
+            ok=result["statusCode"] == 200,
+            stages_ms=body.get("timings_ms", {}),
+            input_tokens=model_info.get("input_tokens", 0),
+            output_tokens=model_info.get("output_tokens", 0)
+        )
+    
+    return call
+
+
+def _rag_handler_scenario() -> Callable[[], Sample]:
+    """Handler Lambda de consultas RAG con un documento de texto"""
+    module = _import_rag_handler()
+    log_text = (ROOT_DIR / "sample-data" / "incidents-files" / "INC-2024-002_logs.txt").read_text(encoding="utf-8")
+    event = {
+        "body": json.dumps({
+            "prompt": "Resume los documentos adjuntos",
+            "max_tokens": 1024,
+            "documents": [
+                {
+                    "file_name": "INC-2024-002_logs.txt",
+                    "document_type": "text",
+                    "content": log_text,
+                    "size_bytes": len(log_text)
+                }
+            ]
+        })
+    }
+    context = _FakeLambdaContext()
+    
+    def call() -> Sample:
+        start = time.perf_counter()
+        result = module.lambda_handler(event, context)
+        latency_ms = (time.perf_counter() - start) * 1000
+        body = json.loads(result["body"])
+        return Sample(
+            latency_ms=latency_ms,
+            ok=result["statusCode"] == 200,
+            input_tokens=body.get("input_tokens", 0),
+            output_tokens=body.get("output_tokens", 0)
+        )
+    
+    return call
+
+
+SCENARIOS: Dict[str, Callable[[], Callable[[], Sample]]] = {
+    "analyzer": _analyzer_scenario,
+    "incident_handler": _incident_handler_scenario,
+    "rag_handler": _rag_handler_scenario
+}
+
+
+def _safe_call(call: Callable[[], Sample]) -> Sample:
+    start = time.perf_counter()
+    try:
+        return call()
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"Invocación fallida: {str(e)}")
+        return Sample(latency_ms=(time.perf_counter() - start) * 1000, ok=False)
+
+
+def current_git_commit() -> Optional[str]:
+    """Commit actual del repositorio (None si git no está disponible)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(
+    scenario: str,
+    iterations: int = 20,
+    warmup: int = 2,
+    concurrency: int = 1,
+    profile: Optional[FakeProfile] = None
+) -> Dict[str, Any]:
+    """
+    Ejecuta un escenario de benchmark contra los servicios simulados
+    
+    Args:
+        scenario: Nombre del escenario (ver SCENARIOS)
+        iterations: Invocaciones medidas
+        warmup: Invocaciones de calentamiento excluidas de las estadísticas
+        concurrency: Invocaciones simultáneas
+        profile: Perfil de latencias de los servicios simulados
+    
+    Returns:
+        Resultado serializable del benchmark
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Escenario desconocido: {scenario}. Disponibles: {', '.join(SCENARIOS)}")
+    
+    fake_aws = FakeAWS(profile)
+    
+    # Los handlers escriben métricas EMF en stdout; se descartan durante la medición
+    with mock.patch.dict(os.environ, BENCHMARK_ENV), fake_aws.patch_boto3(), \
+            contextlib.redirect_stdout(io.StringIO()):
+        call = SCENARIOS[scenario]()
+        
+        for _ in range(warmup):
+            _safe_call(call)
+        
+        wall_start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                samples: List[Sample] = list(executor.map(lambda _: _safe_call(call), range(iterations)))
+        else:
+            samples = [_safe_call(call) for _ in range(iterations)]
+        wall_time_s = time.perf_counter() - wall_start
+    
+    successful = [sample for sample in samples if sample.ok]
+    stage_names = sorted({name for sample in successful for name in sample.stages_ms})
+    output_tokens = sum(sample.output_tokens for sample in successful)
+    
+    return {
+        "benchmark": scenario,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": current_git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform()
+        },
+        "config": {
+            "iterations": iterations,
+            "warmup": warmup,
+            "concurrency": concurrency,
+            "profile": fake_aws.profile.to_dict()
+        },
+        "iterations": len(samples),
+        "errors": len(samples) - len(successful),
+        "error_rate": round((len(samples) - len(successful)) / len(samples), 4) if samples else 0.0,
+        "wall_time_s": round(wall_time_s, 3),
+        "throughput_rps": round(len(successful) / wall_time_s, 3) if wall_time_s > 0 else 0.0,
+        "output_tokens_per_s": round(output_tokens / wall_time_s, 1) if wall_time_s > 0 else 0.0,
+        "latency_ms": summarize(sample.latency_ms for sample in successful),
+        "stages_ms": {
+            name: summarize(sample.stages_ms[name] for sample in successful if name in sample.stages_ms)
+            for name in stage_names
+        },
+        "samples_ms": [round(sample.latency_ms, 3) for sample in successful]
+    }
+
+
+def save_result(result: Dict[str, Any], output: Optional[Path] = None) -> Path:
+    """
+    Guarda el resultado de un benchmark en JSON
+    
+    Args:
+        result: Resultado devuelto por run_benchmark
+        output: Ruta de destino (por defecto benchmarks/results/<escenario>-<fecha>.json)
+    
+    Returns:
+        Ruta del fichero escrito
+    """
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{result['benchmark']}-{stamp}.json"
+    
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    return output
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    """Muestra un resumen legible del resultado"""
+    latency = result["latency_ms"]
+    print("=" * 80)
+    print(f"BENCHMARK - {result['benchmark']}")
+    print("=" * 80)
+    print(f"Invocaciones: {result['iterations']} (errores: {result['errors']})")
+    print(f"Throughput: {result['throughput_rps']:.2f} req/s")
+    print(f"Latencia p50: {latency['p50']:.1f} ms | p95: {latency['p95']:.1f} ms | p99: {latency['p99']:.1f} ms")
+    
+    if result["stages_ms"]:
+        print()
+        print(f"{'Etapa':<20}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}")
+        for name, stats in result["stages_ms"].items():
+            print(f"{name:<20}{stats['p50']:>12.1f}{stats['p95']:>12.1f}{stats['p99']:>12.1f}")
+    print("=" * 80)
+
+
+def build_profile(args: argparse.Namespace) -> FakeProfile:
+    """Construye el perfil de simulación a partir de los argumentos de línea de comandos"""
+    return FakeProfile(
+        kb_latency=LatencyDistribution.parse(args.kb_latency),
+        s3_latency=LatencyDistribution.parse(args.s3_latency),
+        bedrock_ttft=LatencyDistribution.parse(args.bedrock_ttft),
+        tokens_per_second=args.tokens_per_second,
+        fast_model_speedup=args.fast_model_speedup,
+        time_scale=args.time_scale,
+        seed=args.seed
+    )
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Registra los argumentos del perfil de simulación"""
+    defaults = FakeProfile()
+    parser.add_argument("--kb-latency", default=str(defaults.kb_latency),
+                        help="Latencia de Knowledge Base (const:ms, uniform:a:b, normal:m:s, lognormal:mediana:sigma)")
+    parser.add_argument("--s3-latency", default=str(defaults.s3_latency), help="Latencia de S3")
+    parser.add_argument("--bedrock-ttft", default=str(defaults.bedrock_ttft),
+                        help="Latencia hasta el primer token de Bedrock")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second,
+                        help="Velocidad de generación simulada")
+    parser.add_argument("--fast-model-speedup", type=float, default=defaults.fast_model_speedup,
+                        help="Factor de velocidad de los modelos rápidos (Haiku) de la cascada")
+    parser.add_argument("--time-scale", type=float, default=defaults.time_scale,
+                        help="Factor aplicado a todas las esperas simuladas (0 = sin esperas)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks offline con Bedrock, KB y S3 simulados")
+    parser.add_argument("--scenario", "-s", action="append", choices=sorted(SCENARIOS),
+                        help="Escenario a ejecutar (repetible; por defecto todos)")
+    parser.add_argument("--iterations", "-n", type=int, default=20, help="Invocaciones medidas")
+    parser.add_argument("--warmup", type=int, default=2, help="Invocaciones de calentamiento")
+    parser.add_argument("--concurrency", "-c", type=int, default=1, help="Invocaciones simultáneas")
+    parser.add_argument("--output-dir", type=Path, default=RESULTS_DIR, help="Directorio de resultados")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    for scenario in args.scenario or sorted(SCENARIOS):
+        result = run_benchmark(
+            scenario,
+            iterations=args.iterations,
+            warmup=args.warmup,
+            concurrency=args.concurrency,
+            profile=build_profile(args)
+        )
+        print_report(result)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = save_result(result, args.output_dir / f"{scenario}-{stamp}.json")
+        print(f"Resultado guardado en {path}\n")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Generador de carga concurrente para el endpoint /analyze-incident
+
+Modos:
+    open    Tasa de llegada fija (req/s) independiente de las respuestas. La
+            latencia se mide desde el instante programado, de modo que las
+            colas internas cuentan (sin omisión coordinada).
+    closed  N workers que lanzan la siguiente petición al recibir la anterior.
+
+Destinos:
+    --url       Endpoint HTTP desplegado (API Gateway)
+    --local     Handler en proceso contra los servicios simulados de benchmarks.fakes
+
+Ejemplos:
+    python -m benchmarks.loadgen --local incident_handler --mode open --rate 20 --duration 30 --time-scale 0.05
+    python -m benchmarks.loadgen --url https://xxx.execute-api.eu-west-1.amazonaws.com/dev/analyze-incident \\
+        --api-key $API_KEY --mode closed --workers 4 --duration 120 --warmup 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from .fakes import FakeAWS
+from .harness import (
+    BENCHMARK_ENV,
+    INCIDENT_DESCRIPTION,
+    RESULTS_DIR,
+    SCENARIOS,
+    Sample,
+    add_profile_arguments,
+    build_profile,
+    current_git_commit,
+    save_result
+)
+from .stats import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+class LoadRecorder:
+    """Acumula los resultados de la carga separando el calentamiento"""
+    
+    def __init__(self, warmup_until: float):
+        """
+        Inicializa el acumulador
+        
+        Args:
+            warmup_until: Instante (perf_counter) hasta el que las muestras se descartan
+        """
+        self.warmup_until = warmup_until
+        self.histogram = LatencyHistogram()
+        self.samples_ms: List[float] = []
+        self.requests = 0
+        self.errors = 0
+        self.warmup_requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def record(self, scheduled_at: float, sample: Sample) -> None:
+        """
+        Registra una petición completada
+        
+        Args:
+            scheduled_at: Instante programado de la petición (perf_counter)
+            sample: Resultado de la invocación
+        """
+        finished_at = time.perf_counter()
+        with self._lock:
+            if scheduled_at < self.warmup_until:
+                self.warmup_requests += 1
+                return
+            
+            self.requests += 1
+            self.first_start = scheduled_at if self.first_start is None else min(self.first_start, scheduled_at)
+            self.last_end = finished_at if self.last_end is None else max(self.last_end, finished_at)
+            
+            if not sample.ok:
+                self.errors += 1
+                return
+            
+            latency_ms = (finished_at - scheduled_at) * 1000
+            self.histogram.record(latency_ms)
+            self.samples_ms.append(round(latency_ms, 3))
+            self.input_tokens += sample.input_tokens
+            self.output_tokens += sample.output_tokens
+    
+    def measured_seconds(self) -> float:
+        if self.first_start is None or self.last_end is None:
+            return 0.0
+        return self.last_end - self.first_start
+
+
+def http_target(url: str, api_key: Optional[str], payload: Dict[str, Any], timeout: float) -> Callable[[], Sample]:
+    """
+    Crea un destino que envía POST al endpoint desplegado
+    
+    Args:
+        url: URL del endpoint /analyze-incident
+        api_key: API key de API Gateway (cabecera x-api-key)
+        payload: Cuerpo JSON de la petición
+        timeout: Timeout de cada petición en segundos
+    
+    Returns:
+        Función que ejecuta una petición y devuelve su resultado
+    """
+    data = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["x-api-key"] = api_key
+    
+    def call() -> Sample:
+        start = time.perf_counter()
+        request = urllib.request.Request(url, data=data, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = json.loads(response.read() or b"{}")
+                ok = 200 <= response.status < 300
+        except urllib.error.HTTPError as e:
+            logger.debug(f"HTTP {e.code}: {e.reason}")
+            return Sample(latency_ms=(time.perf_counter() - start) * 1000, ok=False)
+        
+        model_info = body.get("model_info", {})
+        return Sample(
+            latency_ms=(time.perf_counter() - start) * 1000,
+            ok=ok,
+            stages_ms=body.get("timings_ms", {}),
+            input_tokens=model_info.get("input_tokens", body.get("input_tokens", 0)),
+            output_tokens=model_info.get("output_tokens", body.get("output_tokens", 0))
+        )
+    
+    return call
+
+
+def _invoke(call: Callable[[], Sample], scheduled_at: float, recorder: LoadRecorder) -> None:
+    try:
+        sample = call()
+    except Exception as e:
+        logger.debug(f"Petición fallida: {str(e)}")
+        sample = Sample(latency_ms=0.0, ok=False)
+    recorder.record(scheduled_at, sample)
+
+
+def run_open_loop(
+    call: Callable[[], Sample],
+    rate: float,
+    duration: float,
+    warmup: float,
+    max_in_flight: int = 256
+) -> LoadRecorder:
+    """
+    Lanza peticiones a tasa fija durante warmup + duration segundos
+    
+    Args:
+        call: Destino de la carga
+        rate: Peticiones por segundo
+        duration: Segundos medidos
+        warmup: Segundos iniciales excluidos de las estadísticas
+        max_in_flight: Máximo de peticiones simultáneas (el resto espera en cola)
+    
+    Returns:
+        Resultados acumulados
+    """
+    if rate <= 0:
+        raise ValueError("La tasa de llegada debe ser mayor que 0")
+    
+    start = time.perf_counter()
+    recorder = LoadRecorder(warmup_until=start + warmup)
+    interval = 1.0 / rate
+    total = int((warmup + duration) * rate)
+    
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for index in range(total):
+            scheduled_at = start + index * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(_invoke, call, scheduled_at, recorder)
+    
+    return recorder
+
+
+def run_closed_loop(
+    call: Callable[[], Sample],
+    workers: int,
+    duration: float,
+    warmup: float
+) -> LoadRecorder:
+    """
+    Ejecuta N workers en bucle cerrado durante warmup + duration segundos
+    
+    Args:
+        call: Destino de la carga
+        workers: Número de workers concurrentes
+        duration: Segundos medidos
+        warmup: Segundos iniciales excluidos de las estadísticas
+    
+    Returns:
+        Resultados acumulados
+    """
+    start = time.perf_counter()
+    recorder = LoadRecorder(warmup_until=start + warmup)
+    deadline = start + warmup + duration
+    
+    def worker() -> None:
+        while time.perf_counter() < deadline:
+            _invoke(call, time.perf_counter(), recorder)
+    
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    return recorder
+
+
+def build_result(recorder: LoadRecorder, target: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construye el resultado serializable de una prueba de carga
+    
+    Args:
+        recorder: Resultados acumulados
+        target: Descripción del destino
+        config: Parámetros de la prueba
+    
+    Returns:
+        Resultado compatible con los ficheros de benchmarks.harness
+    """
+    seconds = recorder.measured_seconds()
+    successful = recorder.requests - recorder.errors
+    
+    return {
+        "benchmark": f"loadgen-{config['mode']}",
+        "timestamp": datetime.now().astimezone().isoformat(),
+        "git_commit": current_git_commit(),
+        "target": target,
+        "config": config,
+        "iterations": recorder.requests,
+        "warmup_requests": recorder.warmup_requests,
+        "errors": recorder.errors,
+        "error_rate": round(recorder.errors / recorder.requests, 4) if recorder.requests else 0.0,
+        "wall_time_s": round(seconds, 3),
+        "throughput_rps": round(successful / seconds, 3) if seconds > 0 else 0.0,
+        "input_tokens_per_s": round(recorder.input_tokens / seconds, 1) if seconds > 0 else 0.0,
+        "output_tokens_per_s": round(recorder.output_tokens / seconds, 1) if seconds > 0 else 0.0,
+        "latency_ms": recorder.histogram.summary(),
+        "histogram": recorder.histogram.to_dict(),
+        "samples_ms": recorder.samples_ms
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    """Muestra un resumen legible de la prueba de carga"""
+    latency = result["latency_ms"]
+    print("=" * 80)
+    print(f"PRUEBA DE CARGA - {result['target']} ({result['config']['mode']})")
+    print("=" * 80)
+    print(f"Peticiones medidas: {result['iterations']} (calentamiento excluido: {result['warmup_requests']})")
+    print(f"Errores: {result['errors']} ({result['error_rate']:.2%})")
+    print(f"Throughput: {result['throughput_rps']:.2f} req/s | Tokens salida: {result['output_tokens_per_s']:.1f}/s")
+    print()
+    for key in ("p50", "p90", "p95", "p99", "p99.9", "max"):
+        print(f"  {key:<6} {latency.get(key, 0.0):>12.1f} ms")
+    print("=" * 80)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generador de carga para /analyze-incident")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="URL del endpoint desplegado")
+    target.add_argument("--local", choices=sorted(SCENARIOS), help="Handler local con servicios simulados")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"), help="API key (cabecera x-api-key)")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed", help="Modo de carga")
+    parser.add_argument("--rate", type=float, default=1.0, help="Peticiones por segundo (modo open)")
+    parser.add_argument("--workers", type=int, default=4, help="Workers concurrentes (modo closed)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Peticiones simultáneas máximas (modo open)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos medidos")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Segundos de calentamiento excluidos")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout por petición HTTP (segundos)")
+    parser.add_argument("--description", default=INCIDENT_DESCRIPTION, help="Descripción de la incidencia a enviar")
+    parser.add_argument("--output", type=Path, default=None, help="Fichero JSON de resultados")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    config = {
+        "mode": args.mode,
+        "rate": args.rate if args.mode == "open" else None,
+        "workers": args.workers if args.mode == "closed" else None,
+        "duration": args.duration,
+        "warmup": args.warmup
+    }
+    
+    with contextlib.ExitStack() as stack:
+        if args.url:
+            target_name = args.url
+            payload = {
+                "incident_description": args.description,
+                "optimize_query": False,
+                "max_similar_incidents": 3
+            }
+            call = http_target(args.url, args.api_key, payload, args.timeout)
+        else:
+            target_name = f"local:{args.local}"
+            profile = build_profile(args)
+            config["profile"] = profile.to_dict()
+            fake_aws = FakeAWS(profile)
+            stack.enter_context(mock.patch.dict(os.environ, BENCHMARK_ENV))
+            stack.enter_context(fake_aws.patch_boto3())
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            call = SCENARIOS[args.local]()
+        
+        if args.mode == "open":
+            recorder = run_open_loop(call, args.rate, args.duration, args.warmup, args.max_in_flight)
+        else:
+            recorder = run_closed_loop(call, args.workers, args.duration, args.warmup)
+    
+    result = build_result(recorder, target_name, config)
+    print_report(result)
+    
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = save_result(result, args.output or RESULTS_DIR / f"loadgen-{args.mode}-{stamp}.json")
+    print(f"Resultado guardado en {path}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Pico de memoria al construir el body de InvokeModel con adjuntos grandes
+
+Compara, con tracemalloc, la construcción anterior (base64 materializado en
+el diccionario + json.dumps + encode, como hace botocore con un str) con
+RequestBodyBuilder, que vuelca los adjuntos por bloques en un único buffer.
+No llama a Bedrock.
+
+Ejemplo:
+    python -m benchmarks.request_memory --synthetic-mb 8 --count 4
+    python -m benchmarks.request_memory -f informe.pdf -f captura.png
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from src.shared.base64_stream import Base64File
+from src.shared.document_processor import DocumentProcessor
+from src.shared.models import Document, DocumentType, QueryRequest
+from src.shared.request_body import RequestBodyBuilder
+
+MIB = 1024 * 1024
+
+
+def build_body_eager(request: QueryRequest) -> bytes:
+    """Construcción previa: cadenas base64 completas en el dict y json.dumps"""
+    content = []
+    for doc in request.documents:
+        content.append({
+            "type": "document" if doc.document_type == DocumentType.PDF else "image",
+            "source": {"type": "base64", "media_type": doc.mime_type, "data": doc.base64_content}
+        })
+    content.append({"type": "text", "text": request.prompt})
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": request.max_tokens,
+        "temperature": request.temperature,
+        "messages": [{"role": "user", "content": content}]
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+def build_body_streaming(request: QueryRequest) -> bytearray:
+    """Construcción actual con RequestBodyBuilder"""
+    builder = RequestBodyBuilder()
+    content = [
+        {
+            "type": "document" if doc.document_type == DocumentType.PDF else "image",
+            "source": {"type": "base64", "media_type": doc.mime_type, "data": builder.payload(doc)}
+        }
+        for doc in request.documents
+    ]
+    content.append({"type": "text", "text": request.prompt})
+    return builder.build({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": request.max_tokens,
+        "temperature": request.temperature,
+        "messages": [{"role": "user", "content": content}]
+    })
+
+
+def measure_peak(build: Callable[[QueryRequest], object], make_request: Callable[[], QueryRequest]) -> Dict[str, float]:
+    """
+    Mide el pico de memoria de Python al construir el body
+    
+    Args:
+        build: Función que construye el body
+        make_request: Crea una petición nueva (con los adjuntos sin materializar)
+    
+    Returns:
+        Pico en MiB y tamaño del body en MiB
+    """
+    request = make_request()
+    gc.collect()
+    tracemalloc.start()
+    body = build(request)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_mib": round(peak / MIB, 2), "body_mib": round(len(body) / MIB, 2)}
+
+
+def synthetic_documents(directory: str, size_mb: float, count: int) -> List[str]:
+    """Crea archivos aleatorios que se tratan como PDFs (no se parsean)"""
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"adjunto-{index}.pdf")
+        with open(path, "wb") as f:
+            f.write(os.urandom(int(size_mb * MIB)))
+        paths.append(path)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pico de memoria al construir el body de InvokeModel")
+    parser.add_argument("--file", "-f", action="append", default=[], help="Adjunto real (repetible)")
+    parser.add_argument("--synthetic-mb", type=float, default=8.0, help="Tamaño de cada adjunto sintético")
+    parser.add_argument("--count", type=int, default=4, help="Número de adjuntos sintéticos")
+    args = parser.parse_args(argv)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        if args.file:
+            processor = DocumentProcessor()
+            
+            def make_request() -> QueryRequest:
+                return QueryRequest(prompt="Resume los adjuntos",
+                                    documents=[processor.process_document(path) for path in args.file])
+        else:
+            paths = synthetic_documents(directory, args.synthetic_mb, args.count)
+            
+            def make_request() -> QueryRequest:
+                documents = []
+                for path in paths:
+                    document = Document(file_path=path, file_name=os.path.basename(path),
+                                        document_type=DocumentType.PDF, mime_type="application/pdf",
+                                        size_bytes=os.path.getsize(path))
+                    document.set_lazy("base64_content", Base64File(path))
+                    documents.append(document)
+                return QueryRequest(prompt="Resume los adjuntos", documents=documents)
+        
+        eager = measure_peak(build_body_eager, make_request)
+        streaming = measure_peak(build_body_streaming, make_request)
+    
+    print("=" * 80)
+    print("PICO DE MEMORIA - CONSTRUCCIÓN DEL BODY")
+    print("=" * 80)
+    print(f"Body: {streaming['body_mib']:.1f} MiB")
+    print(f"{'Método':<30}{'Pico (MiB)':>14}{'Pico / body':>14}")
+    for name, result in (("json.dumps (anterior)", eager), ("RequestBodyBuilder", streaming)):
+        ratio = result["peak_mib"] / result["body_mib"] if result["body_mib"] else 0
+        print(f"{name:<30}{result['peak_mib']:>14.1f}{ratio:>13.2f}x")
+    print("=" * 80)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
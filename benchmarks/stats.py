@@ -0,0 +1,205 @@
+"""
+Estadísticas de latencia para los benchmarks
+"""
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """
+    Calcula un percentil con interpolación lineal
+    
+    Args:
+        samples: Muestras (no necesitan estar ordenadas)
+        pct: Percentil entre 0 y 100
+    
+    Returns:
+        Valor del percentil (0.0 si no hay muestras)
+    """
+    if not samples:
+        return 0.0
+    
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return float(ordered[lower])
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(samples: Iterable[float]) -> Dict[str, float]:
+    """
+    Resume una serie de latencias
+    
+    Args:
+        samples: Latencias en milisegundos
+    
+    Returns:
+        Diccionario con count, mean, min, max, p50, p95 y p99
+    """
+    values: List[float] = list(samples)
+    if not values:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "max": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2),
+        "min": round(min(values), 2),
+        "max": round(max(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2)
+    }
+
+
+def bootstrap_percentile_change(
+    baseline: Sequence[float],
+    candidate: Sequence[float],
+    pct: float,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    rng: Optional[random.Random] = None
+) -> Tuple[float, float, float]:
+    """
+    Intervalo de confianza bootstrap del cambio relativo de un percentil
+    
+    Remuestrea con reemplazo ambas series de forma independiente y calcula
+    (percentil_candidato / percentil_base - 1) en cada réplica.
+    
+    Args:
+        baseline: Latencias de la ejecución de referencia
+        candidate: Latencias de la ejecución a evaluar
+        pct: Percentil a comparar (ej: 95)
+        resamples: Número de réplicas bootstrap
+        confidence: Nivel de confianza del intervalo
+        rng: Generador aleatorio (para resultados reproducibles)
+    
+    Returns:
+        Tupla (cambio_observado, límite_inferior, límite_superior) como fracciones
+    """
+    if not baseline or not candidate:
+        raise ValueError("Se necesitan muestras en ambas ejecuciones")
+    
+    rng = rng or random.Random()
+    base_value = percentile(baseline, pct)
+    if base_value <= 0:
+        raise ValueError("El percentil de referencia debe ser mayor que 0")
+    observed = percentile(candidate, pct) / base_value - 1
+    
+    changes = []
+    for _ in range(resamples):
+        base_resample = rng.choices(baseline, k=len(baseline))
+        candidate_resample = rng.choices(candidate, k=len(candidate))
+        base_pct = percentile(base_resample, pct)
+        if base_pct > 0:
+            changes.append(percentile(candidate_resample, pct) / base_pct - 1)
+    
+    alpha = (1 - confidence) / 2
+    return observed, percentile(changes, alpha * 100), percentile(changes, (1 - alpha) * 100)
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias log-lineal al estilo HdrHistogram
+    
+    Agrupa los valores en buckets cuyo ancho crece con el orden de magnitud,
+    de forma que el error relativo de cada percentil queda acotado por las
+    cifras significativas configuradas con memoria constante.
+    """
+    
+    def __init__(self, significant_digits: int = 3, lowest_ms: float = 0.001):
+        """
+        Inicializa el histograma
+        
+        Args:
+            significant_digits: Cifras significativas conservadas (1-5)
+            lowest_ms: Valor mínimo distinguible en milisegundos
+        """
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits debe estar entre 1 y 5")
+        
+        self.significant_digits = significant_digits
+        self.lowest_ms = lowest_ms
+        self.buckets: Dict[float, int] = {}
+        self.count = 0
+        self.min = math.inf
+        self.max = 0.0
+        self.total = 0.0
+    
+    def _bucket_width(self, value: float) -> float:
+        magnitude = math.floor(math.log10(value))
+        return 10 ** (magnitude - self.significant_digits + 1)
+    
+    def record(self, value_ms: float) -> None:
+        """
+        Registra una latencia
+        
+        Args:
+            value_ms: Latencia en milisegundos
+        """
+        value = max(value_ms, self.lowest_ms)
+        width = self._bucket_width(value)
+        lower = round(math.floor(value / width) * width, 9)
+        
+        self.buckets[lower] = self.buckets.get(lower, 0) + 1
+        self.count += 1
+        self.total += value_ms
+        self.min = min(self.min, value_ms)
+        self.max = max(self.max, value_ms)
+    
+    def percentile(self, pct: float) -> float:
+        """
+        Estima un percentil con la precisión configurada
+        
+        Args:
+            pct: Percentil entre 0 y 100
+        
+        Returns:
+            Punto medio del bucket que contiene el percentil
+        """
+        if self.count == 0:
+            return 0.0
+        
+        target = max(1, math.ceil(self.count * pct / 100))
+        cumulative = 0
+        for lower in sorted(self.buckets):
+            cumulative += self.buckets[lower]
+            if cumulative >= target:
+                value = lower + self._bucket_width(max(lower, self.lowest_ms)) / 2
+                return min(max(value, self.min), self.max)
+        return self.max
+    
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Acumula en este histograma los valores de otro"""
+        for lower, count in other.buckets.items():
+            self.buckets[lower] = self.buckets.get(lower, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def summary(self) -> Dict[str, float]:
+        """Resumen con los percentiles habituales"""
+        if self.count == 0:
+            return summarize([])
+        
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 2),
+            "min": round(self.min, 2),
+            "max": round(self.max, 2),
+            "p50": round(self.percentile(50), 2),
+            "p90": round(self.percentile(90), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "p99.9": round(self.percentile(99.9), 2)
+        }
+    
+    def to_dict(self) -> Dict[str, object]:
+        """Representación serializable (buckets ordenados como [límite_inferior_ms, cuenta])"""
+        return {
+            "significant_digits": self.significant_digits,
+            "buckets": [[lower, self.buckets[lower]] for lower in sorted(self.buckets)]
+        }
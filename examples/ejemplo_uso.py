@@ -9,7 +9,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.shared.models import QueryRequest, Document, DocumentType
 from src.shared.document_processor import DocumentProcessor
-from src.cli.bedrock_client import BedrockClient
+from src.shared.bedrock_client import BedrockClient
 from src.cli.config import get_bedrock_config
 
 
@@ -3,8 +3,10 @@ Configuración para el CLI
 """
 import os
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
+from ..shared.document_cache import DocumentCache
 from ..shared.models import BedrockConfig
 
 # Cargar variables de entorno
@@ -28,6 +30,7 @@ def get_bedrock_config() -> BedrockConfig:
         ),
         max_tokens=int(os.getenv("BEDROCK_MAX_TOKENS", "4096")),
         temperature=float(os.getenv("BEDROCK_TEMPERATURE", "0.7")),
+        max_input_tokens=int(os.getenv("BEDROCK_MAX_INPUT_TOKENS", "0")),
         profile_name=os.getenv("AWS_PROFILE")
     )
 
@@ -40,3 +43,19 @@ def get_log_level() -> str:
         Nivel de logging
     """
     return os.getenv("LOG_LEVEL", "INFO")
+
+
+def get_document_cache() -> Optional[DocumentCache]:
+    """
+    Obtiene la caché de documentos procesados desde variables de entorno
+    
+    Returns:
+        Caché de documentos o None si está desactivada
+    """
+    if os.getenv("DOCUMENT_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    
+    return DocumentCache(
+        directory=os.getenv("DOCUMENT_CACHE_DIR", str(Path.home() / ".cache" / "consulta-rag" / "documents")),
+        max_bytes=int(os.getenv("DOCUMENT_CACHE_MAX_MB", "512")) * 1024 * 1024
+    )
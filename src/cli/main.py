@@ -2,6 +2,7 @@
 CLI principal para consultas RAG con AWS Bedrock
 """
 import sys
+import time
 import logging
 from pathlib import Path
 from typing import List
@@ -10,17 +11,62 @@ import click
 from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.live import Live
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, MofNCompleteColumn
 
-from ..shared.models import QueryRequest
-from ..shared.document_processor import DocumentProcessor
+from ..shared.models import QueryRequest, QueryResponse
+from ..shared.document_processor import DocumentProcessor, DocumentResult
 from ..shared.utils import setup_logging, format_file_size
-from .config import get_bedrock_config, get_log_level
-from .bedrock_client import BedrockClient
+from .config import get_bedrock_config, get_document_cache, get_log_level
+from ..shared.bedrock_client import BedrockClient
 
 console = Console()
 logger = logging.getLogger(__name__)
 
+workers_option = click.option(
+    "--workers", "-j",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Procesos para procesar archivos en paralelo (1 = secuencial, 0 = uno por CPU)"
+)
+
+no_cache_option = click.option(
+    "--no-cache",
+    is_flag=True,
+    help="No usar la caché de documentos procesados"
+)
+
+
+def process_files(files: tuple, workers: int, use_cache: bool = True) -> List[DocumentResult]:
+    """
+    Procesa los archivos mostrando el progreso
+    
+    Args:
+        files: Rutas de los archivos
+        workers: Procesos a usar (1 = secuencial, 0 = uno por CPU)
+        use_cache: Reutilizar documentos ya procesados de la caché en disco
+    
+    Returns:
+        Resultados en el mismo orden que files
+    """
+    processor = DocumentProcessor(cache=get_document_cache() if use_cache else None)
+    
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        console=console,
+        transient=True
+    ) as progress:
+        task = progress.add_task("Procesando documentos...", total=len(files))
+        
+        def advance(result: DocumentResult) -> None:
+            progress.update(task, advance=1, description=f"Procesado {Path(result.file_path).name}")
+        
+        return processor.process_documents([str(f) for f in files], workers=workers, on_complete=advance)
+
 
 @click.group()
 def cli():
@@ -28,6 +74,54 @@ def cli():
     pass
 
 
+def response_panel(text: str) -> Panel:
+    """Panel con la respuesta del modelo renderizada como Markdown"""
+    return Panel(
+        Markdown(text),
+        title="[bold green]Respuesta de Claude[/bold green]",
+        border_style="green"
+    )
+
+
+def stream_response(client: BedrockClient, request: QueryRequest) -> QueryResponse:
+    """
+    Muestra la respuesta del modelo a medida que llega
+    
+    El Markdown se vuelve a renderizar con el texto acumulado, como mucho
+    unas pocas veces por segundo, para que listas y bloques de código se
+    vean bien aunque lleguen partidos entre fragmentos.
+    
+    Args:
+        client: Cliente de Bedrock
+        request: Solicitud de consulta
+        
+    Returns:
+        Respuesta completa
+    """
+    with console.status("Esperando el primer token..."):
+        stream = client.invoke_model_stream(request)
+    
+    # Cerrar el stream libera la reserva de admisión aunque la lectura se interrumpa (Ctrl+C)
+    with stream:
+        with console.status("Esperando el primer token..."):
+            chunks = iter(stream)
+            first = next(chunks, "")
+        
+        console.print("\n" + "="*80 + "\n")
+        parts = [first]
+        rendered_at = time.monotonic()
+        with Live(response_panel(first), console=console, refresh_per_second=8, vertical_overflow="visible") as live:
+            for chunk in chunks:
+                parts.append(chunk)
+                # Markdown reparsea todo el texto: solo se reconstruye al ritmo del refresco
+                if time.monotonic() - rendered_at >= 1 / 8:
+                    live.update(response_panel("".join(parts)))
+                    rendered_at = time.monotonic()
+            live.update(response_panel("".join(parts)))
+    
+    return stream.response
+
+
 @cli.command()
 @click.option(
     "--prompt", "-p",
@@ -57,7 +151,15 @@ def cli():
     is_flag=True,
     help="Modo verbose (muestra logs detallados)"
 )
-def query(prompt: str, files: tuple, max_tokens: int, temperature: float, verbose: bool):
+@click.option(
+    "--stream/--no-stream",
+    default=True,
+    help="Muestra la respuesta a medida que se genera (por defecto activado)"
+)
+@workers_option
+@no_cache_option
+def query(prompt: str, files: tuple, max_tokens: int, temperature: float, verbose: bool, workers: int,
+          no_cache: bool, stream: bool):
     """
     Realiza una consulta al modelo LLM con documentos adjuntos
     
@@ -95,24 +197,16 @@ def query(prompt: str, files: tuple, max_tokens: int, temperature: float, verbos
         documents = []
         if files:
             console.print(f"\n[bold]Procesando {len(files)} archivo(s)...[/bold]")
-            processor = DocumentProcessor()
-            
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                console=console
-            ) as progress:
-                task = progress.add_task("Procesando documentos...", total=len(files))
-                
-                for file_path in files:
-                    try:
-                        doc = processor.process_document(str(file_path))
-                        documents.append(doc)
-                        console.print(f"  ✓ {doc.file_name} ({format_file_size(doc.size_bytes)}) - {doc.document_type}")
-                        progress.advance(task)
-                    except Exception as e:
-                        console.print(f"  [red]✗ Error procesando {file_path}: {str(e)}[/red]")
-                        progress.advance(task)
+            for result in process_files(files, workers, use_cache=not no_cache):
+                if result.ok:
+                    doc = result.document
+                    documents.append(doc)
+                    console.print(
+                        f"  ✓ {doc.file_name} ({format_file_size(doc.size_bytes)}) - {doc.document_type} "
+                        f"[dim]{result.elapsed_ms:.0f} ms[/dim]"
+                    )
+                else:
+                    console.print(f"  [red]✗ Error procesando {result.file_path}: {result.error}[/red]")
         
         # Crear solicitud
         request = QueryRequest(
@@ -130,28 +224,38 @@ def query(prompt: str, files: tuple, max_tokens: int, temperature: float, verbos
         console.print(f"\n[bold]Enviando consulta...[/bold]")
         console.print(f"[dim]Prompt: {prompt[:100]}{'...' if len(prompt) > 100 else ''}[/dim]\n")
         
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            console=console
-        ) as progress:
-            task = progress.add_task("Esperando respuesta del modelo...", total=None)
-            response = client.invoke_model(request)
-        
-        # Mostrar respuesta
-        console.print("\n" + "="*80 + "\n")
-        console.print(Panel(
-            Markdown(response.response),
-            title="[bold green]Respuesta de Claude[/bold green]",
-            border_style="green"
-        ))
+        if stream:
+            response = stream_response(client, request)
+        else:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                console=console
+            ) as progress:
+                task = progress.add_task("Esperando respuesta del modelo...", total=None)
+                response = client.invoke_model(request)
+            
+            # Mostrar respuesta
+            console.print("\n" + "="*80 + "\n")
+            console.print(response_panel(response.response))
         
         # Mostrar estadísticas
         console.print(f"\n[bold]Estadísticas:[/bold]")
-        console.print(f"  Tokens entrada: [cyan]{response.input_tokens}[/cyan]")
+        estimated = response.metadata.get("estimated_input_tokens")
+        console.print(
+            f"  Tokens entrada: [cyan]{response.input_tokens}[/cyan]"
+            + (f" [dim](estimados {estimated})[/dim]" if estimated else "")
+        )
+        for action in response.metadata.get("token_budget", {}).get("actions", []):
+            console.print(f"  [yellow]Presupuesto de tokens: {action}[/yellow]")
         console.print(f"  Tokens salida: [cyan]{response.output_tokens}[/cyan]")
         console.print(f"  Total tokens: [cyan]{response.input_tokens + response.output_tokens}[/cyan]")
         console.print(f"  Razón de parada: [cyan]{response.stop_reason}[/cyan]")
+        if "first_token_ms" in response.metadata:
+            console.print(
+                f"  Primer token: [cyan]{response.metadata['first_token_ms']} ms[/cyan] "
+                f"[dim](total {response.metadata['total_ms']} ms)[/dim]"
+            )
         
     except Exception as e:
         console.print(f"\n[bold red]Error:[/bold red] {str(e)}")
@@ -194,7 +298,9 @@ def test():
 
 @cli.command()
 @click.argument("files", nargs=-1, type=click.Path(exists=True))
-def validate(files: tuple):
+@workers_option
+@no_cache_option
+def validate(files: tuple, workers: int, no_cache: bool):
     """
     Valida archivos antes de enviarlos al modelo
     
@@ -212,25 +318,34 @@ def validate(files: tuple):
         border_style="cyan"
     ))
     
-    processor = DocumentProcessor()
-    
     console.print(f"\n[bold]Validando {len(files)} archivo(s)...[/bold]\n")
     
     valid_count = 0
     invalid_count = 0
     
-    for file_path in files:
-        try:
-            doc = processor.process_document(str(file_path))
+    for result in process_files(files, workers, use_cache=not no_cache):
+        if result.ok:
+            doc = result.document
             console.print(f"[green]✓[/green] {doc.file_name}")
             console.print(f"  Tipo: {doc.document_type}")
             console.print(f"  Tamaño: {format_file_size(doc.size_bytes)}")
             console.print(f"  MIME: {doc.mime_type}")
+            optimization = doc.metadata.get("image_optimization")
+            if optimization and optimization["applied"]:
+                console.print(
+                    f"  Optimizada: {format_file_size(optimization['optimized_bytes'])} "
+                    f"(-{format_file_size(optimization['bytes_saved'])}), "
+                    f"~{optimization['tokens_after']} tokens (-{optimization['tokens_saved']})"
+                )
+            routing = doc.metadata.get("pdf_routing")
+            if routing:
+                console.print(f"  Envío: {routing['route']} (~{routing['tokens_routed']} tokens, -{routing['tokens_saved']})")
             valid_count += 1
-        except Exception as e:
-            console.print(f"[red]✗[/red] {Path(file_path).name}")
-            console.print(f"  Error: {str(e)}")
+        else:
+            console.print(f"[red]✗[/red] {Path(result.file_path).name}")
+            console.print(f"  Error: {result.error}")
             invalid_count += 1
+        console.print(f"  Tiempo: {result.elapsed_ms:.0f} ms")
         console.print()
     
     # Resumen
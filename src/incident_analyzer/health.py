@@ -0,0 +1,161 @@
+"""
+Health check ligero para el analizador de incidencias
+
+Solo usa la librería estándar para que el cold start de la sonda no cargue
+boto3, pydantic ni el analizador. El modo "deep" comprueba en paralelo que
+los endpoints regionales de Knowledge Base y Bedrock son alcanzables (TCP +
+TLS) y cachea el resultado durante HEALTH_CACHE_SECONDS.
+"""
+import os
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from responses import create_response, create_cors_response
+
+# Resultado del último chequeo profundo, reutilizado entre invocaciones del mismo contenedor
+_deep_check_cache: Dict[str, Any] = {"expires_at": 0.0, "result": None}
+
+
+def check_endpoint(host: str, timeout: float, port: int = 443) -> Dict[str, Any]:
+    """
+    Comprueba que un endpoint HTTPS acepta conexiones y completa el handshake TLS
+    
+    Args:
+        host: Nombre del host
+        timeout: Timeout total en segundos
+        port: Puerto TCP
+    
+    Returns:
+        Diccionario con reachable, latency_ms y error (si lo hay)
+    """
+    start = time.perf_counter()
+    try:
+        context = ssl.create_default_context()
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            with context.wrap_socket(sock, server_hostname=host):
+                pass
+        return {
+            "host": host,
+            "reachable": True,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+    except (OSError, ssl.SSLError) as e:
+        return {
+            "host": host,
+            "reachable": False,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "error": str(e) or e.__class__.__name__
+        }
+
+
+def run_deep_check(region: str, timeout: float, cache_seconds: float) -> Dict[str, Any]:
+    """
+    Comprueba en paralelo la conectividad con Knowledge Base y Bedrock
+    
+    Args:
+        region: Región de AWS
+        timeout: Timeout por endpoint en segundos
+        cache_seconds: Segundos durante los que se reutiliza el resultado
+    
+    Returns:
+        Resultado del chequeo, con cached=True si procede de la caché
+    """
+    now = time.time()
+    cached = _deep_check_cache["result"]
+    if cached is not None and now < _deep_check_cache["expires_at"] and cached["region"] == region:
+        return dict(cached, cached=True)
+    
+    endpoints = {
+        "knowledge_base": f"bedrock-agent-runtime.{region}.amazonaws.com",
+        "bedrock": f"bedrock-runtime.{region}.amazonaws.com"
+    }
+    
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+        futures = {
+            name: executor.submit(check_endpoint, host, timeout)
+            for name, host in endpoints.items()
+        }
+        dependencies = {name: future.result() for name, future in futures.items()}
+    
+    result = {
+        "region": region,
+        "checked_at": int(now),
+        "dependencies": dependencies,
+        "cached": False
+    }
+    
+    _deep_check_cache["result"] = result
+    _deep_check_cache["expires_at"] = now + cache_seconds
+    
+    return result
+
+
+def _deep_requested(event: Dict[str, Any]) -> bool:
+    params: Optional[Dict[str, Any]] = event.get("queryStringParameters") or {}
+    value = params.get("deep", os.getenv("HEALTH_DEEP_CHECK", "false"))
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def health_check_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handler para health check
+    
+    Args:
+        event: Evento de Lambda (admite ?deep=true)
+        context: Contexto de Lambda
+    
+    Returns:
+        Respuesta de health check
+    """
+    # Manejar peticiones OPTIONS (CORS preflight)
+    http_method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
+    if http_method == "OPTIONS":
+        return create_cors_response()
+    
+    # Verificar configuración
+    knowledge_base_id = os.getenv("KNOWLEDGE_BASE_ID")
+    s3_bucket = os.getenv("S3_BUCKET")
+    region = os.getenv("AWS_REGION", "eu-west-1")
+    
+    status = "healthy"
+    issues = []
+    
+    if not knowledge_base_id:
+        status = "degraded"
+        issues.append("KNOWLEDGE_BASE_ID no configurado")
+    
+    if not s3_bucket:
+        status = "degraded"
+        issues.append("S3_BUCKET no configurado")
+    
+    body = {
+        "status": status,
+        "service": "incident-analyzer",
+        "version": "1.0.0",
+        "configuration": {
+            "knowledge_base_configured": bool(knowledge_base_id),
+            "s3_bucket_configured": bool(s3_bucket),
+            "model_id": os.getenv("BEDROCK_MODEL_ID", "default"),
+            "region": region
+        }
+    }
+    
+    if _deep_requested(event):
+        deep = run_deep_check(
+            region,
+            timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "2")),
+            cache_seconds=float(os.getenv("HEALTH_CACHE_SECONDS", "30"))
+        )
+        for name, dependency in deep["dependencies"].items():
+            if not dependency["reachable"]:
+                status = "degraded"
+                issues.append(f"{name} no alcanzable: {dependency.get('error')}")
+        body["status"] = status
+        body["deep_check"] = deep
+    
+    body["issues"] = issues if issues else None
+    
+    return create_response(200, body)
@@ -0,0 +1,349 @@
+"""
+Peticiones de cobertura (hedging) para recortar la cola de latencia de Bedrock
+
+La invocación principal se lanza en streaming. Si no llega el primer token
+antes de un retardo derivado de un percentil de los tiempos hasta el primer
+token observados, se lanza una copia contra un modelo (perfil de
+inferencia) o región alternativos. Gana la primera en terminar y la otra se
+cancela cortando su conexión, aunque siga esperando su primer evento. Un
+tope de la tasa de coberturas limita el gasto extra, y los tokens consumidos
+por los intentos perdedores se contabilizan aparte.
+
+Solo usa la librería estándar: las llamadas a Bedrock las pasa el
+analizador como funciones que devuelven los eventos del stream.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Caracteres por token para estimar la salida de un intento cancelado antes de terminar
+CHARS_PER_TOKEN = 4
+
+# Recibe el intento para registrar con set_abort cómo cortar su stream
+EventSource = Callable[["Attempt"], Iterable[Dict[str, Any]]]
+
+
+@dataclass
+class HedgePolicy:
+    """Configuración de las coberturas"""
+    enabled: bool = False
+    model_id: str = ""
+    region: str = ""
+    percentile: float = 95.0
+    min_samples: int = 20
+    initial_delay_ms: float = 3000.0
+    min_delay_ms: float = 250.0
+    max_delay_ms: float = 15000.0
+    max_hedge_rate: float = 0.1
+    window: int = 200
+    
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        """
+        Lee la configuración de las variables BEDROCK_HEDGE_*
+        
+        BEDROCK_HEDGE_MODEL_ID y BEDROCK_HEDGE_REGION vacíos repiten la
+        petición contra el mismo modelo y región.
+        """
+        return cls(
+            enabled=os.getenv("BEDROCK_HEDGE_ENABLED", "false").lower() == "true",
+            model_id=os.getenv("BEDROCK_HEDGE_MODEL_ID", ""),
+            region=os.getenv("BEDROCK_HEDGE_REGION", ""),
+            percentile=float(os.getenv("BEDROCK_HEDGE_PERCENTILE", "95")),
+            min_samples=int(os.getenv("BEDROCK_HEDGE_MIN_SAMPLES", "20")),
+            initial_delay_ms=float(os.getenv("BEDROCK_HEDGE_INITIAL_DELAY_MS", "3000")),
+            min_delay_ms=float(os.getenv("BEDROCK_HEDGE_MIN_DELAY_MS", "250")),
+            max_delay_ms=float(os.getenv("BEDROCK_HEDGE_MAX_DELAY_MS", "15000")),
+            max_hedge_rate=float(os.getenv("BEDROCK_HEDGE_MAX_RATE", "0.1"))
+        )
+
+
+@dataclass
+class Attempt:
+    """Un intento de invocación en streaming, cancelable entre eventos"""
+    label: str
+    model_id: str
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    text: List[str] = field(default_factory=list)
+    model: Optional[str] = None
+    stop_reason: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: Optional[int] = None
+    error: Optional[BaseException] = None
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    first_token: threading.Event = field(default_factory=threading.Event)
+    done: threading.Event = field(default_factory=threading.Event)
+    recorded: bool = False
+    _abort: Optional[Callable[[], None]] = field(default=None, repr=False)
+    _abort_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    
+    @property
+    def tokens_used(self) -> Tuple[int, int]:
+        """Tokens de entrada y salida (la salida se estima si se canceló a medias)"""
+        output = self.output_tokens
+        if output is None:
+            output = len("".join(self.text)) // CHARS_PER_TOKEN
+        return self.input_tokens, output
+    
+    def set_abort(self, abort: Callable[[], None]) -> None:
+        """
+        Registra cómo cortar el stream desde otro hilo (p. ej. cerrar su socket)
+        
+        Si el intento ya se canceló, se corta en el acto.
+        """
+        with self._abort_lock:
+            self._abort = abort
+        if self.cancelled.is_set():
+            self.abort()
+    
+    def abort(self) -> None:
+        """Corta el stream de un intento cancelado para que su hilo no espere al siguiente evento"""
+        with self._abort_lock:
+            abort, self._abort = self._abort, None
+        if abort is not None and not self.done.is_set():
+            try:
+                abort()
+            except Exception:
+                pass
+    
+    def run(self, source: EventSource, on_done: Callable[["Attempt"], None]) -> None:
+        """Consume el stream hasta el final o hasta que se cancele"""
+        events = None
+        try:
+            events = source(self)
+            for event in events:
+                # El evento ya recibido se procesa para contabilizar lo que ha consumido
+                self._handle(event)
+                if self.cancelled.is_set():
+                    break
+        except BaseException as e:
+            self.error = e
+        finally:
+            # Cerrar el generador libera la conexión y la reserva de admisión
+            close = getattr(events, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            self.total_ms = (time.perf_counter() - self.started_at) * 1000
+            self.done.set()
+            self.first_token.set()
+            on_done(self)
+    
+    def _handle(self, event: Dict[str, Any]) -> None:
+        chunk = event.get("chunk")
+        if not chunk:
+            for name, error in event.items():
+                if name.endswith("Exception"):
+                    raise RuntimeError(f"Error en el streaming de Bedrock ({name}): {error.get('message', error)}")
+            return
+        data = json.loads(chunk["bytes"])
+        event_type = data.get("type")
+        if event_type == "message_start":
+            message = data.get("message", {})
+            self.model = message.get("model")
+            self.input_tokens = message.get("usage", {}).get("input_tokens", 0)
+        elif event_type == "content_block_delta":
+            text = data.get("delta", {}).get("text")
+            if text:
+                if self.first_token_ms is None:
+                    self.first_token_ms = (time.perf_counter() - self.started_at) * 1000
+                    self.first_token.set()
+                self.text.append(text)
+        elif event_type == "message_delta":
+            self.stop_reason = data.get("delta", {}).get("stop_reason", self.stop_reason)
+            self.output_tokens = data.get("usage", {}).get("output_tokens", self.output_tokens)
+        elif event_type == "message_stop":
+            metrics = data.get("amazon-bedrock-invocationMetrics", {})
+            self.input_tokens = metrics.get("inputTokenCount", self.input_tokens)
+            self.output_tokens = metrics.get("outputTokenCount", self.output_tokens)
+    
+    def to_body(self) -> Dict[str, Any]:
+        """Respuesta con el mismo formato que el body de InvokeModel"""
+        input_tokens, output_tokens = self.tokens_used
+        return {
+            "model": self.model,
+            "model_id": self.model_id,
+            "content": [{"type": "text", "text": "".join(self.text)}],
+            "stop_reason": self.stop_reason,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        }
+
+
+class Hedger:
+    """Lanza y resuelve invocaciones con cobertura; compartido por el proceso"""
+    
+    def __init__(self, policy: HedgePolicy, max_workers: int = 16):
+        """
+        Inicializa el hedger
+        
+        Args:
+            policy: Configuración de las coberturas
+            max_workers: Hilos para los intentos en curso (dos por invocación)
+        """
+        self.policy = policy
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._ttft_ms: Deque[float] = deque(maxlen=policy.window)
+        self._hedged: Deque[bool] = deque(maxlen=policy.window)
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "rate_capped": 0,
+            "hedge_rejected": 0,
+            "extra_input_tokens": 0,
+            "extra_output_tokens": 0
+        }
+    
+    def delay_ms(self) -> float:
+        """Retardo antes de lanzar la cobertura: percentil del tiempo hasta el primer token"""
+        with self._lock:
+            samples = sorted(self._ttft_ms)
+        if len(samples) < self.policy.min_samples:
+            return self.policy.initial_delay_ms
+        # Percentil por rango más cercano
+        index = max(0, min(len(samples) - 1, int(len(samples) * self.policy.percentile / 100 + 0.5) - 1))
+        return min(self.policy.max_delay_ms, max(self.policy.min_delay_ms, samples[index]))
+    
+    def invoke(
+        self,
+        primary: EventSource,
+        primary_model_id: str,
+        hedge: EventSource,
+        hedge_model_id: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Invoca con cobertura
+        
+        Args:
+            primary: Lanza la invocación principal y devuelve sus eventos
+            primary_model_id: Modelo de la invocación principal
+            hedge: Lanza la cobertura y devuelve sus eventos
+            hedge_model_id: Modelo de la cobertura
+        
+        Returns:
+            Tupla (body en formato InvokeModel del intento ganador, detalle de la cobertura)
+        
+        Raises:
+            Exception: El error del intento principal si ningún intento termina bien
+        """
+        finished = threading.Condition()
+        # Intentos en orden de finalización: gana el primero que termina bien
+        completed: List[Attempt] = []
+        
+        def on_done(attempt: Attempt) -> None:
+            self._on_attempt_done(attempt)
+            with finished:
+                completed.append(attempt)
+                finished.notify_all()
+        
+        delay_ms = self.delay_ms()
+        attempts = [Attempt("primary", primary_model_id)]
+        self._executor.submit(attempts[0].run, primary, on_done)
+        
+        # La cobertura solo se lanza si el principal no ha empezado a responder a tiempo
+        hedged = not attempts[0].first_token.wait(delay_ms / 1000) and self._allow_hedge()
+        if hedged:
+            attempts.append(Attempt("hedge", hedge_model_id))
+            self._executor.submit(attempts[1].run, hedge, on_done)
+        with self._lock:
+            self._stats["requests"] += 1
+            if not hedged:
+                self._hedged.append(False)
+        
+        with finished:
+            while not any(attempt.error is None for attempt in completed) and len(completed) < len(attempts):
+                finished.wait()
+            winner = next((attempt for attempt in completed if attempt.error is None), None)
+        
+        losers = [attempt for attempt in attempts if attempt is not winner]
+        with self._lock:
+            for attempt in losers:
+                attempt.cancelled.set()
+                # Si ya terminó, su gasto no se contabilizará al terminar
+                if attempt.recorded:
+                    self._add_extra_tokens(attempt)
+        for attempt in losers:
+            attempt.abort()
+        
+        if winner is None:
+            raise attempts[0].error or attempts[-1].error
+        
+        if winner.label == "hedge":
+            with self._lock:
+                self._stats["hedge_wins"] += 1
+        
+        details = {
+            "hedged": len(attempts) > 1,
+            "winner": winner.label,
+            "model_id": winner.model_id,
+            "hedge_delay_ms": round(delay_ms),
+            "first_token_ms": round(winner.first_token_ms) if winner.first_token_ms is not None else None
+        }
+        return winner.to_body(), details
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Contadores acumulados y retardo actual"""
+        delay_ms = self.delay_ms()
+        with self._lock:
+            stats = dict(self._stats)
+            hedged_in_window = sum(self._hedged)
+            window = len(self._hedged)
+        stats["hedge_rate"] = round(hedged_in_window / window, 4) if window else 0.0
+        stats["delay_ms"] = round(delay_ms)
+        return stats
+    
+    def _allow_hedge(self) -> bool:
+        """
+        Reserva una cobertura si no supera el tope sobre las últimas peticiones
+        
+        La comprobación y la reserva se hacen bajo el mismo lock para que
+        invocaciones concurrentes no superen el tope entre las dos.
+        """
+        with self._lock:
+            allowed = sum(self._hedged) + 1 <= self.policy.max_hedge_rate * (len(self._hedged) + 1)
+            if allowed:
+                self._hedged.append(True)
+                self._stats["hedged"] += 1
+            else:
+                self._stats["rate_capped"] += 1
+        return allowed
+    
+    def _on_attempt_done(self, attempt: Attempt) -> None:
+        """Registra el tiempo hasta el primer token y el gasto de los intentos perdedores"""
+        with self._lock:
+            attempt.recorded = True
+            if attempt.first_token_ms is not None:
+                self._ttft_ms.append(attempt.first_token_ms)
+            if attempt.cancelled.is_set():
+                self._add_extra_tokens(attempt)
+            elif attempt.label == "hedge" and attempt.error is not None:
+                self._stats["hedge_rejected"] += 1
+    
+    def _add_extra_tokens(self, attempt: Attempt) -> None:
+        # Llamar con self._lock adquirido
+        input_tokens, output_tokens = attempt.tokens_used
+        self._stats["extra_input_tokens"] += input_tokens
+        self._stats["extra_output_tokens"] += output_tokens
+
+
+_hedger: Optional[Hedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger() -> Hedger:
+    """Hedger compartido por todas las invocaciones del proceso"""
+    global _hedger
+    with _hedger_lock:
+        if _hedger is None:
+            _hedger = Hedger(HedgePolicy.from_env())
+        return _hedger
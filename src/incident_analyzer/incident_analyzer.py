@@ -3,14 +3,27 @@ Analizador de incidencias usando RAG con AWS Bedrock Knowledge Base
 """
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+import os
+import socket
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
 
-import boto3
 from botocore.exceptions import ClientError
 
+from shared.admission import PRIORITY_INTERACTIVE, AdmissionRejected, get_admission_controller
+from shared.aws_clients import get_client
+from hedging import Attempt, get_hedger
+from timing import StageTimer
+
 logger = logging.getLogger(__name__)
 
+# Caracteres por token para estimar la reserva del control de admisión
+CHARS_PER_TOKEN = 4
+
+# Niveles de la cascada de modelos
+TIER_FAST = "fast"
+TIER_LARGE = "large"
+
 
 @dataclass
 class IncidentAnalysisRequest:
@@ -20,6 +33,7 @@ class IncidentAnalysisRequest:
     max_similar_incidents: int = 3
     include_attachments: bool = True
     optimize_query: bool = False
+    priority: int = PRIORITY_INTERACTIVE
 
 
 @dataclass
@@ -47,6 +61,31 @@ class IncidentAnalysisResponse:
     output_tokens: int
     original_query: str = ""
     optimized_query: str = ""
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    invocation: Dict[str, Any] = field(default_factory=dict)
+    tier: str = TIER_LARGE
+
+
+@dataclass
+class CascadePolicy:
+    """
+    Cascada de modelos: el rápido responde los casos casi idénticos a uno
+    histórico y el grande el resto o cuando el rápido no está seguro
+    """
+    enabled: bool = False
+    fast_model_id: str = "eu.anthropic.claude-haiku-4-5-20251001-v1:0"
+    min_similarity: float = 0.9
+    min_confidence: float = 0.7
+    
+    @classmethod
+    def from_env(cls) -> "CascadePolicy":
+        """Lee la configuración de las variables BEDROCK_CASCADE_*"""
+        return cls(
+            enabled=os.getenv("BEDROCK_CASCADE_ENABLED", "false").lower() == "true",
+            fast_model_id=os.getenv("BEDROCK_CASCADE_FAST_MODEL_ID", cls.fast_model_id),
+            min_similarity=float(os.getenv("BEDROCK_CASCADE_MIN_SIMILARITY", str(cls.min_similarity))),
+            min_confidence=float(os.getenv("BEDROCK_CASCADE_MIN_CONFIDENCE", str(cls.min_confidence)))
+        )
 
 
 class IncidentAnalyzer:
@@ -57,7 +96,9 @@ class IncidentAnalyzer:
         knowledge_base_id: str,
         s3_bucket: str,
         model_id: str = "eu.anthropic.claude-sonnet-4-5-20250929-v1:0",
-        region: str = "eu-west-1"
+        region: str = "eu-west-1",
+        enable_timings: bool = True,
+        cascade: Optional[CascadePolicy] = None
     ):
         """
         Inicializa el analizador de incidencias
@@ -65,18 +106,28 @@ class IncidentAnalyzer:
         Args:
             knowledge_base_id: ID de la Knowledge Base en Bedrock
             s3_bucket: Bucket S3 con archivos de incidencias
-            model_id: ID del modelo Claude a usar
+            model_id: ID del modelo Claude a usar (nivel grande de la cascada)
             region: Región de AWS
+            enable_timings: Medir la latencia de cada etapa del análisis
+            cascade: Cascada de modelos (None = variables BEDROCK_CASCADE_*)
         """
         self.knowledge_base_id = knowledge_base_id
         self.s3_bucket = s3_bucket
         self.model_id = model_id
         self.region = region
+        self.enable_timings = enable_timings
+        self.cascade = cascade or CascadePolicy.from_env()
+        
+        # Clientes AWS compartidos: se reutilizan (con sus conexiones) entre invocaciones del contenedor
+        self.bedrock_agent = get_client("bedrock-agent-runtime", region)
+        self.bedrock_runtime = get_client("bedrock-runtime", region)
+        self.s3_client = get_client("s3", region)
+        
+        # Límites de peticiones/tokens por minuto y concurrencia hacia Bedrock, compartidos por el proceso
+        self.admission = get_admission_controller()
         
-        # Clientes AWS
-        self.bedrock_agent = boto3.client("bedrock-agent-runtime", region_name=region)
-        self.bedrock_runtime = boto3.client("bedrock-runtime", region_name=region)
-        self.s3_client = boto3.client("s3", region_name=region)
+        # Coberturas del análisis contra un modelo o región alternativos (BEDROCK_HEDGE_*)
+        self.hedger = get_hedger()
         
         logger.info(f"IncidentAnalyzer inicializado - KB: {knowledge_base_id}, Modelo: {model_id}")
     
@@ -90,47 +141,67 @@ class IncidentAnalyzer:
         Returns:
             Respuesta con diagnóstico y recomendaciones
         """
+        timer = StageTimer(enabled=self.enable_timings)
+        
         try:
             logger.info(f"Iniciando análisis de incidencia: {request.incident_id or 'nueva'}")
             
             # 1. Normalizar/mejorar la consulta del usuario (si está habilitado)
             if request.optimize_query:
-                optimized_query = self._optimize_query(request.incident_description)
+                with timer.stage("optimize_query"):
+                    optimized_query = self._optimize_query(request.incident_description, request.priority)
                 logger.info(f"Consulta optimizada: {optimized_query}")
             else:
                 optimized_query = request.incident_description
                 logger.info("Optimización de consulta deshabilitada, usando consulta original")
             
             # 2. Buscar incidencias similares en la Knowledge Base usando la consulta (optimizada o no)
-            similar_incidents = self._search_similar_incidents(
-                optimized_query,
-                max_results=min(request.max_similar_incidents, 3)  # Limitar a máximo 3 para mejor rendimiento
-            )
+            with timer.stage("retrieval"):
+                similar_incidents = self._search_similar_incidents(
+                    optimized_query,
+                    max_results=min(request.max_similar_incidents, 3)  # Limitar a máximo 3 para mejor rendimiento
+                )
             
             logger.info(f"Encontradas {len(similar_incidents)} incidencias similares")
             
             # 3. Recuperar archivos adjuntos de S3 si es necesario
             if request.include_attachments:
-                for incident in similar_incidents:
-                    incident.attachments = self._get_incident_attachments(incident.incident_id)
+                with timer.stage("attachments"):
+                    for incident in similar_incidents:
+                        incident.attachments = self._get_incident_attachments(incident.incident_id)
             
             # 4. Construir contexto para Claude
-            context = self._build_analysis_context(request, similar_incidents)
-            
-            # 5. Invocar Claude para análisis
-            analysis_result = self._invoke_claude_analysis(context)
+            with timer.stage("context_build"):
+                context = self._build_analysis_context(request, similar_incidents)
+            
+            # 5. Con una incidencia casi idéntica, intentar primero con el modelo rápido
+            response = None
+            escalation = None
+            top_score = max((incident.similarity_score for incident in similar_incidents), default=0.0)
+            if self.cascade.enabled and top_score >= self.cascade.min_similarity:
+                response, escalation = self._try_fast_analysis(context, similar_incidents, request.priority, timer)
+            
+            # 6. Invocar Claude (modelo grande) para análisis y parsear la respuesta
+            if response is None:
+                with timer.stage("claude_invoke"):
+                    analysis_result = self._invoke_claude_analysis(context, request.priority)
+                
+                with timer.stage("parse"):
+                    response = self._parse_analysis_response(
+                        analysis_result,
+                        similar_incidents
+                    )
+                if escalation:
+                    response.invocation["escalated_from"] = escalation
             
-            # 6. Parsear y estructurar respuesta
-            response = self._parse_analysis_response(
-                analysis_result,
-                similar_incidents
-            )
+            response.invocation["top_similarity_score"] = top_score
             
             # 7. Agregar consultas original y optimizada a la respuesta
             response.original_query = request.incident_description
             response.optimized_query = optimized_query
+            response.timings_ms = timer.finish()
             
-            logger.info(f"Análisis completado - Confianza: {response.confidence_score:.2f}")
+            logger.info(f"Análisis completado - Nivel: {response.tier}, Confianza: {response.confidence_score:.2f}")
             
             return response
             
@@ -138,12 +209,13 @@ class IncidentAnalyzer:
             logger.error(f"Error analizando incidencia: {str(e)}", exc_info=True)
             raise
     
-    def _optimize_query(self, user_query: str) -> str:
+    def _optimize_query(self, user_query: str, priority: int = PRIORITY_INTERACTIVE) -> str:
         """
         Optimiza la consulta del usuario antes de buscar en la Knowledge Base
         
         Args:
             user_query: Consulta original del usuario
+            priority: Prioridad en el control de admisión
             
         Returns:
             Consulta optimizada para búsqueda
@@ -224,13 +296,7 @@ Responde ÚNICAMENTE con la consulta optimizada, sin explicaciones adicionales n
             }
             
             # Invocar modelo
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
-            
-            # Parsear respuesta
-            response_body = json.loads(response["body"].read())
+            response_body = self._invoke_model(body, priority)
             
             # Extraer texto optimizado
             optimized_query = ""
@@ -249,11 +315,156 @@ Responde ÚNICAMENTE con la consulta optimizada, sin explicaciones adicionales n
             logger.info(f"Consulta optimizada exitosamente: '{optimized_query}'")
             return optimized_query
             
+        except AdmissionRejected:
+            # Sin turno para Bedrock tampoco lo habrá para el análisis: se rechaza ya
+            raise
         except Exception as e:
             logger.error(f"Error optimizando consulta: {str(e)}")
             logger.warning("Usando consulta original debido al error")
             return user_query
     
+    def _invoke_model(
+        self,
+        body: Dict[str, Any],
+        priority: int = PRIORITY_INTERACTIVE,
+        hedge: bool = False,
+        model_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Invoca el modelo y devuelve el body de la respuesta
+        
+        Antes de invocar se pide turno al control de admisión con los tokens
+        estimados del prompt más max_tokens. Los reintentos ante throttling
+        los hace el cliente (modo adaptive).
+        
+        Args:
+            body: Body de la petición en formato Claude
+            priority: Prioridad en el control de admisión (menor = antes)
+            hedge: Cubrir la invocación si tarda (solo si BEDROCK_HEDGE_ENABLED)
+            model_id: Modelo a invocar (None = el del analizador)
+            
+        Returns:
+            Respuesta de Claude, con el "model_id" invocado (e "invocation" si se ha cubierto)
+            
+        Raises:
+            AdmissionRejected: Si el control de admisión rechaza la petición (429)
+        """
+        prompt_chars = sum(
+            len(item.get("text", ""))
+            for message in body["messages"]
+            for item in message["content"]
+        )
+        estimated_tokens = prompt_chars // CHARS_PER_TOKEN + body["max_tokens"]
+        
+        if hedge and self.hedger.policy.enabled:
+            return self._invoke_model_hedged(body, estimated_tokens, priority)
+        
+        model_id = model_id or self.model_id
+        with self.admission.acquire(estimated_tokens, priority) as admission:
+            response = self.bedrock_runtime.invoke_model(
+                modelId=model_id,
+                body=json.dumps(body)
+            )
+            response_body = json.loads(response["body"].read())
+            usage = response_body.get("usage", {})
+            admission.settle(usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+        
+        retries = response.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        if retries:
+            logger.warning(f"Invocación de {model_id} completada tras {retries} reintentos")
+        if admission.waited_ms >= 1:
+            logger.info(f"Invocación de {model_id} admitida tras {admission.waited_ms:.0f} ms en cola")
+        
+        response_body["model_id"] = model_id
+        return response_body
+    
+    def _invoke_model_hedged(self, body: Dict[str, Any], estimated_tokens: int, priority: int) -> Dict[str, Any]:
+        """
+        Invoca en streaming y, si no llega el primer token a tiempo, lanza una
+        cobertura contra el modelo/región de BEDROCK_HEDGE_*
+        
+        La cobertura no espera turno en el control de admisión: si no hay
+        capacidad libre se descarta y se sigue esperando a la principal.
+        
+        Args:
+            body: Body de la petición en formato Claude
+            estimated_tokens: Tokens estimados para el control de admisión
+            priority: Prioridad en el control de admisión
+            
+        Returns:
+            Respuesta del intento ganador, con "model_id" e "invocation"
+        """
+        policy = self.hedger.policy
+        hedge_model_id = policy.model_id or self.model_id
+        hedge_client = get_client("bedrock-runtime", policy.region) if policy.region else self.bedrock_runtime
+        
+        response_body, details = self.hedger.invoke(
+            lambda attempt: self._stream_events(
+                self.bedrock_runtime, self.model_id, body, estimated_tokens, priority, attempt=attempt
+            ),
+            self.model_id,
+            lambda attempt: self._stream_events(
+                hedge_client, hedge_model_id, body, estimated_tokens, priority, 0, attempt=attempt
+            ),
+            hedge_model_id
+        )
+        details["region"] = (policy.region or self.region) if details["winner"] == "hedge" else self.region
+        if details["winner"] == "hedge":
+            logger.warning(
+                f"La cobertura ({hedge_model_id}, {details['region']}) ganó a la invocación principal "
+                f"tras {details['hedge_delay_ms']} ms sin primer token"
+            )
+        response_body["invocation"] = details
+        return response_body
+    
+    def _stream_events(
+        self,
+        client: Any,
+        model_id: str,
+        body: Dict[str, Any],
+        estimated_tokens: int,
+        priority: int,
+        max_wait_seconds: Optional[float] = None,
+        attempt: Optional[Attempt] = None
+    ):
+        """
+        Eventos de InvokeModelWithResponseStream con su turno de admisión
+        
+        El turno se pide al empezar a iterar y se libera al agotar o cerrar
+        el generador, así que cancelar un intento libera también su reserva.
+        Con attempt, el hedger puede cortar la conexión aunque el stream
+        siga esperando su primer evento.
+        
+        Args:
+            client: Cliente de bedrock-runtime
+            model_id: ID del modelo
+            body: Body de la petición en formato Claude
+            estimated_tokens: Tokens estimados para el control de admisión
+            priority: Prioridad en el control de admisión
+            max_wait_seconds: Espera máxima de admisión (None = la del controlador)
+            attempt: Intento del hedger al que registrar el corte del stream
+            
+        Yields:
+            Eventos del stream
+        """
+        with self.admission.acquire(estimated_tokens, priority, max_wait_seconds) as admission:
+            response = client.invoke_model_with_response_stream(modelId=model_id, body=json.dumps(body))
+            events = response["body"]
+            if attempt is not None:
+                attempt.set_abort(lambda: _shutdown_event_stream(events))
+            try:
+                for event in events:
+                    chunk = event.get("chunk")
+                    # Solo se decodifica el último evento, que trae el consumo real
+                    if chunk and b'"message_stop"' in chunk["bytes"]:
+                        metrics = json.loads(chunk["bytes"]).get("amazon-bedrock-invocationMetrics", {})
+                        admission.settle(metrics.get("inputTokenCount", 0) + metrics.get("outputTokenCount", 0))
+                    yield event
+            finally:
+                close = getattr(events, "close", None)
+                if close is not None:
+                    close()
+    
     def _search_similar_incidents(
         self,
         query: str,
@@ -411,12 +622,76 @@ Responde ÚNICAMENTE con la consulta optimizada, sin explicaciones adicionales n
         
         return "\n".join(context_parts)
     
-    def _invoke_claude_analysis(self, context: str) -> Dict[str, Any]:
+    def _try_fast_analysis(
+        self,
+        context: str,
+        similar_incidents: List[SimilarIncident],
+        priority: int,
+        timer: StageTimer
+    ) -> Tuple[Optional[IncidentAnalysisResponse], Optional[Dict[str, Any]]]:
+        """
+        Analiza con el modelo rápido de la cascada
+        
+        Args:
+            context: Contexto con la incidencia y casos similares
+            similar_incidents: Incidencias similares encontradas
+            priority: Prioridad en el control de admisión
+            timer: Temporizador del análisis
+            
+        Returns:
+            Tupla (respuesta si el modelo rápido está suficientemente seguro,
+            detalle del intento si hay que escalar al modelo grande)
+            
+        Raises:
+            AdmissionRejected: Si el control de admisión rechaza la petición (429)
+        """
+        model_id = self.cascade.fast_model_id
+        try:
+            with timer.stage("fast_invoke"):
+                analysis_result = self._invoke_claude_analysis(context, priority, model_id=model_id)
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            logger.warning(f"Error en el modelo rápido {model_id}, escalando al modelo grande: {str(e)}")
+            return None, {"model_id": model_id, "reason": "error"}
+        
+        # Sin un score numérico, la respuesta del modelo rápido cuenta como poco segura
+        with timer.stage("parse"):
+            response = self._parse_analysis_response(analysis_result, similar_incidents, default_confidence=0.0)
+        
+        if response.confidence_score >= self.cascade.min_confidence:
+            response.tier = TIER_FAST
+            return response, None
+        
+        logger.info(
+            f"Confianza del modelo rápido {response.confidence_score:.2f} < {self.cascade.min_confidence:.2f}, "
+            f"escalando al modelo grande"
+        )
+        # Los tokens del intento rápido también se facturan
+        return None, {
+            "model_id": model_id,
+            "reason": "low_confidence",
+            "confidence_score": response.confidence_score,
+            "input_tokens": response.input_tokens,
+            "output_tokens": response.output_tokens
+        }
+    
+    def _invoke_claude_analysis(
+        self,
+        context: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        model_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Invoca Claude para realizar el análisis
         
+        Solo se cubre (hedging) la invocación al modelo principal: el modelo
+        y región alternativos de BEDROCK_HEDGE_* son equivalentes a él.
+        
         Args:
             context: Contexto con la incidencia y casos similares
+            priority: Prioridad en el control de admisión
+            model_id: Modelo a invocar (None = el del analizador)
             
         Returns:
             Respuesta de Claude
@@ -476,13 +751,7 @@ Proporciona tu análisis en formato JSON como se especifica arriba."""
             }
             
             # Invocar modelo
-            response = self.bedrock_runtime.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
-            
-            # Parsear respuesta
-            response_body = json.loads(response["body"].read())
+            response_body = self._invoke_model(body, priority, hedge=model_id is None, model_id=model_id)
             
             logger.info("Análisis de Claude completado")
             
@@ -495,7 +764,8 @@ Proporciona tu análisis en formato JSON como se especifica arriba."""
     def _parse_analysis_response(
         self,
         claude_response: Dict[str, Any],
-        similar_incidents: List[SimilarIncident]
+        similar_incidents: List[SimilarIncident],
+        default_confidence: float = 0.5
     ) -> IncidentAnalysisResponse:
         """
         Parsea la respuesta de Claude y construye el objeto de respuesta
@@ -503,10 +773,14 @@ Proporciona tu análisis en formato JSON como se especifica arriba."""
         Args:
             claude_response: Respuesta raw de Claude
             similar_incidents: Incidencias similares encontradas
+            default_confidence: Confianza si el modelo no devuelve un número
             
         Returns:
             Respuesta estructurada del análisis
         """
+        # Tokens facturados aunque la respuesta no se pueda parsear
+        usage = claude_response.get("usage", {})
+        
         try:
             # Extraer texto de la respuesta
             content = claude_response.get("content", [])
@@ -527,19 +801,17 @@ Proporciona tu análisis en formato JSON como se especifica arriba."""
             else:
                 raise ValueError("No se encontró JSON válido en la respuesta de Claude")
             
-            # Extraer tokens
-            usage = claude_response.get("usage", {})
-            
             # Construir respuesta
             response = IncidentAnalysisResponse(
                 diagnosis=analysis_data.get("diagnosis", "No se pudo determinar"),
                 root_cause=analysis_data.get("root_cause", "No se pudo determinar"),
                 recommended_actions=analysis_data.get("recommended_actions", []),
                 similar_incidents=similar_incidents,
-                confidence_score=analysis_data.get("confidence_score", 0.5),
-                model_id=self.model_id,
+                confidence_score=_coerce_confidence(analysis_data.get("confidence_score"), default_confidence),
+                model_id=claude_response.get("model_id", self.model_id),
                 input_tokens=usage.get("input_tokens", 0),
-                output_tokens=usage.get("output_tokens", 0)
+                output_tokens=usage.get("output_tokens", 0),
+                invocation=claude_response.get("invocation", {})
             )
             
             return response
@@ -555,7 +827,44 @@ Proporciona tu análisis en formato JSON como se especifica arriba."""
                 recommended_actions=["Revisar logs del sistema", "Contactar soporte técnico"],
                 similar_incidents=similar_incidents,
                 confidence_score=0.0,
-                model_id=self.model_id,
+                model_id=claude_response.get("model_id", self.model_id),
                 input_tokens=usage.get("input_tokens", 0),
-                output_tokens=usage.get("output_tokens", 0)
+                output_tokens=usage.get("output_tokens", 0),
+                invocation=claude_response.get("invocation", {})
             )
+
+
+def _shutdown_event_stream(events: Any) -> None:
+    """
+    Corta desde otro hilo la conexión de un EventStream de botocore
+    
+    close() no despierta al hilo bloqueado leyendo el socket (espera a que
+    termine su lectura), así que se apaga el socket: la lectura falla en el
+    acto y el generador cierra el stream y libera su turno de admisión.
+    
+    Args:
+        events: EventStream de la respuesta (sin conexión accesible no hace nada)
+    """
+    connection = getattr(getattr(events, "_raw_stream", None), "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        sock.shutdown(socket.SHUT_RDWR)
+
+
+def _coerce_confidence(value: Any, default: float) -> float:
+    """
+    Convierte el confidence_score devuelto por el modelo a número
+    
+    Args:
+        value: Valor del JSON (número, texto como "0.8" o ausente)
+        default: Valor si no es un número
+    
+    Returns:
+        Confianza como float
+    """
+    if isinstance(value, bool):
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
@@ -12,6 +12,13 @@ from incident_analyzer import (
     IncidentAnalysisResponse,
     SimilarIncident
 )
+from shared.admission import AdmissionRejected, parse_priority
+from shared.aws_clients import metrics_snapshot
+from hedging import get_hedger
+from timing import emit_emf
+from responses import create_response, create_cors_response
+# Se mantiene para despliegues que aún apuntan a lambda_handler.health_check_handler
+from health import health_check_handler
 
 # Configurar logging
 logger = logging.getLogger()
@@ -57,6 +64,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "eu.anthropic.claude-sonnet-4-5-20250929-v1:0"
         )
         region = os.getenv("AWS_REGION", "eu-west-1")
+        enable_timings = os.getenv("ENABLE_STAGE_TIMINGS", "true").lower() == "true"
         
         if not knowledge_base_id:
             return create_response(500, {
@@ -74,7 +82,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             incident_id=body.get("incident_id"),
             max_similar_incidents=body.get("max_similar_incidents", 5),
             include_attachments=body.get("include_attachments", True),
-            optimize_query=body.get("optimize_query", True)
+            optimize_query=body.get("optimize_query", True),
+            priority=parse_priority(body.get("priority"))
         )
         
         logger.info(f"Analizando incidencia: {analysis_request.incident_id or 'nueva'}")
@@ -84,7 +93,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             knowledge_base_id=knowledge_base_id,
             s3_bucket=s3_bucket,
             model_id=model_id,
-            region=region
+            region=region,
+            enable_timings=enable_timings
         )
         
         # Realizar análisis
@@ -112,12 +122,20 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             ],
             "model_info": {
                 "model_id": response.model_id,
+                "tier": response.tier,
                 "input_tokens": response.input_tokens,
                 "output_tokens": response.output_tokens,
                 "total_tokens": response.input_tokens + response.output_tokens
             }
         }
         
+        if response.invocation:
+            response_data["model_info"]["invocation"] = response.invocation
+        
+        if response.timings_ms:
+            response_data["timings_ms"] = response.timings_ms
+            emit_stage_metrics(response, context)
+        
         logger.info(
             f"Análisis completado - Confianza: {response.confidence_score:.2f}, "
             f"Tokens: {response.input_tokens + response.output_tokens}"
@@ -125,6 +143,14 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         return create_response(200, response_data)
         
+    except AdmissionRejected as e:
+        logger.warning(str(e))
+        return create_response(
+            e.status_code,
+            {"error": str(e), "retry_after_seconds": e.retry_after_seconds},
+            headers={"Retry-After": str(e.retry_after_seconds)}
+        )
+        
     except ValueError as e:
         logger.error(f"Error de validación: {str(e)}")
         return create_response(400, {"error": str(e)})
@@ -134,89 +160,28 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return create_response(500, {"error": f"Error interno: {str(e)}"})
 
 
-def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Crea una respuesta HTTP formateada para API Gateway
-    
-    Args:
-        status_code: Código de estado HTTP
-        body: Cuerpo de la respuesta
-        
-    Returns:
-        Respuesta formateada
-    """
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,x-api-key",
-            "Access-Control-Allow-Methods": "POST,GET,OPTIONS",
-            "Access-Control-Max-Age": "600"
-        },
-        "body": json.dumps(body, ensure_ascii=False, default=str)
-    }
-
-
-def create_cors_response() -> Dict[str, Any]:
-    """
-    Crea una respuesta CORS para peticiones OPTIONS (preflight)
-    
-    Returns:
-        Respuesta CORS formateada
-    """
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,X-Amz-Date,Authorization,X-Api-Key,x-api-key",
-            "Access-Control-Allow-Methods": "POST,GET,OPTIONS",
-            "Access-Control-Max-Age": "600"
-        },
-        "body": json.dumps({"message": "CORS preflight response"})
-    }
-
-
-def health_check_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+def emit_stage_metrics(response: IncidentAnalysisResponse, context: Any) -> None:
     """
-    Handler para health check
+    Publica los tiempos por etapa como métricas EMF en CloudWatch Logs
     
     Args:
-        event: Evento de Lambda
+        response: Respuesta del análisis con los tiempos por etapa
         context: Contexto de Lambda
-        
-    Returns:
-        Respuesta de health check
     """
-    # Manejar peticiones OPTIONS (CORS preflight)
-    http_method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
-    if http_method == "OPTIONS":
-        return create_cors_response()
-    
-    # Verificar configuración
-    knowledge_base_id = os.getenv("KNOWLEDGE_BASE_ID")
-    s3_bucket = os.getenv("S3_BUCKET")
-    
-    status = "healthy"
-    issues = []
-    
-    if not knowledge_base_id:
-        status = "degraded"
-        issues.append("KNOWLEDGE_BASE_ID no configurado")
-    
-    if not s3_bucket:
-        status = "degraded"
-        issues.append("S3_BUCKET no configurado")
-    
-    return create_response(200, {
-        "status": status,
-        "service": "incident-analyzer",
-        "version": "1.0.0",
-        "configuration": {
-            "knowledge_base_configured": bool(knowledge_base_id),
-            "s3_bucket_configured": bool(s3_bucket),
-            "model_id": os.getenv("BEDROCK_MODEL_ID", "default"),
-            "region": os.getenv("AWS_REGION", "eu-west-1")
-        },
-        "issues": issues if issues else None
-    })
+    emit_emf(
+        response.timings_ms,
+        namespace=os.getenv("METRICS_NAMESPACE", "IncidentAnalyzer"),
+        dimensions={"Service": "incident-analyzer"},
+        properties={
+            "request_id": getattr(context, "aws_request_id", None),
+            "model_id": response.model_id,
+            "tier": response.tier,
+            "input_tokens": response.input_tokens,
+            "output_tokens": response.output_tokens,
+            # Acumuladas desde el arranque del contenedor: reintentos, throttling, pool
+            "aws_clients": metrics_snapshot(),
+            "invocation": response.invocation,
+            # Coberturas lanzadas, ganadas y tokens gastados por los intentos perdedores
+            "hedging": get_hedger().snapshot()
+        }
+    )
@@ -0,0 +1,126 @@
+"""
+Instrumentación de latencia por etapas para el analizador de incidencias
+"""
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+# Contexto reutilizable cuando la instrumentación está deshabilitada
+_NOOP_STAGE = nullcontext()
+
+
+class StageTimer:
+    """Mide la duración de cada etapa de un análisis en milisegundos"""
+    
+    def __init__(self, enabled: bool = True):
+        """
+        Inicializa el temporizador
+        
+        Args:
+            enabled: Si es False, las etapas no se miden y el coste es despreciable
+        """
+        self.enabled = enabled
+        self.timings_ms: Dict[str, float] = {}
+        self._start = time.perf_counter() if enabled else 0.0
+    
+    def stage(self, name: str):
+        """
+        Devuelve un context manager que mide la etapa indicada
+        
+        Si la misma etapa se mide varias veces, los tiempos se acumulan.
+        
+        Args:
+            name: Nombre de la etapa (ej: "retrieval")
+        
+        Returns:
+            Context manager de la etapa
+        """
+        if not self.enabled:
+            return _NOOP_STAGE
+        return self._measure(name)
+    
+    @contextmanager
+    def _measure(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.timings_ms[name] = round(self.timings_ms.get(name, 0.0) + elapsed_ms, 2)
+    
+    def finish(self) -> Dict[str, float]:
+        """
+        Cierra la medición registrando el tiempo total
+        
+        Returns:
+            Tiempos por etapa en milisegundos (vacío si está deshabilitado)
+        """
+        if self.enabled:
+            self.timings_ms["total"] = round((time.perf_counter() - self._start) * 1000, 2)
+        return dict(self.timings_ms)
+
+
+def timings_to_emf(
+    timings_ms: Dict[str, float],
+    namespace: str,
+    dimensions: Optional[Dict[str, str]] = None,
+    properties: Optional[Dict[str, object]] = None
+) -> Optional[str]:
+    """
+    Serializa tiempos por etapa en CloudWatch Embedded Metric Format
+    
+    Args:
+        timings_ms: Tiempos por etapa en milisegundos
+        namespace: Namespace de CloudWatch
+        dimensions: Dimensiones de las métricas
+        properties: Propiedades adicionales (no métricas) del registro
+    
+    Returns:
+        Línea JSON en formato EMF, o None si no hay tiempos
+    """
+    if not timings_ms:
+        return None
+    
+    dimensions = dimensions or {}
+    metrics: List[Dict[str, str]] = [
+        {"Name": f"{name}_ms", "Unit": "Milliseconds"}
+        for name in timings_ms
+    ]
+    
+    record: Dict[str, object] = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [list(dimensions.keys())],
+                    "Metrics": metrics
+                }
+            ]
+        }
+    }
+    record.update(dimensions)
+    if properties:
+        record.update(properties)
+    for name, value in timings_ms.items():
+        record[f"{name}_ms"] = value
+    
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+def emit_emf(
+    timings_ms: Dict[str, float],
+    namespace: str,
+    dimensions: Optional[Dict[str, str]] = None,
+    properties: Optional[Dict[str, object]] = None
+) -> None:
+    """
+    Escribe los tiempos por etapa en stdout en formato EMF
+    
+    En Lambda, CloudWatch Logs extrae las métricas de estas líneas
+    sin necesidad de llamar a PutMetricData.
+    """
+    line = timings_to_emf(timings_ms, namespace, dimensions, properties)
+    if line:
+        print(line, flush=True)
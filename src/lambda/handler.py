@@ -6,9 +6,12 @@ import logging
 import os
 from typing import Dict, Any
 
+from ..shared.admission import AdmissionRejected, parse_priority
 from ..shared.models import QueryRequest, QueryResponse, BedrockConfig
-from ..shared.document_processor import DocumentProcessor
-from .bedrock_client import BedrockClient
+from ..shared.bedrock_client import BedrockClient
+from .responses import create_response
+# Se mantiene para despliegues que aún apuntan a lambda.handler.health_check_handler
+from .health import health_check_handler
 
 # Configurar logging
 logger = logging.getLogger()
@@ -38,6 +41,10 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         # Validar request
         if "prompt" not in body:
             return create_response(400, {"error": "El campo 'prompt' es requerido"})
+        try:
+            priority = parse_priority(body.get("priority"))
+        except ValueError as e:
+            return create_response(400, {"error": str(e)})
         
         # Crear configuración de Bedrock
         config = BedrockConfig(
@@ -47,13 +54,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 "eu.anthropic.claude-sonnet-4-5-20250929-v1:0"
             ),
             max_tokens=body.get("max_tokens", int(os.getenv("BEDROCK_MAX_TOKENS", "4096"))),
-            temperature=body.get("temperature", float(os.getenv("BEDROCK_TEMPERATURE", "0.7")))
+            temperature=body.get("temperature", float(os.getenv("BEDROCK_TEMPERATURE", "0.7"))),
+            max_input_tokens=int(os.getenv("BEDROCK_MAX_INPUT_TOKENS", "0"))
         )
         
         # Procesar documentos si existen
         documents = []
         if "documents" in body:
-            processor = DocumentProcessor()
             for doc_data in body["documents"]:
                 # Los documentos deben venir con base64_content o content ya procesados
                 # desde el cliente, ya que Lambda no tiene acceso al filesystem local
@@ -80,9 +87,19 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         logger.info(f"Procesando consulta con {len(documents)} documentos")
         
-        # Invocar Bedrock
+        # Invocar Bedrock. El runtime de Python no puede devolver la respuesta por
+        # partes, así que el streaming solo sirve para medir el tiempo hasta el
+        # primer token (a costa de mantener la reserva de admisión más tiempo)
         client = BedrockClient(config)
-        response = client.invoke_model(request)
+        measure_first_token = body.get(
+            "measure_first_token",
+            os.getenv("BEDROCK_MEASURE_FIRST_TOKEN", "false").lower() == "true"
+        )
+        if measure_first_token:
+            response = client.invoke_model_stream(request, priority).collect()
+            logger.info(f"Primer token en {response.metadata.get('first_token_ms')} ms")
+        else:
+            response = client.invoke_model(request, priority)
         
         # Preparar respuesta
         response_data = {
@@ -98,47 +115,13 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         return create_response(200, response_data)
         
+    except AdmissionRejected as e:
+        return create_response(
+            e.status_code,
+            {"error": str(e), "retry_after_seconds": e.retry_after_seconds},
+            headers={"Retry-After": str(e.retry_after_seconds)}
+        )
+        
     except Exception as e:
         logger.error(f"Error procesando consulta: {str(e)}", exc_info=True)
         return create_response(500, {"error": str(e)})
-
-
-def create_response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Crea una respuesta HTTP formateada para API Gateway
-    
-    Args:
-        status_code: Código de estado HTTP
-        body: Cuerpo de la respuesta
-        
-    Returns:
-        Respuesta formateada
-    """
-    return {
-        "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Allow-Methods": "POST, OPTIONS"
-        },
-        "body": json.dumps(body, ensure_ascii=False)
-    }
-
-
-def health_check_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    """
-    Handler para health check
-    
-    Args:
-        event: Evento de Lambda
-        context: Contexto de Lambda
-        
-    Returns:
-        Respuesta de health check
-    """
-    return create_response(200, {
-        "status": "healthy",
-        "service": "consulta-rag-bedrock",
-        "version": "1.0.0"
-    })
@@ -0,0 +1,115 @@
+"""
+Health check ligero para la Lambda de consultas RAG
+
+Solo usa la librería estándar para que el cold start de la sonda no cargue
+boto3, pydantic ni el procesador de documentos. El modo "deep" comprueba que
+el endpoint regional de Bedrock es alcanzable (TCP + TLS) y cachea el
+resultado durante HEALTH_CACHE_SECONDS.
+"""
+import os
+import socket
+import ssl
+import time
+from typing import Dict, Any
+
+from .responses import create_response
+
+# Resultado del último chequeo profundo, reutilizado entre invocaciones del mismo contenedor
+_deep_check_cache: Dict[str, Any] = {"expires_at": 0.0, "result": None}
+
+
+def check_endpoint(host: str, timeout: float, port: int = 443) -> Dict[str, Any]:
+    """
+    Comprueba que un endpoint HTTPS acepta conexiones y completa el handshake TLS
+    
+    Args:
+        host: Nombre del host
+        timeout: Timeout total en segundos
+        port: Puerto TCP
+        
+    Returns:
+        Diccionario con reachable, latency_ms y error (si lo hay)
+    """
+    start = time.perf_counter()
+    try:
+        context = ssl.create_default_context()
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            with context.wrap_socket(sock, server_hostname=host):
+                pass
+        return {
+            "host": host,
+            "reachable": True,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1)
+        }
+    except (OSError, ssl.SSLError) as e:
+        return {
+            "host": host,
+            "reachable": False,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "error": str(e) or e.__class__.__name__
+        }
+
+
+def run_deep_check(region: str, timeout: float, cache_seconds: float) -> Dict[str, Any]:
+    """
+    Comprueba la conectividad con Bedrock Runtime
+    
+    Args:
+        region: Región de AWS
+        timeout: Timeout en segundos
+        cache_seconds: Segundos durante los que se reutiliza el resultado
+        
+    Returns:
+        Resultado del chequeo, con cached=True si procede de la caché
+    """
+    now = time.time()
+    cached = _deep_check_cache["result"]
+    if cached is not None and now < _deep_check_cache["expires_at"] and cached["region"] == region:
+        return dict(cached, cached=True)
+    
+    result = {
+        "region": region,
+        "checked_at": int(now),
+        "dependencies": {
+            "bedrock": check_endpoint(f"bedrock-runtime.{region}.amazonaws.com", timeout)
+        },
+        "cached": False
+    }
+    
+    _deep_check_cache["result"] = result
+    _deep_check_cache["expires_at"] = now + cache_seconds
+    
+    return result
+
+
+def health_check_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Handler para health check
+    
+    Args:
+        event: Evento de Lambda (admite ?deep=true)
+        context: Contexto de Lambda
+        
+    Returns:
+        Respuesta de health check
+    """
+    body = {
+        "status": "healthy",
+        "service": "consulta-rag-bedrock",
+        "version": "1.0.0"
+    }
+    
+    params = event.get("queryStringParameters") or {}
+    deep = str(params.get("deep", os.getenv("HEALTH_DEEP_CHECK", "false"))).lower() in ("1", "true", "yes")
+    
+    if deep:
+        result = run_deep_check(
+            os.getenv("AWS_REGION", "eu-west-1"),
+            timeout=float(os.getenv("HEALTH_CHECK_TIMEOUT", "2")),
+            cache_seconds=float(os.getenv("HEALTH_CACHE_SECONDS", "30"))
+        )
+        if not all(dependency["reachable"] for dependency in result["dependencies"].values()):
+            body["status"] = "degraded"
+        body["deep_check"] = result
+    
+    return create_response(200, body)
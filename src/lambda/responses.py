@@ -0,0 +1,34 @@
+"""
+Respuestas HTTP para API Gateway (solo librería estándar)
+"""
+import json
+from typing import Dict, Any, Optional
+
+
+def create_response(
+    status_code: int,
+    body: Dict[str, Any],
+    headers: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Crea una respuesta HTTP formateada para API Gateway
+    
+    Args:
+        status_code: Código de estado HTTP
+        body: Cuerpo de la respuesta
+        headers: Cabeceras adicionales (ej: Retry-After)
+        
+    Returns:
+        Respuesta formateada
+    """
+    return {
+        "statusCode": status_code,
+        "headers": {
+            "Content-Type": "application/json",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Allow-Methods": "POST, OPTIONS",
+            **(headers or {})
+        },
+        "body": json.dumps(body, ensure_ascii=False)
+    }
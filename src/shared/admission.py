@@ -0,0 +1,382 @@
+"""
+Control de admisión de las invocaciones a Bedrock
+
+Antes de cada invocación se reserva una petición en un token bucket de
+peticiones por minuto y los tokens estimados (entrada + max_tokens, como
+reserva Bedrock su cuota) en otro de tokens por minuto, además de un hueco
+de concurrencia. Las peticiones que no caben esperan en una cola con
+prioridad (las interactivas antes que las de lotes); si la cola está llena
+o la espera prevista supera el máximo, se rechazan al momento con
+AdmissionRejected (HTTP 429) en lugar de llegar a Bedrock y acumular
+reintentos por ThrottlingException.
+
+Los límites son por proceso: en Lambda cada contenedor tiene su propio
+controlador, así que el límite efectivo es el configurado multiplicado por
+la concurrencia de la función.
+
+El analizador de incidencias lo importa como shared.admission desde la
+capa SharedLayer. El reloj es inyectable (FakeClock) para probar la lógica
+sin esperas reales.
+"""
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+DEFAULT_MAX_QUEUE = 100
+DEFAULT_MAX_WAIT_SECONDS = 10.0
+
+
+class AdmissionRejected(Exception):
+    """Petición rechazada por el control de admisión (HTTP 429)"""
+    status_code = 429
+    
+    def __init__(self, reason: str, retry_after_seconds: float):
+        self.reason = reason
+        self.retry_after_seconds = max(1, math.ceil(retry_after_seconds))
+        super().__init__(
+            f"Demasiadas peticiones a Bedrock ({reason}); reintentar en {self.retry_after_seconds} s"
+        )
+
+
+class SystemClock:
+    """Reloj monotónico del sistema"""
+    
+    def now(self) -> float:
+        return time.monotonic()
+    
+    def wait(self, condition: threading.Condition, timeout: float) -> None:
+        """Espera una notificación o el timeout (con el lock de condition adquirido)"""
+        condition.wait(timeout)
+
+
+class FakeClock:
+    """Reloj manual para pruebas: esperar avanza el tiempo sin dormir"""
+    
+    def __init__(self, start: float = 0.0):
+        self.time = start
+    
+    def now(self) -> float:
+        return self.time
+    
+    def advance(self, seconds: float) -> None:
+        self.time += seconds
+    
+    def wait(self, condition: threading.Condition, timeout: float) -> None:
+        self.time += timeout
+
+
+class TokenBucket:
+    """Token bucket que se rellena de forma continua a un ritmo por minuto"""
+    
+    def __init__(self, per_minute: float, clock: Any, capacity: Optional[float] = None):
+        """
+        Inicializa el bucket lleno
+        
+        Args:
+            per_minute: Ritmo de reposición por minuto
+            clock: Reloj (SystemClock o FakeClock)
+            capacity: Ráfaga máxima (por defecto, un minuto de reposición)
+        """
+        self.rate = per_minute / 60
+        self.capacity = capacity if capacity is not None else per_minute
+        self.clock = clock
+        self.tokens = self.capacity
+        self._updated = clock.now()
+    
+    def _refill(self) -> None:
+        now = self.clock.now()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+    
+    def wait_time(self, amount: float) -> float:
+        """
+        Segundos hasta que haya amount tokens disponibles
+        
+        Las cantidades mayores que la capacidad cuentan como la capacidad:
+        si no, nunca se admitirían.
+        """
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+    
+    def take(self, amount: float) -> float:
+        """
+        Cobra amount tokens, como mucho la capacidad (ver wait_time)
+        
+        Returns:
+            Tokens realmente cobrados, que son los que hay que conciliar después
+        """
+        self._refill()
+        charged = min(amount, self.capacity)
+        self.tokens -= charged
+        return charged
+    
+    def adjust(self, delta: float) -> None:
+        """Devuelve (delta > 0) o cobra (delta < 0) tokens; el saldo puede quedar negativo"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class Admission:
+    """Reserva concedida; se libera al salir del bloque with"""
+    
+    def __init__(self, controller: "AdmissionController", tokens: float, waited_ms: float):
+        # Tokens cobrados al bucket (la estimación, limitada a su capacidad)
+        self.controller = controller
+        self.tokens = tokens
+        self.waited_ms = waited_ms
+        self._settled = False
+        self._released = False
+    
+    def settle(self, actual_tokens: int) -> None:
+        """
+        Ajusta el bucket de tokens con el consumo real
+        
+        Args:
+            actual_tokens: Tokens de entrada + salida realmente usados
+        """
+        if not self._settled:
+            self._settled = True
+            self.controller._settle(self.tokens, actual_tokens)
+    
+    def release(self) -> None:
+        """Libera el hueco de concurrencia"""
+        if not self._released:
+            self._released = True
+            self.controller._release()
+    
+    def __enter__(self) -> "Admission":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class AdmissionController:
+    """Límites de peticiones y tokens por minuto, concurrencia y cola con prioridad"""
+    
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_concurrency: int = 0,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_wait_seconds: float = DEFAULT_MAX_WAIT_SECONDS,
+        clock: Any = None
+    ):
+        """
+        Inicializa el controlador
+        
+        Args:
+            requests_per_minute: Peticiones por minuto (0 = sin límite)
+            tokens_per_minute: Tokens estimados por minuto (0 = sin límite)
+            max_concurrency: Invocaciones simultáneas (0 = sin límite)
+            max_queue: Peticiones en espera antes de rechazar las nuevas
+            max_wait_seconds: Espera máxima en la cola (prevista o real)
+            clock: Reloj (por defecto SystemClock)
+        """
+        self.clock = clock or SystemClock()
+        self.requests = TokenBucket(requests_per_minute, self.clock) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, self.clock) if tokens_per_minute > 0 else None
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self._queue: List[Tuple[int, int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "wait_ms": 0.0}
+    
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """Controlador configurado con las variables BEDROCK_* (sin límites por defecto)"""
+        return cls(
+            requests_per_minute=float(os.getenv("BEDROCK_RPM_LIMIT", "0")),
+            tokens_per_minute=float(os.getenv("BEDROCK_TPM_LIMIT", "0")),
+            max_concurrency=int(os.getenv("BEDROCK_MAX_CONCURRENCY", "0")),
+            max_queue=int(os.getenv("BEDROCK_ADMISSION_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+            max_wait_seconds=float(os.getenv("BEDROCK_ADMISSION_MAX_WAIT", str(DEFAULT_MAX_WAIT_SECONDS)))
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None or self.max_concurrency > 0
+    
+    def acquire(
+        self,
+        tokens: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        max_wait_seconds: Optional[float] = None
+    ) -> Admission:
+        """
+        Espera turno para una invocación
+        
+        Args:
+            tokens: Tokens estimados (entrada + máximo de salida)
+            priority: Prioridad (menor = antes)
+            max_wait_seconds: Espera máxima para esta petición (None = la del
+                controlador, 0 = solo si se puede admitir ya)
+        
+        Returns:
+            Reserva, que debe liberarse (with o release()) al terminar la invocación
+        
+        Raises:
+            AdmissionRejected: Si la cola está llena o la espera supera el máximo
+        """
+        if not self.enabled:
+            with self._condition:
+                self.in_flight += 1
+            return Admission(self, tokens, 0.0)
+        
+        max_wait = self.max_wait_seconds if max_wait_seconds is None else max_wait_seconds
+        with self._condition:
+            if len(self._queue) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise AdmissionRejected("cola llena", self._predicted_wait(tokens, priority))
+            predicted = self._predicted_wait(tokens, priority)
+            if predicted > max_wait:
+                self._stats["rejected"] += 1
+                raise AdmissionRejected("límite de peticiones o tokens por minuto", predicted)
+            
+            entry = (priority, next(self._sequence), tokens)
+            heapq.heappush(self._queue, entry)
+            start = self.clock.now()
+            deadline = start + max_wait
+            queued = False
+            try:
+                while True:
+                    now = self.clock.now()
+                    if self._queue[0] is entry:
+                        ready_in = self._ready_in(tokens)
+                        if ready_in == 0.0:
+                            break
+                    else:
+                        ready_in = None
+                    if now >= deadline:
+                        self._stats["rejected"] += 1
+                        raise AdmissionRejected("tiempo de espera agotado", self._predicted_wait(tokens, priority))
+                    # Sin estimación (no es el primero o falta concurrencia) se espera a una notificación
+                    timeout = deadline - now if ready_in is None else min(ready_in, deadline - now)
+                    self.clock.wait(self._condition, timeout)
+                    queued = True
+            except BaseException:
+                self._remove(entry)
+                raise
+            
+            heapq.heappop(self._queue)
+            if self.requests is not None:
+                self.requests.take(1)
+            charged = tokens
+            if self.tokens is not None:
+                charged = self.tokens.take(tokens)
+            self.in_flight += 1
+            waited_ms = (self.clock.now() - start) * 1000
+            self._stats["admitted"] += 1
+            self._stats["wait_ms"] += waited_ms
+            if queued:
+                self._stats["queued"] += 1
+            # El siguiente de la cola pasa a ser el primero
+            self._condition.notify_all()
+            return Admission(self, charged, waited_ms)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado y contadores del controlador"""
+        with self._condition:
+            return {
+                "enabled": self.enabled,
+                "in_flight": self.in_flight,
+                "queued_now": len(self._queue),
+                "admitted": self._stats["admitted"],
+                "queued": self._stats["queued"],
+                "rejected": self._stats["rejected"],
+                "wait_ms": round(self._stats["wait_ms"], 1),
+                "requests_available": round(self.requests.available(), 1) if self.requests else None,
+                "tokens_available": round(self.tokens.available()) if self.tokens else None
+            }
+    
+    def _ready_in(self, tokens: int) -> Optional[float]:
+        """Segundos hasta poder admitir al primero de la cola; None si depende de una liberación"""
+        if self.max_concurrency > 0 and self.in_flight >= self.max_concurrency:
+            return None
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(tokens))
+        return wait
+    
+    def _predicted_wait(self, tokens: int, priority: int) -> float:
+        """Espera prevista por los buckets para una petición nueva detrás de las de igual o mayor prioridad"""
+        ahead = [entry for entry in self._queue if entry[0] <= priority]
+        wait = 0.0
+        if self.requests is not None:
+            needed = len(ahead) + 1 - self.requests.available()
+            wait = max(wait, needed / self.requests.rate)
+        if self.tokens is not None:
+            capacity = self.tokens.capacity
+            needed = sum(min(entry[2], capacity) for entry in ahead) + min(tokens, capacity) - self.tokens.available()
+            wait = max(wait, needed / self.tokens.rate)
+        return wait
+    
+    def _remove(self, entry: Tuple[int, int, int]) -> None:
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+        self._condition.notify_all()
+    
+    def _settle(self, charged: float, actual: int) -> None:
+        if self.tokens is not None:
+            with self._condition:
+                self.tokens.adjust(charged - actual)
+                self._condition.notify_all()
+    
+    def _release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Controlador compartido por todas las invocaciones del proceso"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController.from_env()
+        return _controller
+
+
+def parse_priority(value: Union[str, int, None]) -> int:
+    """
+    Convierte una prioridad de la API ("interactive", "batch" o un entero)
+    
+    Args:
+        value: Prioridad recibida (None = interactive)
+    
+    Returns:
+        Prioridad numérica
+    
+    Raises:
+        ValueError: Si la prioridad no es válida
+    """
+    if value is None:
+        return PRIORITY_INTERACTIVE
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if str(value).lower() in PRIORITIES:
+        return PRIORITIES[str(value).lower()]
+    raise ValueError(f"Prioridad no válida: {value} (usa {', '.join(PRIORITIES)})")
@@ -0,0 +1,283 @@
+"""
+Clientes de AWS compartidos con pool de conexiones, timeouts y reintentos adaptativos
+
+Todos los componentes obtienen sus clientes con get_client, que los crea una
+sola vez por proceso (en Lambda se reutilizan entre invocaciones del mismo
+contenedor, junto con sus conexiones TLS abiertas) y les aplica:
+
+- Un pool de conexiones dimensionado para las llamadas concurrentes y TCP
+  keep-alive para que las conexiones inactivas no se cierren.
+- Timeouts explícitos de conexión y de lectura (más largo en bedrock-runtime,
+  donde InvokeModel espera a toda la respuesta), acotados junto con los
+  intentos para que caigan dentro del Timeout de las Lambdas.
+- Reintentos en modo "adaptive": backoff exponencial con jitter aleatorio en
+  errores de throttling y transitorios, más un limitador de tasa en el
+  cliente que reduce el ritmo de envío cuando el servicio empieza a
+  devolver throttling.
+- Métricas por servicio de llamadas, reintentos, throttling, espera en el
+  limitador y llamadas que superan el tamaño del pool.
+
+El analizador de incidencias, cuyo CodeUri no incluye src/shared, importa
+este mismo módulo como shared.aws_clients desde la capa SharedLayer.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_MODE = "adaptive"
+
+# Por servicio: InvokeModel no devuelve nada hasta generar toda la respuesta.
+# timeout de lectura x intentos debe caber holgado en el Timeout de las
+# Lambdas (300 s): 90 s x 2 en bedrock-runtime y 60 s x 3 en el resto, para
+# que un intento colgado deje tiempo al reintento y a devolver un error.
+SERVICE_READ_TIMEOUTS = {"bedrock-runtime": 90.0}
+SERVICE_MAX_ATTEMPTS = {"bedrock-runtime": 2}
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+    "RequestLimitExceeded",
+    "SlowDown"
+}
+
+_clients: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+_metrics: Dict[str, "ClientMetrics"] = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    """Configuración de red y reintentos de un cliente"""
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    retry_mode: str = DEFAULT_RETRY_MODE
+    tcp_keepalive: bool = True
+    
+    @classmethod
+    def from_env(cls, service_name: str = "") -> "ClientSettings":
+        """
+        Lee la configuración de las variables de entorno
+        
+        AWS_MAX_ATTEMPTS y AWS_RETRY_MODE son las mismas que usa botocore.
+        
+        Args:
+            service_name: Servicio, para elegir su timeout de lectura y sus intentos por defecto
+        
+        Returns:
+            Configuración
+        """
+        read_timeout = SERVICE_READ_TIMEOUTS.get(service_name, DEFAULT_READ_TIMEOUT)
+        max_attempts = SERVICE_MAX_ATTEMPTS.get(service_name, DEFAULT_MAX_ATTEMPTS)
+        return cls(
+            max_pool_connections=int(os.getenv("AWS_MAX_POOL_CONNECTIONS", str(DEFAULT_MAX_POOL_CONNECTIONS))),
+            connect_timeout=float(os.getenv("AWS_CONNECT_TIMEOUT", str(DEFAULT_CONNECT_TIMEOUT))),
+            read_timeout=float(os.getenv("AWS_READ_TIMEOUT", str(read_timeout))),
+            max_attempts=int(os.getenv("AWS_MAX_ATTEMPTS", str(max_attempts))),
+            retry_mode=os.getenv("AWS_RETRY_MODE", DEFAULT_RETRY_MODE),
+            tcp_keepalive=os.getenv("AWS_TCP_KEEPALIVE", "true").lower() == "true"
+        )
+    
+    def to_config(self) -> Config:
+        """Config de botocore equivalente"""
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            tcp_keepalive=self.tcp_keepalive,
+            retries={"mode": self.retry_mode, "total_max_attempts": self.max_attempts}
+        )
+
+
+class ClientMetrics:
+    """
+    Contadores de las llamadas de los clientes de un servicio
+    
+    Se alimentan de los eventos de botocore, así que cuentan también los
+    reintentos que hace botocore internamente:
+    
+    - retries: intentos adicionales tras throttling o errores transitorios
+    - throttles: respuestas de throttling recibidas (en cualquier intento)
+    - rate_limit_wait_ms: espera en el limitador de tasa del modo adaptive,
+      medida alrededor de sus manejadores de before-send (sin la firma SigV4)
+    - pool_saturated_calls: llamadas iniciadas con todas las conexiones del
+      pool ocupadas; botocore no las bloquea, abre una conexión nueva que
+      descarta al terminar (handshake TLS extra)
+    """
+    
+    def __init__(self, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+        self.max_pool_connections = max_pool_connections
+        self.calls = 0
+        self.errors = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttles = 0
+        self.rate_limit_wait_ms = 0.0
+        self.pool_saturated_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def attach(self, client: Any) -> None:
+        """
+        Registra los contadores en los eventos de un cliente
+        
+        Args:
+            client: Cliente de boto3 (los que no tienen eventos de botocore se ignoran)
+        """
+        events = getattr(getattr(client, "meta", None), "events", None)
+        if events is None:
+            return
+        events.register("before-call", self._on_before_call)
+        # Antes y después del limitador de tasa del modo adaptive, que se registra al crear el cliente
+        events.register_first("before-send", self._on_before_rate_limiter)
+        events.register("before-send", self._on_before_send)
+        events.register("needs-retry", self._on_needs_retry)
+        events.register("after-call", self._on_after_call)
+        events.register("after-call-error", self._on_after_call_error)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de los contadores"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "throttles": self.throttles,
+                "rate_limit_wait_ms": round(self.rate_limit_wait_ms, 1),
+                "pool_saturated_calls": self.pool_saturated_calls,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "max_pool_connections": self.max_pool_connections
+            }
+    
+    def _on_before_call(self, **kwargs) -> None:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.in_flight > self.max_pool_connections:
+                self.pool_saturated_calls += 1
+    
+    def _on_before_rate_limiter(self, **kwargs) -> None:
+        self._local.limiter_started_at = time.perf_counter()
+    
+    def _on_before_send(self, **kwargs) -> None:
+        started_at = getattr(self._local, "limiter_started_at", None)
+        waited_ms = (time.perf_counter() - started_at) * 1000 if started_at is not None else 0.0
+        with self._lock:
+            self.attempts += 1
+            self.rate_limit_wait_ms += waited_ms
+    
+    def _on_needs_retry(self, response=None, **kwargs) -> None:
+        # Devuelve None para no interferir en la decisión de reintento de botocore
+        if response is None:
+            return
+        code = response[1].get("Error", {}).get("Code")
+        if code in THROTTLING_ERROR_CODES:
+            with self._lock:
+                self.throttles += 1
+    
+    def _on_after_call(self, parsed=None, **kwargs) -> None:
+        # Los errores del servicio (ClientError) también pasan por aquí antes de lanzarse
+        parsed = parsed or {}
+        retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        with self._lock:
+            self.in_flight -= 1
+            self.retries += retries
+            if "Error" in parsed:
+                self.errors += 1
+    
+    def _on_after_call_error(self, **kwargs) -> None:
+        # Errores de conexión o de timeout tras agotar los reintentos
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += 1
+
+
+def client_metrics(service_name: str) -> ClientMetrics:
+    """
+    Métricas acumuladas de los clientes de un servicio en este proceso
+    
+    Args:
+        service_name: Servicio (ej: "bedrock-runtime")
+    
+    Returns:
+        Métricas del servicio
+    """
+    with _lock:
+        if service_name not in _metrics:
+            _metrics[service_name] = ClientMetrics(ClientSettings.from_env(service_name).max_pool_connections)
+        return _metrics[service_name]
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Copia de las métricas de todos los servicios"""
+    with _lock:
+        services = dict(_metrics)
+    return {name: metrics.snapshot() for name, metrics in services.items()}
+
+
+def get_client(
+    service_name: str,
+    region: Optional[str] = None,
+    profile_name: Optional[str] = None,
+    settings: Optional[ClientSettings] = None
+) -> Any:
+    """
+    Devuelve el cliente compartido de un servicio, creándolo la primera vez
+    
+    Los clientes de boto3 son thread-safe, así que un mismo cliente (y su
+    pool de conexiones) sirve a todos los hilos.
+    
+    Args:
+        service_name: Servicio (ej: "bedrock-runtime")
+        region: Región de AWS
+        profile_name: Perfil de credenciales (None = cadena por defecto o rol de Lambda)
+        settings: Configuración de red y reintentos (None = variables de entorno)
+    
+    Returns:
+        Cliente de boto3
+    """
+    key = (service_name, region, profile_name)
+    with _lock:
+        client = _clients.get(key)
+    if client is not None:
+        return client
+    
+    settings = settings or ClientSettings.from_env(service_name)
+    if profile_name:
+        session = boto3.Session(profile_name=profile_name, region_name=region)
+        client = session.client(service_name, config=settings.to_config())
+    else:
+        client = boto3.client(service_name, region_name=region, config=settings.to_config())
+    
+    metrics = client_metrics(service_name)
+    with _lock:
+        # Otro hilo pudo crearlo a la vez: se conserva el primero
+        if key in _clients:
+            return _clients[key]
+        _clients[key] = client
+        metrics.max_pool_connections = settings.max_pool_connections
+        metrics.attach(client)
+    return client
+
+
+def clear_clients() -> None:
+    """Descarta los clientes y métricas compartidos (al cambiar de credenciales o en pruebas)"""
+    with _lock:
+        _clients.clear()
+        _metrics.clear()
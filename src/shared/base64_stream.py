@@ -0,0 +1,107 @@
+"""
+Codificación base64 de archivos por bloques
+
+Los adjuntos (hasta 32 MB) se codifican desde un mmap del archivo en bloques
+de tamaño múltiplo de 3, así que cada bloque codificado es independiente y
+puede escribirse directamente en el cuerpo de la petición sin construir nunca
+la cadena base64 completa.
+"""
+import base64
+import binascii
+import mmap
+import os
+from typing import Iterator
+
+# Múltiplo de 3 para que los bloques codificados no lleven relleno intermedio
+BASE64_CHUNK_SIZE = 3 * 256 * 1024
+
+
+def base64_encoded_size(size_bytes: int) -> int:
+    """
+    Calcula la longitud en base64 de un contenido
+    
+    Args:
+        size_bytes: Tamaño original en bytes
+    
+    Returns:
+        Número de caracteres base64 (con relleno)
+    """
+    return 4 * ((size_bytes + 2) // 3)
+
+
+def iter_file_base64(file_path: str, chunk_size: int = BASE64_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Genera el base64 de un archivo por bloques
+    
+    Args:
+        file_path: Ruta al archivo
+        chunk_size: Bytes leídos por bloque (se redondea a múltiplo de 3)
+    
+    Returns:
+        Iterador de bloques base64 en ASCII
+    """
+    chunk_size = max(3, chunk_size - chunk_size % 3)
+    
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), chunk_size):
+                    yield binascii.b2a_base64(view[offset:offset + chunk_size], newline=False)
+            finally:
+                view.release()
+
+
+def encode_file_base64(file_path: str) -> str:
+    """
+    Codifica un archivo completo a una cadena base64
+    
+    Lee a través de un mmap, así que no se crea una copia intermedia del
+    contenido original en memoria.
+    
+    Args:
+        file_path: Ruta al archivo
+    
+    Returns:
+        Contenido del archivo en base64
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return base64.b64encode(mapped).decode("ascii")
+
+
+class Base64File:
+    """
+    Referencia diferida al base64 de un archivo en disco
+    
+    Se usa como cargador de Document.base64_content: llamarla materializa la
+    cadena, mientras que iter_chunks() permite volcarla por bloques. Solo
+    guarda la ruta, así que es serializable con pickle.
+    """
+    
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path: Ruta al archivo
+        """
+        self.file_path = file_path
+    
+    def __call__(self) -> str:
+        return encode_file_base64(self.file_path)
+    
+    def __repr__(self) -> str:
+        return f"Base64File({self.file_path!r})"
+    
+    @property
+    def encoded_size(self) -> int:
+        """Longitud del base64 sin necesidad de codificar"""
+        return base64_encoded_size(os.path.getsize(self.file_path))
+    
+    def iter_chunks(self, chunk_size: int = BASE64_CHUNK_SIZE) -> Iterator[bytes]:
+        """Genera el base64 por bloques (ver iter_file_base64)"""
+        return iter_file_base64(self.file_path, chunk_size)
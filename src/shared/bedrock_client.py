@@ -0,0 +1,308 @@
+"""
+Cliente para AWS Bedrock compartido por la CLI y la Lambda RAG
+
+El cliente bedrock-runtime subyacente se obtiene de aws_clients, así que
+comparte pool de conexiones, timeouts, reintentos adaptativos y métricas con
+el resto de componentes, y en Lambda se reutiliza entre invocaciones.
+"""
+import json
+import logging
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from .admission import PRIORITY_INTERACTIVE, AdmissionController, AdmissionRejected, get_admission_controller
+from .aws_clients import get_client
+from .models import Document, QueryRequest, QueryResponse, BedrockConfig, DocumentType
+from .request_body import RequestBodyBuilder
+from .response_stream import ModelStream
+from .token_budget import BudgetPlan, fit_request_to_budget, input_token_limit
+
+logger = logging.getLogger(__name__)
+
+
+class BedrockClient:
+    """Cliente para interactuar con AWS Bedrock"""
+    
+    def __init__(self, config: BedrockConfig, admission: Optional[AdmissionController] = None):
+        """
+        Inicializa el cliente de Bedrock
+        
+        Args:
+            config: Configuración de Bedrock
+            admission: Control de admisión (por defecto, el compartido del proceso)
+        """
+        self.config = config
+        self.admission = admission or get_admission_controller()
+        
+        # Cliente de Bedrock Runtime compartido (en Lambda, credenciales del rol de ejecución)
+        self.client = get_client("bedrock-runtime", config.region, config.profile_name)
+        
+        logger.info(f"Cliente Bedrock inicializado - Región: {config.region}, Modelo: {config.model_id}")
+    
+    def invoke_model(self, request: QueryRequest, priority: int = PRIORITY_INTERACTIVE) -> QueryResponse:
+        """
+        Invoca el modelo de Bedrock con la consulta y documentos
+        
+        Args:
+            request: Solicitud de consulta
+            priority: Prioridad en el control de admisión (menor = antes)
+            
+        Returns:
+            Respuesta del modelo
+            
+        Raises:
+            AdmissionRejected: Si el control de admisión rechaza la petición (429)
+            Exception: Si hay error en la invocación
+        """
+        try:
+            plan, request_body = self._prepare_body(request)
+            
+            # Turno en el control de admisión con los tokens de entrada estimados + el máximo de salida
+            with self.admission.acquire(plan.estimate.total_tokens + request.max_tokens, priority) as admission:
+                # Invocar el modelo
+                response = self.client.invoke_model(
+                    modelId=self.config.model_id,
+                    body=request_body
+                )
+                
+                # Parsear respuesta
+                response_body = json.loads(response["body"].read())
+                usage = response_body.get("usage", {})
+                admission.settle(usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+            
+            # Extraer información
+            content = response_body.get("content", [])
+            text_response = ""
+            
+            for item in content:
+                if item.get("type") == "text":
+                    text_response += item.get("text", "")
+            
+            result = QueryResponse(
+                response=text_response,
+                model_id=self.config.model_id,
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+                stop_reason=response_body.get("stop_reason"),
+                metadata={
+                    "model": response_body.get("model"),
+                    "role": response_body.get("role"),
+                    "estimated_input_tokens": plan.estimate.total_tokens,
+                    "retry_attempts": response["ResponseMetadata"].get("RetryAttempts", 0),
+                    "admission_wait_ms": round(admission.waited_ms)
+                }
+            )
+            if plan.actions:
+                result.metadata["token_budget"] = plan.to_dict()
+            
+            logger.info(
+                f"✓ Respuesta recibida - Tokens entrada: {result.input_tokens} "
+                f"(estimados {plan.estimate.total_tokens}), salida: {result.output_tokens}"
+            )
+            
+            return result
+            
+        except AdmissionRejected as e:
+            logger.warning(str(e))
+            raise
+        except ClientError as e:
+            error_code = e.response["Error"]["Code"]
+            error_message = e.response["Error"]["Message"]
+            logger.error(f"Error de AWS: {error_code} - {error_message}")
+            raise Exception(f"Error invocando Bedrock: {error_message}")
+        except Exception as e:
+            logger.error(f"Error inesperado: {str(e)}")
+            raise
+    
+    def invoke_model_stream(self, request: QueryRequest, priority: int = PRIORITY_INTERACTIVE) -> ModelStream:
+        """
+        Invoca el modelo en streaming con invoke_model_with_response_stream
+        
+        La petición se envía al llamar al método; el texto se recibe al
+        iterar el resultado y, al terminar, stream.response contiene la
+        respuesta completa con los tokens y la latencia hasta el primer token.
+        La reserva del control de admisión se mantiene hasta que el stream se
+        agota o se cierra: quien no lo consuma entero debe usarlo con with o
+        llamar a close().
+        
+        Args:
+            request: Solicitud de consulta
+            priority: Prioridad en el control de admisión (menor = antes)
+            
+        Returns:
+            Iterador de fragmentos de texto
+            
+        Raises:
+            AdmissionRejected: Si el control de admisión rechaza la petición (429)
+            Exception: Si hay error en la invocación
+        """
+        plan, request_body = self._prepare_body(request)
+        try:
+            admission = self.admission.acquire(plan.estimate.total_tokens + request.max_tokens, priority)
+        except AdmissionRejected as e:
+            logger.warning(str(e))
+            raise
+        
+        try:
+            started_at = time.perf_counter()
+            response = self.client.invoke_model_with_response_stream(
+                modelId=self.config.model_id,
+                body=request_body
+            )
+        except ClientError as e:
+            admission.release()
+            error_code = e.response["Error"]["Code"]
+            error_message = e.response["Error"]["Message"]
+            logger.error(f"Error de AWS: {error_code} - {error_message}")
+            raise Exception(f"Error invocando Bedrock: {error_message}")
+        except Exception:
+            admission.release()
+            raise
+        
+        def finish(result: Optional[QueryResponse]) -> None:
+            if result is not None:
+                admission.settle(result.input_tokens + result.output_tokens)
+            admission.release()
+        
+        metadata = {
+            "estimated_input_tokens": plan.estimate.total_tokens,
+            "retry_attempts": response["ResponseMetadata"].get("RetryAttempts", 0),
+            "admission_wait_ms": round(admission.waited_ms)
+        }
+        if plan.actions:
+            metadata["token_budget"] = plan.to_dict()
+        return ModelStream(response["body"], self.config.model_id, metadata, started_at, on_finish=finish)
+    
+    def _prepare_body(self, request: QueryRequest) -> Tuple[BudgetPlan, bytearray]:
+        """
+        Ajusta la consulta al presupuesto de tokens y construye el body
+        
+        Args:
+            request: Solicitud de consulta
+            
+        Returns:
+            Tupla (plan de presupuesto, body JSON)
+        """
+        # Ajustar la consulta al máximo de tokens de entrada antes de subir nada
+        plan = fit_request_to_budget(
+            request,
+            input_token_limit(self.config.max_input_tokens, request.max_tokens)
+        )
+        request = plan.request
+        for action in plan.actions:
+            logger.warning(f"Presupuesto de tokens: {action}")
+        
+        # Construir el mensaje para Claude (los adjuntos se vuelcan al serializar)
+        builder = RequestBodyBuilder()
+        messages = self._build_messages(request, builder)
+        
+        # Construir el body de la solicitud
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": request.max_tokens,
+            "temperature": request.temperature,
+            "messages": messages
+        }
+        
+        logger.info(f"Invocando modelo {self.config.model_id} (~{plan.estimate.total_tokens} tokens de entrada estimados)...")
+        logger.debug(f"Número de documentos: {len(request.documents)}")
+        
+        # Un único buffer con el JSON completo; boto3 acepta bytearray sin copiarlo a str
+        request_body = builder.build(body)
+        logger.debug(f"Tamaño del body: {len(request_body)} bytes ({builder.payload_bytes} de adjuntos)")
+        
+        return plan, request_body
+    
+    def _build_messages(self, request: QueryRequest, builder: RequestBodyBuilder) -> List[Dict[str, Any]]:
+        """
+        Construye los mensajes en formato Claude para Bedrock
+        
+        Args:
+            request: Solicitud de consulta
+            builder: Constructor del body que recibe el base64 de los adjuntos
+            
+        Returns:
+            Lista de mensajes formateados
+        """
+        content = []
+        
+        # Agregar documentos primero
+        for doc in request.documents:
+            if doc.document_type == DocumentType.PDF and doc.has_base64_content():
+                # PDF como documento
+                content.append({
+                    "type": "document",
+                    "source": {
+                        "type": "base64",
+                        "media_type": "application/pdf",
+                        "data": builder.payload(doc)
+                    }
+                })
+                logger.debug(f"Agregado PDF: {doc.file_name}")
+                
+                # PDF mixto: el documento solo lleva las páginas visuales, el resto va como texto
+                if doc.metadata.get("pdf_routing", {}).get("route") == "mixed" and doc.content:
+                    content.append({
+                        "type": "text",
+                        "text": f"=== Texto de {doc.file_name} ===\n\n{doc.content}"
+                    })
+                
+            elif doc.document_type == DocumentType.IMAGE and doc.has_base64_content():
+                # Imagen
+                content.append({
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": doc.mime_type or "image/jpeg",
+                        "data": builder.payload(doc)
+                    }
+                })
+                logger.debug(f"Agregada imagen: {doc.file_name}")
+                
+            elif doc.content:
+                # Texto extraído (Excel, Word, Text)
+                content.append({
+                    "type": "text",
+                    "text": f"=== Contenido de {doc.file_name} ===\n\n{doc.content}"
+                })
+                logger.debug(f"Agregado texto de: {doc.file_name}")
+                
+            else:
+                logger.warning(f"Se omite {doc.file_name}: no tiene contenido ni base64 que enviar")
+        
+        # Agregar el prompt del usuario al final
+        content.append({
+            "type": "text",
+            "text": request.prompt
+        })
+        
+        # Construir mensaje
+        messages = [
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+        
+        return messages
+    
+    def test_connection(self) -> bool:
+        """
+        Prueba la conexión con Bedrock
+        
+        Returns:
+            True si la conexión es exitosa
+        """
+        try:
+            # Intentar listar modelos disponibles
+            bedrock_client = get_client("bedrock", self.config.region, self.config.profile_name)
+            
+            response = bedrock_client.list_foundation_models()
+            logger.info(f"✓ Conexión exitosa con Bedrock - {len(response.get('modelSummaries', []))} modelos disponibles")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error probando conexión: {str(e)}")
+            return False
@@ -0,0 +1,296 @@
+"""
+Extracción de CSV en streaming
+
+Lee el archivo una sola vez con el módulo csv de la biblioteca estándar:
+detecta el dialecto sobre una muestra inicial, calcula estadísticas por
+columna con memoria acotada y conserva solo las primeras filas y una
+muestra uniforme (reservoir sampling) del resto. Así una exportación de
+monitorización de cientos de MB se resume en un texto de tamaño fijo.
+"""
+import csv
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .text_budget import TextBudget
+
+SNIFF_CHARS = 64 * 1024
+SNIFF_DELIMITERS = ",;\t|"
+
+# Valores distintos que se guardan por columna antes de dejar de contarlos
+MAX_DISTINCT_VALUES = 20
+MAX_CELL_CHARS = 200
+
+
+@dataclass
+class ColumnStats:
+    """Estadísticas de una columna acumuladas en una pasada"""
+    name: str
+    filled: int = 0
+    empty: int = 0
+    numeric: int = 0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    total: float = 0.0
+    distinct: Dict[str, int] = field(default_factory=dict)
+    distinct_overflow: bool = False
+    
+    def add(self, value: str) -> None:
+        """Acumula un valor"""
+        value = value.strip()
+        if not value:
+            self.empty += 1
+            return
+        
+        self.filled += 1
+        # Tras el primer valor no numérico la columna es de texto y no se vuelve a parsear
+        if self.numeric == self.filled - 1:
+            number = _parse_number(value)
+            if number is not None:
+                self.numeric += 1
+                self.total += number
+                if self.minimum is None or number < self.minimum:
+                    self.minimum = number
+                if self.maximum is None or number > self.maximum:
+                    self.maximum = number
+        
+        if value in self.distinct:
+            self.distinct[value] += 1
+        elif len(self.distinct) < MAX_DISTINCT_VALUES:
+            self.distinct[value] = 1
+        else:
+            self.distinct_overflow = True
+    
+    def describe(self) -> str:
+        """Resumen de una línea"""
+        summary = f"{self.name}: {self.filled} valores, {self.empty} vacíos"
+        if self.filled and self.numeric == self.filled:
+            mean = self.total / self.numeric
+            return f"{summary}; numérica min={_format_number(self.minimum)} max={_format_number(self.maximum)} media={_format_number(mean)}"
+        
+        if self.distinct_overflow:
+            # Solo se contaron los primeros valores distintos: se muestran como ejemplos
+            examples = ", ".join(_clip(value, 40) for value in list(self.distinct)[:5])
+            return f"{summary}; más de {MAX_DISTINCT_VALUES} distintos; ejemplos: {examples}"
+        
+        top = sorted(self.distinct.items(), key=lambda item: -item[1])[:5]
+        values = ", ".join(f"{_clip(value, 40)} ({count})" for value, count in top)
+        return f"{summary}; {len(self.distinct)} distintos" + (f"; frecuentes: {values}" if values else "")
+
+
+@dataclass
+class CsvStats:
+    """Resultado de leer un CSV"""
+    rows: int = 0
+    columns: int = 0
+    columns_shown: int = 0
+    delimiter: str = ","
+    has_header: bool = True
+    head_rows: int = 0
+    sampled_rows: int = 0
+    truncated: bool = False
+
+
+def sniff_dialect(sample: str) -> Tuple[type, bool]:
+    """
+    Detecta el dialecto y la cabecera de un CSV a partir de una muestra
+    
+    Args:
+        sample: Primeros caracteres del archivo
+    
+    Returns:
+        Tupla (dialecto, tiene cabecera); si no se puede detectar, excel con cabecera
+    """
+    # La última línea de la muestra puede estar cortada
+    sample = sample[:sample.rfind("\n") + 1] or sample
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(sample, delimiters=SNIFF_DELIMITERS)
+    except csv.Error:
+        return csv.excel, True
+    try:
+        has_header = sniffer.has_header(sample)
+    except csv.Error:
+        has_header = True
+    return dialect, has_header
+
+
+def extract_csv_text(
+    file_path: str,
+    head_rows: int = 50,
+    sample_rows: int = 50,
+    max_columns: int = 50,
+    max_chars: int = 0,
+    encoding: str = "utf-8-sig"
+) -> Tuple[str, CsvStats]:
+    """
+    Resume un CSV en una pasada: estadísticas por columna, primeras filas y muestra
+    
+    Args:
+        file_path: Ruta al CSV
+        head_rows: Filas iniciales que se copian tal cual
+        sample_rows: Filas muestreadas uniformemente del resto del archivo
+        max_columns: Máximo de columnas incluidas (el resto se omite)
+        max_chars: Máximo de caracteres del resumen (0 = sin límite)
+        encoding: Codificación del archivo (los bytes inválidos se sustituyen)
+    
+    Returns:
+        Tupla (texto, estadísticas)
+    """
+    stats = CsvStats()
+    columns: List[ColumnStats] = []
+    head: List[List[str]] = []
+    reservoir: List[Tuple[int, List[str]]] = []
+    sampler = _ReservoirSampler(sample_rows)
+    header: List[str] = []
+    
+    with open(file_path, "r", encoding=encoding, errors="replace", newline="") as f:
+        dialect, stats.has_header = sniff_dialect(f.read(SNIFF_CHARS))
+        stats.delimiter = dialect.delimiter
+        f.seek(0)
+        
+        for row in csv.reader(f, dialect):
+            if not row or (len(row) == 1 and not row[0].strip()):
+                continue
+            
+            if not header:
+                stats.columns = len(row)
+                if stats.has_header:
+                    header = [cell.strip() or f"columna_{i + 1}" for i, cell in enumerate(row)]
+                    continue
+                header = [f"columna_{i + 1}" for i in range(len(row))]
+            
+            # Las filas con más celdas que la cabecera amplían las columnas
+            if len(row) > len(header):
+                header.extend(f"columna_{i + 1}" for i in range(len(header), len(row)))
+                stats.columns = len(header)
+            while len(columns) < min(len(header), max_columns):
+                columns.append(ColumnStats(header[len(columns)]))
+            
+            row = row[:max_columns]
+            for column, value in zip(columns, row):
+                column.add(value)
+            
+            stats.rows += 1
+            if len(head) < head_rows:
+                head.append(row)
+                continue
+            
+            # Muestra uniforme de las filas posteriores a las iniciales
+            slot = sampler.offer()
+            if slot is None:
+                continue
+            if slot == len(reservoir):
+                reservoir.append((stats.rows, row))
+            else:
+                reservoir[slot] = (stats.rows, row)
+    
+    stats.columns_shown = min(stats.columns, max_columns)
+    stats.head_rows = len(head)
+    stats.sampled_rows = len(reservoir)
+    
+    budget = TextBudget(max_chars)
+    delimiter = "tabulador" if stats.delimiter == "\t" else repr(stats.delimiter)
+    budget.append(
+        f"Filas: {stats.rows}, columnas: {stats.columns} "
+        f"(delimitador {delimiter}, cabecera: {'sí' if stats.has_header else 'no'})"
+    )
+    if stats.columns_shown < stats.columns:
+        budget.append(f"[... se muestran {stats.columns_shown} de {stats.columns} columnas ...]")
+    
+    budget.append("")
+    budget.append("=== Resumen por columna ===")
+    for column in columns:
+        if not budget.append(column.describe()):
+            break
+    
+    budget.append("")
+    budget.append(f"=== Primeras {len(head)} filas ===")
+    budget.append("\t".join(header[:max_columns]))
+    for row in head:
+        if not budget.append(_format_row(row)):
+            break
+    
+    if reservoir:
+        budget.append("")
+        budget.append(f"=== Muestra de {len(reservoir)} de las {stats.rows - len(head)} filas restantes ===")
+        for row_number, row in sorted(reservoir, key=lambda item: item[0]):
+            if not budget.append(f"[fila {row_number}]\t{_format_row(row)}"):
+                break
+    
+    stats.truncated = budget.truncated
+    return budget.getvalue(), stats
+
+
+class _ReservoirSampler:
+    """
+    Reservoir sampling con saltos (algoritmo L de Li)
+    
+    En vez de sortear cada fila calcula cuántas filas saltar hasta el
+    siguiente reemplazo, así que el coste es O(k log(n/k)) llamadas al
+    generador. La semilla fija hace que el mismo archivo produzca siempre la
+    misma muestra (y la misma entrada de caché).
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self.seen = 0
+        self._rng = random.Random(0)
+        self._weight = 1.0
+        self._next = size
+    
+    def offer(self) -> Optional[int]:
+        """
+        Registra una fila
+        
+        Returns:
+            Posición de la muestra donde guardarla, o None si se descarta
+        """
+        self.seen += 1
+        if self.size <= 0:
+            return None
+        if self.seen <= self.size:
+            if self.seen == self.size:
+                self._advance()
+            return self.seen - 1
+        if self.seen < self._next:
+            return None
+        self._advance()
+        return self._rng.randrange(self.size)
+    
+    def _advance(self) -> None:
+        self._weight *= math.exp(math.log(self._rng.random() or 1e-300) / self.size)
+        skip = math.floor(math.log(self._rng.random() or 1e-300) / math.log1p(-self._weight))
+        self._next = self.seen + skip + 1
+
+
+def _parse_number(value: str) -> Optional[float]:
+    """Interpreta un valor como número (acepta coma decimal); None si no lo es"""
+    try:
+        number = float(value)
+    except ValueError:
+        if "," not in value or "." in value or value.count(",") != 1:
+            return None
+        try:
+            number = float(value.replace(",", "."))
+        except ValueError:
+            return None
+    # "nan" e "inf" los acepta float() pero no son datos numéricos
+    return number if math.isfinite(number) else None
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.4g}"
+
+
+def _clip(value: str, limit: int) -> str:
+    return value if len(value) <= limit else value[:limit - 1] + "…"
+
+
+def _format_row(row: List[str]) -> str:
+    """Celdas separadas por tabuladores, sin saltos de línea y recortadas"""
+    return "\t".join(
+        _clip(cell.replace("\t", " ").replace("\r", " ").replace("\n", " "), MAX_CELL_CHARS)
+        for cell in row
+    )
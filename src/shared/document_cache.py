@@ -0,0 +1,193 @@
+"""
+Caché en disco de documentos procesados, direccionada por contenido
+
+La clave es el hash BLAKE2b del contenido del archivo junto con la
+configuración del procesador, de modo que el mismo runbook o captura
+adjuntado con otro nombre o en otra ruta reutiliza el texto extraído y el
+base64 ya calculados. Cada entrada es un JSON; la fecha de modificación del
+fichero (y la de su archivo derivado, si lo tiene) marca el último uso y,
+cuando la caché supera su tamaño máximo, se eliminan primero las entradas
+usadas hace más tiempo (LRU).
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .models import Document
+
+logger = logging.getLogger(__name__)
+
+# Cambiar al modificar el formato de las entradas o la salida de los extractores
+CACHE_FORMAT_VERSION = 3
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Campos de Document que se guardan; file_path y file_name dependen de la petición
+CACHED_FIELDS = ("document_type", "content", "base64_content", "mime_type", "payload_path", "metadata")
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Calcula el hash BLAKE2b (256 bits) del contenido de un archivo por bloques
+    
+    Args:
+        file_path: Ruta al archivo
+    
+    Returns:
+        Hash en hexadecimal
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DocumentCache:
+    """Caché LRU en disco de la salida de DocumentProcessor.process_document"""
+    
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Inicializa la caché
+        
+        Args:
+            directory: Directorio de la caché (se crea si no existe)
+            max_bytes: Tamaño máximo en disco antes de desalojar entradas
+        """
+        self.directory = Path(directory).expanduser()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def key_for(self, file_path: str, settings: Dict[str, Any]) -> str:
+        """
+        Calcula la clave de un archivo para una configuración del procesador
+        
+        Args:
+            file_path: Ruta al archivo
+            settings: Opciones del procesador que afectan a la salida
+        
+        Returns:
+            Clave de la entrada
+        """
+        fingerprint = json.dumps(
+            {"version": CACHE_FORMAT_VERSION, "settings": settings},
+            sort_keys=True
+        )
+        settings_hash = hashlib.blake2b(fingerprint.encode("utf-8"), digest_size=8).hexdigest()
+        return f"{hash_file(file_path)}-{settings_hash}"
+    
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+    
+    @property
+    def blob_dir(self) -> Path:
+        """Directorio para archivos derivados (p. ej. imágenes optimizadas), sujeto al mismo LRU"""
+        return self.directory / "blobs"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera los campos cacheados de un documento
+        
+        Args:
+            key: Clave calculada con key_for()
+        
+        Returns:
+            Campos del documento o None si no está en caché
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                fields = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché ilegible, se descarta: {path.name} ({str(e)})")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        
+        # El archivo derivado se usa con la entrada: el LRU no debe desalojarlo antes
+        if fields.get("payload_path"):
+            try:
+                os.utime(fields["payload_path"])
+            except OSError:
+                pass
+        
+        self.hits += 1
+        return fields
+    
+    def put(self, key: str, document: Document) -> None:
+        """
+        Guarda un documento procesado
+        
+        Los campos con carga diferida pendiente (p. ej. el texto de un PDF)
+        no se guardan, para no forzar su extracción.
+        
+        Args:
+            key: Clave calculada con key_for()
+            document: Documento procesado
+        """
+        fields = {
+            field: getattr(document, field)
+            for field in CACHED_FIELDS
+            if document.is_loaded(field)
+        }
+        
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: otros procesos del pool pueden leer la misma entrada
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(fields, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar en caché {document.file_name}: {str(e)}")
+            return
+        
+        self.evict()
+    
+    def evict(self) -> int:
+        """
+        Elimina las entradas usadas hace más tiempo hasta quedar bajo max_bytes
+        
+        Returns:
+            Número de entradas eliminadas
+        """
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        
+        if removed:
+            logger.info(f"Caché de documentos: {removed} entradas desalojadas")
+        return removed
+    
+    def clear(self) -> None:
+        """Elimina todas las entradas y archivos derivados"""
+        for path in self.directory.glob("*/*"):
+            path.unlink(missing_ok=True)
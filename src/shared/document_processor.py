@@ -1,42 +1,187 @@
 """
 Procesador de documentos compartido
+
+Las librerías de cada formato (pdfplumber, python-docx, pandas, PIL) se
+importan en el primer documento de ese tipo, no al importar el módulo, para
+que las invocaciones sin adjuntos no paguen su coste en el cold start.
 """
 import io
 import logging
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Optional
-
-import PyPDF2
-import pdfplumber
-from docx import Document as DocxDocument
-import pandas as pd
-from PIL import Image
+from typing import Callable, List, Optional, Sequence
 
+from .base64_stream import Base64File
+from .csv_text import extract_csv_text
+from .document_cache import DocumentCache
+from .docx_text import extract_docx_text
+from .extractors import (
+    COST_HIGH,
+    COST_LOW,
+    COST_MEDIUM,
+    FORMAT_CSV,
+    FORMAT_DOCX,
+    FORMAT_GIF,
+    FORMAT_JPEG,
+    FORMAT_MIME_TYPES,
+    FORMAT_OLE2,
+    FORMAT_PDF,
+    FORMAT_PNG,
+    FORMAT_TEXT,
+    FORMAT_WEBP,
+    FORMAT_XLSX,
+    Extractor,
+    ExtractorRegistry
+)
+from .log_text import looks_like_log, summarize_log
+from .image_optimizer import CLAUDE_MAX_EDGE, DEFAULT_IMAGE_QUALITY, optimize_image
+from .pdf_routing import ROUTE_DOCUMENT, ROUTE_MIXED, ROUTE_TEXT, analyze_pdf_pages, plan_pdf_route, write_sub_pdf
 from .models import Document, DocumentType
+from .pdf_text import extract_pdf_text
+from .text_budget import TextBudget
+from .text_decoding import detect_file_encoding, read_text
 from .utils import (
-    detect_document_type,
-    encode_file_to_base64,
     get_mime_type,
     get_file_size,
-    validate_image_file,
-    validate_pdf_file,
+    validate_file_size,
     format_file_size
 )
 
 logger = logging.getLogger(__name__)
 
+# Límites por defecto del texto extraído de hojas de cálculo
+DEFAULT_EXCEL_MAX_ROWS = 5000
+DEFAULT_EXCEL_MAX_CHARS = 200_000
+
+# Límites por defecto del texto extraído de PDFs (solo se usa como referencia)
+DEFAULT_PDF_MAX_PAGES = 200
+DEFAULT_PDF_MAX_CHARS = 200_000
+
+# Límite por defecto del texto extraído de documentos Word
+DEFAULT_WORD_MAX_CHARS = 200_000
+
+# Filas y columnas incluidas del resumen de un CSV
+DEFAULT_CSV_HEAD_ROWS = 50
+DEFAULT_CSV_SAMPLE_ROWS = 50
+DEFAULT_CSV_MAX_COLUMNS = 50
+DEFAULT_CSV_MAX_CHARS = 100_000
+
+# MIME de los formatos de texto cuando la extensión no lo indica
+_TEXT_MIME_TYPES = {FORMAT_TEXT: "text/plain", FORMAT_CSV: "text/csv"}
+
+# Límite del texto plano leído (~200k tokens, el contexto de Claude)
+DEFAULT_TEXT_MAX_CHARS = 800_000
+
+# Los logs a partir de este tamaño se resumen en lugar de enviarse completos
+DEFAULT_LOG_MIN_BYTES = 256 * 1024
+DEFAULT_LOG_MAX_CHARS = 20_000
+
+
+@dataclass
+class DocumentResult:
+    """Resultado de procesar un archivo dentro de un lote"""
+    file_path: str
+    document: Optional[Document] = None
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+    
+    @property
+    def ok(self) -> bool:
+        return self.document is not None
+
 
 class DocumentProcessor:
     """Procesador de documentos multi-formato"""
     
-    def __init__(self):
-        self.supported_types = [
-            DocumentType.PDF,
-            DocumentType.IMAGE,
-            DocumentType.EXCEL,
-            DocumentType.WORD,
-            DocumentType.TEXT
-        ]
+    def __init__(
+        self,
+        excel_max_rows: int = DEFAULT_EXCEL_MAX_ROWS,
+        excel_max_chars: int = DEFAULT_EXCEL_MAX_CHARS,
+        csv_head_rows: int = DEFAULT_CSV_HEAD_ROWS,
+        csv_sample_rows: int = DEFAULT_CSV_SAMPLE_ROWS,
+        csv_max_columns: int = DEFAULT_CSV_MAX_COLUMNS,
+        csv_max_chars: int = DEFAULT_CSV_MAX_CHARS,
+        pdf_backend: str = "pdfplumber",
+        pdf_max_pages: int = DEFAULT_PDF_MAX_PAGES,
+        pdf_max_chars: int = DEFAULT_PDF_MAX_CHARS,
+        pdf_workers: int = 1,
+        pdf_lazy_text: bool = True,
+        pdf_routing: bool = True,
+        word_max_chars: int = DEFAULT_WORD_MAX_CHARS,
+        text_max_chars: int = DEFAULT_TEXT_MAX_CHARS,
+        log_summarize: bool = True,
+        log_min_bytes: int = DEFAULT_LOG_MIN_BYTES,
+        log_max_chars: int = DEFAULT_LOG_MAX_CHARS,
+        log_context_lines: int = 2,
+        image_optimize: bool = True,
+        image_max_edge: int = CLAUDE_MAX_EDGE,
+        image_quality: int = DEFAULT_IMAGE_QUALITY,
+        image_format: str = "auto",
+        cache: Optional[DocumentCache] = None,
+        extractors: Optional[ExtractorRegistry] = None
+    ):
+        """
+        Inicializa el procesador
+        
+        Args:
+            excel_max_rows: Máximo de filas leídas por hoja de cálculo
+            excel_max_chars: Máximo de caracteres extraídos de una hoja de cálculo
+            csv_head_rows: Filas iniciales de un CSV copiadas en el resumen
+            csv_sample_rows: Filas del resto del CSV incluidas como muestra uniforme
+            csv_max_columns: Máximo de columnas de un CSV incluidas en el resumen
+            csv_max_chars: Máximo de caracteres del resumen de un CSV
+            pdf_backend: Librería de extracción de texto de PDF (pdfplumber o pypdfium2)
+            pdf_max_pages: Máximo de páginas de PDF de las que se extrae texto
+            pdf_max_chars: Máximo de caracteres extraídos de un PDF
+            pdf_workers: Procesos para extraer el texto de PDFs grandes por rangos de páginas
+            pdf_lazy_text: Extraer el texto del PDF solo cuando se lea document.content
+            pdf_routing: Enviar como texto los PDFs (o las páginas) con capa de texto
+            word_max_chars: Máximo de caracteres extraídos de un documento Word
+            text_max_chars: Máximo de caracteres leídos de un archivo de texto
+            log_summarize: Resumir por plantillas los logs grandes en lugar de enviarlos completos
+            log_min_bytes: Tamaño a partir del cual un log se resume
+            log_max_chars: Máximo de caracteres del resumen de un log
+            log_context_lines: Líneas de contexto alrededor de cada error/aviso del log
+            image_optimize: Reescalar y recodificar las imágenes antes de enviarlas
+            image_max_edge: Máximo del lado mayor de las imágenes en píxeles
+            image_quality: Calidad JPEG/WebP de las imágenes recodificadas
+            image_format: Formato de las imágenes recodificadas (auto, jpeg o webp)
+            cache: Caché en disco de documentos ya procesados (None = sin caché)
+            extractors: Registro de extractores por formato (None = los de serie)
+        """
+        self.excel_max_rows = excel_max_rows
+        self.excel_max_chars = excel_max_chars
+        self.csv_head_rows = csv_head_rows
+        self.csv_sample_rows = csv_sample_rows
+        self.csv_max_columns = csv_max_columns
+        self.csv_max_chars = csv_max_chars
+        self.pdf_backend = pdf_backend
+        self.pdf_max_pages = pdf_max_pages
+        self.pdf_max_chars = pdf_max_chars
+        self.pdf_workers = pdf_workers
+        self.pdf_lazy_text = pdf_lazy_text
+        self.pdf_routing = pdf_routing
+        self.word_max_chars = word_max_chars
+        self.text_max_chars = text_max_chars
+        self.log_summarize = log_summarize
+        self.log_min_bytes = log_min_bytes
+        self.log_max_chars = log_max_chars
+        self.log_context_lines = log_context_lines
+        self.image_optimize = image_optimize
+        self.image_max_edge = image_max_edge
+        self.image_quality = image_quality
+        self.image_format = image_format
+        self.cache = cache
+        self.extractors = extractors if extractors is not None else default_extractors()
+    
+    @property
+    def supported_types(self) -> List[DocumentType]:
+        """Tipos de documento con algún extractor registrado"""
+        return self.extractors.document_types
     
     def process_document(self, file_path: str) -> Document:
         """
@@ -44,10 +189,10 @@ class DocumentProcessor:
         
         Args:
             file_path: Ruta al archivo
-            
+        
         Returns:
             Objeto Document procesado
-            
+        
         Raises:
             ValueError: Si el archivo no existe o no es soportado
             Exception: Si hay error al procesar el archivo
@@ -56,16 +201,41 @@ class DocumentProcessor:
         if not Path(file_path).exists():
             raise ValueError(f"El archivo no existe: {file_path}")
         
-        # Detectar tipo de documento
-        doc_type = detect_document_type(file_path)
+        # Elegir el extractor por el contenido (primeros bytes) antes de parsear nada
+        extractor, file_format = self.extractors.resolve(file_path)
+        doc_type = extractor.document_type
         file_name = Path(file_path).name
         size_bytes = get_file_size(file_path)
         
-        logger.info(f"Procesando {file_name} ({format_file_size(size_bytes)}) - Tipo: {doc_type}")
+        logger.info(
+            f"Procesando {file_name} ({format_file_size(size_bytes)}) - Tipo: {doc_type}, "
+            f"extractor: {extractor.name}{' (streaming)' if extractor.streaming else ''}"
+        )
         
-        # Validar tipo soportado
-        if doc_type == DocumentType.UNKNOWN:
-            raise ValueError(f"Tipo de archivo no soportado: {file_name}")
+        # Límite de tamaño del formato (p. ej. 32 MB por PDF en Bedrock)
+        if extractor.max_size_mb and not extractor.size_after_extract:
+            is_valid, message = validate_file_size(file_path, max_size_mb=extractor.max_size_mb)
+            if not is_valid:
+                raise ValueError(message)
+        
+        # Consultar la caché antes de parsear nada
+        cache_key = None
+        if self.cache is not None:
+            settings = dict(self._cache_settings(), extractor=extractor.name)
+            cache_key = self.cache.key_for(file_path, settings)
+            cached = self.cache.get(cache_key)
+            # Si la imagen optimizada ya se desalojó, se procesa de nuevo
+            if cached is not None and cached.get("payload_path") and not Path(cached["payload_path"]).exists():
+                cached = None
+            if cached is not None:
+                document = Document(file_path=file_path, file_name=file_name, size_bytes=size_bytes, **cached)
+                # Los campos diferidos no se cachean: se vuelven a asignar desde el archivo
+                if document.document_type in (DocumentType.PDF, DocumentType.IMAGE) and "base64_content" not in cached:
+                    self._attach_payload(document)
+                if document.document_type == DocumentType.PDF and "content" not in cached:
+                    self._attach_pdf_text(document)
+                logger.info(f"✓ Documento recuperado de caché: {file_name}")
+                return document
         
         # Crear documento base
         document = Document(
@@ -73,56 +243,228 @@ class DocumentProcessor:
             file_name=file_name,
             document_type=doc_type,
             size_bytes=size_bytes,
-            mime_type=get_mime_type(file_path)
+            mime_type=_mime_type_for(file_path, file_format, extractor)
         )
         
-        # Procesar según el tipo
         try:
-            if doc_type == DocumentType.PDF:
-                self._process_pdf(document)
-            elif doc_type == DocumentType.IMAGE:
-                self._process_image(document)
-            elif doc_type == DocumentType.EXCEL:
-                self._process_excel(document)
-            elif doc_type == DocumentType.WORD:
-                self._process_word(document)
-            elif doc_type == DocumentType.TEXT:
-                self._process_text(document)
+            extractor.extract(self, document)
+            
+            # Las imágenes se limitan por lo que se envía, ya optimizado (5 MB en Bedrock)
+            if extractor.max_size_mb and extractor.size_after_extract:
+                is_valid, message = validate_file_size(
+                    document.payload_path or file_path, max_size_mb=extractor.max_size_mb
+                )
+                if not is_valid:
+                    raise ValueError(message)
+            
+            if cache_key is not None:
+                self.cache.put(cache_key, document)
             
             logger.info(f"✓ Documento procesado exitosamente: {file_name}")
             return document
-            
+        
         except Exception as e:
             logger.error(f"Error procesando {file_name}: {str(e)}")
             raise
     
+    def _cache_settings(self) -> dict:
+        """Opciones que cambian la salida del procesador y forman parte de la clave de caché"""
+        return {
+            "excel_max_rows": self.excel_max_rows,
+            "excel_max_chars": self.excel_max_chars,
+            "csv_head_rows": self.csv_head_rows,
+            "csv_sample_rows": self.csv_sample_rows,
+            "csv_max_columns": self.csv_max_columns,
+            "csv_max_chars": self.csv_max_chars,
+            "pdf_backend": self.pdf_backend,
+            "pdf_max_pages": self.pdf_max_pages,
+            "pdf_max_chars": self.pdf_max_chars,
+            "pdf_routing": self.pdf_routing,
+            "word_max_chars": self.word_max_chars,
+            "text_max_chars": self.text_max_chars,
+            "log_summarize": self.log_summarize,
+            "log_min_bytes": self.log_min_bytes,
+            "log_max_chars": self.log_max_chars,
+            "log_context_lines": self.log_context_lines,
+            "image_optimize": self.image_optimize,
+            "image_max_edge": self.image_max_edge,
+            "image_quality": self.image_quality,
+            "image_format": self.image_format
+        }
+    
+    def process_documents(
+        self,
+        file_paths: Sequence[str],
+        workers: int = 1,
+        on_complete: Optional[Callable[[DocumentResult], None]] = None
+    ) -> List[DocumentResult]:
+        """
+        Procesa varios archivos, en paralelo con un pool de procesos si workers > 1
+        
+        Los errores de un archivo no interrumpen el lote: quedan en el
+        resultado correspondiente.
+        
+        Args:
+            file_paths: Rutas de los archivos
+            workers: Procesos a usar (0 = uno por CPU, hasta el número de archivos)
+            on_complete: Callback invocado al terminar cada archivo, en orden de finalización
+        
+        Returns:
+            Resultados en el mismo orden que file_paths
+        """
+        file_paths = [str(file_path) for file_path in file_paths]
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(file_paths))
+        
+        if workers > 1:
+            try:
+                return self._process_documents_parallel(file_paths, workers, on_complete)
+            except (OSError, NotImplementedError) as e:
+                # Entornos sin soporte de multiprocessing (p. ej. Lambda sin /dev/shm)
+                logger.warning(f"Procesamiento paralelo no disponible, se usa un solo proceso: {str(e)}")
+        
+        results = []
+        for file_path in file_paths:
+            result = _process_timed(self, file_path)
+            if on_complete:
+                on_complete(result)
+            results.append(result)
+        return results
+    
+    def _process_documents_parallel(
+        self,
+        file_paths: List[str],
+        workers: int,
+        on_complete: Optional[Callable[[DocumentResult], None]]
+    ) -> List[DocumentResult]:
+        """Reparte los archivos en un pool de procesos y conserva el orden de entrada"""
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        
+        # Los archivos más costosos primero, para que no queden al final en un solo proceso
+        order = sorted(range(len(file_paths)), key=lambda index: self._estimate_cost(file_paths[index]), reverse=True)
+        
+        results: List[Optional[DocumentResult]] = [None] * len(file_paths)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_process_timed, self, file_paths[index]): index
+                for index in order
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if on_complete:
+                    on_complete(result)
+        return results
+    
+    def _estimate_cost(self, file_path: str) -> int:
+        """Coste relativo de procesar un archivo: coste del extractor por tamaño (0 si se rechazará)"""
+        try:
+            extractor, _ = self.extractors.resolve(file_path)
+            return extractor.cost * get_file_size(file_path)
+        except (OSError, ValueError):
+            return 0
+    
     def _process_pdf(self, document: Document) -> None:
         """
         Procesa un archivo PDF
         
         Para PDFs, Claude en Bedrock puede procesarlos directamente,
-        así que los codificamos en base64
+        así que los codificamos en base64. Con pdf_routing, los PDFs con
+        capa de texto completa se envían como texto y, si solo algunas
+        páginas son visuales, se envía el texto más un sub-PDF con ellas.
+        El texto se extrae con límites de páginas y caracteres y, por
+        defecto, de forma diferida.
         """
-        # Validar PDF
-        is_valid, message = validate_pdf_file(document.file_path)
-        if not is_valid:
-            raise ValueError(message)
-        
-        # Codificar a base64 para envío directo a Bedrock
-        document.base64_content = encode_file_to_base64(document.file_path)
         document.mime_type = "application/pdf"
+        if self.pdf_routing:
+            self._route_pdf(document)
+            if self._extract_routed_text(document):
+                self._attach_payload(document)
+                return
         
-        # Opcionalmente, extraer texto para referencia
+        # Base64 para envío directo a Bedrock, codificado al construir la petición
+        self._attach_payload(document)
+        self._attach_pdf_text(document)
+    
+    def _route_pdf(self, document: Document) -> None:
+        """Analiza la capa de texto del PDF y decide qué se envía como documento"""
         try:
-            with pdfplumber.open(document.file_path) as pdf:
-                text_content = []
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_content.append(text)
-                document.content = "\n\n".join(text_content)
+            total_pages, pages = analyze_pdf_pages(document.file_path, self.pdf_max_pages)
         except Exception as e:
-            logger.warning(f"No se pudo extraer texto del PDF: {str(e)}")
+            logger.warning(f"No se pudo analizar el PDF, se envía completo: {str(e)}")
+            return
+        
+        route = plan_pdf_route(pages, total_pages, self.pdf_max_chars)
+        if route.route == ROUTE_MIXED:
+            output_dir = self.cache.blob_dir if self.cache is not None else None
+            document.payload_path = write_sub_pdf(document.file_path, route.visual_pages, output_dir)
+        
+        document.metadata["pdf_routing"] = route.to_dict()
+        logger.info(
+            f"PDF enviado como '{route.route}' ({route.reason}): "
+            f"~{route.tokens_routed} tokens en vez de ~{route.tokens_document} (ahorro ~{route.tokens_saved})"
+        )
+    
+    def _extract_routed_text(self, document: Document) -> bool:
+        """
+        Extrae ya el texto de un PDF enrutado como texto o mixto
+        
+        En esas rutas el texto sustituye a (parte de) el PDF, así que se
+        extrae con el mismo backend que el análisis de páginas. Si falla, el
+        PDF vuelve a enviarse completo como documento.
+        
+        Returns:
+            True si el texto sustituye a las páginas de texto del PDF
+        """
+        routing = document.metadata.get("pdf_routing")
+        if not routing or routing["route"] not in (ROUTE_TEXT, ROUTE_MIXED):
+            return False
+        
+        document.content = _extract_pdf_text_or_none(
+            document.file_path,
+            backend="pypdfium2",
+            max_pages=self.pdf_max_pages,
+            max_chars=self.pdf_max_chars,
+            workers=self.pdf_workers
+        )
+        if document.content is not None:
+            return True
+        
+        logger.warning(f"Sin texto extraído de {document.file_name}: se envía el PDF completo como documento")
+        if document.payload_path:
+            Path(document.payload_path).unlink(missing_ok=True)
+            document.payload_path = None
+        routing.update(
+            route=ROUTE_DOCUMENT,
+            reason="falló la extracción de texto",
+            tokens_routed=routing["tokens_document"],
+            tokens_saved=0
+        )
+        return False
+    
+    def _attach_payload(self, document: Document) -> None:
+        """Asigna el base64 diferido del archivo a enviar (ninguno si el PDF va como texto)"""
+        routing = document.metadata.get("pdf_routing")
+        if routing and routing["route"] == ROUTE_TEXT:
+            return
+        document.set_lazy("base64_content", Base64File(document.payload_path or document.file_path))
+    
+    def _attach_pdf_text(self, document: Document) -> None:
+        """Asigna el texto del PDF, de forma diferida si pdf_lazy_text está activo"""
+        # El texto solo es de referencia: se extrae al leer document.content
+        loader = partial(
+            _extract_pdf_text_or_none,
+            document.file_path,
+            backend=self.pdf_backend,
+            max_pages=self.pdf_max_pages,
+            max_chars=self.pdf_max_chars,
+            workers=self.pdf_workers
+        )
+        if self.pdf_lazy_text:
+            document.set_lazy("content", loader)
+        else:
+            document.content = loader()
     
     def _process_image(self, document: Document) -> None:
         """
@@ -130,20 +472,21 @@ class DocumentProcessor:
         
         Las imágenes se envían directamente a Claude en base64
         """
-        # Validar imagen
-        is_valid, message = validate_image_file(document.file_path)
-        if not is_valid:
-            raise ValueError(message)
+        if self.image_optimize:
+            self._optimize_image(document)
+            return
         
         # Validar que la imagen se puede abrir
         try:
+            from PIL import Image
+            
             with Image.open(document.file_path) as img:
                 logger.info(f"Imagen: {img.format} {img.size} {img.mode}")
         except Exception as e:
             raise ValueError(f"No se puede abrir la imagen: {str(e)}")
         
-        # Codificar a base64
-        document.base64_content = encode_file_to_base64(document.file_path)
+        # Codificar a base64 (de forma diferida, al construir la petición)
+        document.set_lazy("base64_content", Base64File(document.file_path))
         
         # Asegurar mime_type correcto
         if not document.mime_type:
@@ -157,77 +500,374 @@ class DocumentProcessor:
             }
             document.mime_type = mime_mapping.get(extension, 'image/jpeg')
     
+    def _optimize_image(self, document: Document) -> None:
+        """
+        Reescala y recodifica la imagen y apunta el base64 al resultado
+        
+        La versión optimizada se guarda junto a la caché de documentos si
+        está activa (y se desaloja con ella) o en el directorio temporal.
+        """
+        try:
+            result = optimize_image(
+                document.file_path,
+                output_dir=self.cache.blob_dir if self.cache is not None else None,
+                max_edge=self.image_max_edge,
+                quality=self.image_quality,
+                image_format=self.image_format
+            )
+        except Exception as e:
+            raise ValueError(f"No se puede abrir la imagen: {str(e)}")
+        
+        document.mime_type = result.mime_type
+        document.metadata["image_optimization"] = result.to_dict()
+        document.set_lazy("base64_content", Base64File(result.output_path))
+        
+        if result.applied:
+            document.payload_path = result.output_path
+            logger.info(
+                f"Imagen optimizada: {result.original_size} -> {result.optimized_size}, "
+                f"{format_file_size(result.original_bytes)} -> {format_file_size(result.optimized_bytes)}, "
+                f"~{result.tokens_before} -> ~{result.tokens_after} tokens"
+            )
+        else:
+            logger.info(f"Imagen: {result.original_size} sin cambios (ya es óptima)")
+    
     def _process_excel(self, document: Document) -> None:
         """
         Procesa un archivo Excel
         
         Excel no es soportado nativamente por Claude, así que
-        convertimos a texto/CSV
+        convertimos a texto tabulado (TSV). Los .xlsx se leen en streaming
+        con openpyxl en modo read-only: el libro se abre una sola vez y la
+        lectura se detiene al alcanzar el límite de filas o caracteres.
         """
         try:
-            # Leer todas las hojas
-            excel_file = pd.ExcelFile(document.file_path)
-            all_sheets_text = []
-            
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(document.file_path, sheet_name=sheet_name)
+            # El formato lo decide el contenido (ZIP = OOXML), no la extensión
+            if zipfile.is_zipfile(document.file_path):
+                self._process_excel_streaming(document)
+            else:
+                self._process_excel_pandas(document)
+        except Exception as e:
+            raise ValueError(f"Error procesando Excel: {str(e)}")
+    
+    def _process_excel_streaming(self, document: Document) -> None:
+        """
+        Extrae un .xlsx fila a fila sin cargar el libro completo en memoria
+        """
+        from openpyxl import load_workbook
+        
+        budget = TextBudget(self.excel_max_chars)
+        sheets_read = 0
+        
+        # Con el archivo abierto openpyxl no comprueba la extensión (el formato ya se detectó por contenido);
+        # el with lo cierra también si el libro no se puede cargar
+        with open(document.file_path, "rb") as stream:
+            workbook = load_workbook(stream, read_only=True, data_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    if budget.exhausted:
+                        break
+                    
+                    sheets_read += 1
+                    if sheets_read > 1:
+                        budget.append("")
+                    budget.append(f"=== Hoja: {sheet.title} ===")
+                    budget.append("")
+                    
+                    rows_read = 0
+                    for row in sheet.iter_rows(values_only=True):
+                        cells = [_format_cell(value) for value in row]
+                        while cells and not cells[-1]:
+                            cells.pop()
+                        if not cells:
+                            continue
+                        
+                        if rows_read >= self.excel_max_rows:
+                            budget.append(f"[... hoja truncada a {self.excel_max_rows} filas ...]")
+                            break
+                        
+                        rows_read += 1
+                        if not budget.append("\t".join(cells)):
+                            break
+            finally:
+                workbook.close()
+        
+        document.content = budget.getvalue(
+            f"[... contenido truncado a {self.excel_max_chars} caracteres ...]"
+        )
+        logger.info(
+            f"Excel procesado: {sheets_read}/{len(workbook.sheetnames)} hojas, "
+            f"{budget.size} caracteres{' (truncado)' if budget.truncated else ''}"
+        )
+    
+    def _process_excel_pandas(self, document: Document) -> None:
+        """
+        Extrae formatos que openpyxl no lee (.xls) con pandas
+        
+        El libro se abre una sola vez y cada hoja se parsea desde ese objeto.
+        """
+        import pandas as pd
+        
+        budget = TextBudget(self.excel_max_chars)
+        
+        with pd.ExcelFile(document.file_path) as excel_file:
+            for index, sheet_name in enumerate(excel_file.sheet_names):
+                if budget.exhausted:
+                    break
                 
-                # Convertir a texto legible
-                sheet_text = f"=== Hoja: {sheet_name} ===\n\n"
-                sheet_text += df.to_string(index=False)
-                all_sheets_text.append(sheet_text)
-            
-            document.content = "\n\n".join(all_sheets_text)
-            logger.info(f"Excel procesado: {len(excel_file.sheet_names)} hojas")
+                df = excel_file.parse(sheet_name, nrows=self.excel_max_rows)
+                
+                if index > 0:
+                    budget.append("")
+                budget.append(f"=== Hoja: {sheet_name} ===")
+                budget.append("")
+                budget.append(df.to_csv(sep="\t", index=False).rstrip("\n"))
             
+            sheet_count = len(excel_file.sheet_names)
+        
+        document.content = budget.getvalue(
+            f"[... contenido truncado a {self.excel_max_chars} caracteres ...]"
+        )
+        logger.info(f"Excel procesado: {sheet_count} hojas")
+    
+    def _process_csv(self, document: Document) -> None:
+        """
+        Procesa un CSV en una sola pasada con el módulo csv
+        
+        En lugar del contenido completo se envía un resumen: estadísticas
+        por columna, las primeras filas y una muestra uniforme del resto,
+        de modo que el tamaño no depende del número de filas.
+        """
+        try:
+            encoding = detect_file_encoding(document.file_path)
+            text, stats = extract_csv_text(
+                document.file_path,
+                head_rows=self.csv_head_rows,
+                sample_rows=self.csv_sample_rows,
+                max_columns=self.csv_max_columns,
+                max_chars=self.csv_max_chars,
+                encoding=encoding
+            )
         except Exception as e:
-            raise ValueError(f"Error procesando Excel: {str(e)}")
+            raise ValueError(f"Error procesando CSV: {str(e)}")
+        
+        if stats.truncated:
+            text += f"\n\n[... resumen truncado a {self.csv_max_chars} caracteres ...]"
+        
+        document.content = text
+        document.metadata["csv"] = {
+            "rows": stats.rows,
+            "columns": stats.columns,
+            "encoding": encoding,
+            "delimiter": stats.delimiter,
+            "has_header": stats.has_header,
+            "sampled_rows": stats.sampled_rows
+        }
+        logger.info(
+            f"CSV procesado: {stats.rows} filas, {stats.columns} columnas, "
+            f"{stats.head_rows} iniciales + {stats.sampled_rows} muestreadas"
+            + (" - truncado" if stats.truncated else "")
+        )
     
     def _process_word(self, document: Document) -> None:
         """
         Procesa un archivo Word
         
         Word no es soportado nativamente por Claude, así que
-        extraemos el texto
+        extraemos el texto en una sola pasada sobre el XML, con
+        párrafos y tablas en el orden del documento
         """
         try:
-            doc = DocxDocument(document.file_path)
-            
-            # Extraer texto de todos los párrafos
-            paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
-            
-            # Extraer texto de tablas
-            tables_text = []
-            for table in doc.tables:
-                table_data = []
-                for row in table.rows:
-                    row_data = [cell.text for cell in row.cells]
-                    table_data.append(" | ".join(row_data))
-                tables_text.append("\n".join(table_data))
-            
-            # Combinar todo
-            all_text = paragraphs
-            if tables_text:
-                all_text.append("\n=== TABLAS ===\n")
-                all_text.extend(tables_text)
-            
-            document.content = "\n\n".join(all_text)
-            logger.info(f"Word procesado: {len(paragraphs)} párrafos, {len(doc.tables)} tablas")
-            
+            text, stats = extract_docx_text(document.file_path, self.word_max_chars)
         except Exception as e:
             raise ValueError(f"Error procesando Word: {str(e)}")
+        
+        if stats.truncated:
+            text += f"\n\n[... texto truncado a {self.word_max_chars} caracteres ...]"
+        
+        document.content = text
+        logger.info(
+            f"Word procesado: {stats.paragraphs} párrafos, {stats.tables} tablas ({stats.rows} filas)"
+            + (" - truncado" if stats.truncated else "")
+        )
     
     def _process_text(self, document: Document) -> None:
         """
         Procesa un archivo de texto plano
+        
+        La codificación se detecta con el prefijo del archivo y el texto se
+        decodifica por bloques hasta text_max_chars. Los logs grandes (.log,
+        o texto cuyas líneas llevan fecha o nivel) se resumen por plantillas
+        en una pasada.
         """
         try:
-            with open(document.file_path, 'r', encoding='utf-8') as f:
-                document.content = f.read()
-        except UnicodeDecodeError:
-            # Intentar con otra codificación
-            try:
-                with open(document.file_path, 'r', encoding='latin-1') as f:
-                    document.content = f.read()
-            except Exception as e:
-                raise ValueError(f"Error leyendo archivo de texto: {str(e)}")
+            encoding = detect_file_encoding(document.file_path)
+        except Exception as e:
+            raise ValueError(f"Error leyendo archivo de texto: {str(e)}")
+        document.metadata["encoding"] = encoding
+        
+        if self.log_summarize and document.size_bytes >= self.log_min_bytes:
+            extension = Path(document.file_path).suffix.lower()
+            if extension == ".log" or looks_like_log(document.file_path, encoding=encoding):
+                self._summarize_log(document, encoding)
+                return
+        
+        try:
+            text, stats = read_text(document.file_path, encoding, max_chars=self.text_max_chars)
+        except Exception as e:
+            raise ValueError(f"Error leyendo archivo de texto: {str(e)}")
+        
+        if stats.truncated:
+            text += f"\n\n[... texto truncado a {self.text_max_chars} caracteres ...]"
+        document.content = text
+        logger.info(f"Texto leído: {stats.chars} caracteres ({encoding})" + (" - truncado" if stats.truncated else ""))
+    
+    def _summarize_log(self, document: Document, encoding: str = "utf-8") -> None:
+        """Sustituye el contenido de un log por su resumen de plantillas, errores y avisos"""
+        try:
+            text, stats = summarize_log(
+                document.file_path,
+                max_chars=self.log_max_chars,
+                context_lines=self.log_context_lines,
+                encoding=encoding
+            )
+        except Exception as e:
+            raise ValueError(f"Error resumiendo log: {str(e)}")
+        
+        if stats.truncated:
+            text += f"\n\n[... resumen truncado a {self.log_max_chars} caracteres ...]"
+        
+        document.content = text
+        document.metadata["log_summary"] = {
+            "lines": stats.lines,
+            "templates": stats.templates,
+            "levels": stats.levels,
+            "first_timestamp": stats.first_timestamp,
+            "last_timestamp": stats.last_timestamp
+        }
+        logger.info(
+            f"Log resumido: {stats.lines} líneas en {stats.templates} plantillas, "
+            f"{len(text)} caracteres" + (" - truncado" if stats.truncated else "")
+        )
+
+
+def _format_cell(value) -> str:
+    """
+    Convierte el valor de una celda a texto compacto para TSV
+    
+    Args:
+        value: Valor leído por openpyxl
+    
+    Returns:
+        Texto sin tabuladores ni saltos de línea
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def _mime_type_for(file_path: str, file_format: Optional[str], extractor: Extractor) -> Optional[str]:
+    """Tipo MIME según el contenido; para texto, el de la extensión si el extractor la reconoce"""
+    if file_format in FORMAT_MIME_TYPES:
+        return FORMAT_MIME_TYPES[file_format]
+    text_mime_type = _TEXT_MIME_TYPES.get(file_format)
+    if Path(file_path).suffix.lower() in extractor.extensions:
+        return get_mime_type(file_path) or text_mime_type
+    return text_mime_type or get_mime_type(file_path)
+
+
+def _extract_pdf_text_or_none(file_path: str, **options) -> Optional[str]:
+    """Extrae el texto de un PDF; si falla, lo registra y devuelve None"""
+    try:
+        return extract_pdf_text(file_path, **options) or None
+    except Exception as e:
+        logger.warning(f"No se pudo extraer texto del PDF: {str(e)}")
+        return None
+
+
+def _process_timed(processor: DocumentProcessor, file_path: str) -> DocumentResult:
+    """Procesa un archivo midiendo su duración; se ejecuta también en los procesos del pool"""
+    start = time.perf_counter()
+    try:
+        document = processor.process_document(file_path)
+        return DocumentResult(file_path, document=document, elapsed_ms=(time.perf_counter() - start) * 1000)
+    except Exception as e:
+        return DocumentResult(file_path, error=str(e), elapsed_ms=(time.perf_counter() - start) * 1000)
+
+
+def default_extractors() -> ExtractorRegistry:
+    """
+    Crea el registro con los extractores de serie
+    
+    Returns:
+        Registro con PDF, imágenes, Excel, Word, texto plano y CSV
+    """
+    registry = ExtractorRegistry()
+    registry.register(Extractor(
+        name="pdf",
+        document_type=DocumentType.PDF,
+        formats=frozenset({FORMAT_PDF}),
+        extensions=frozenset({".pdf"}),
+        extract=DocumentProcessor._process_pdf,
+        cost=COST_MEDIUM,
+        streaming=True,
+        max_size_mb=32
+    ))
+    registry.register(Extractor(
+        name="image",
+        document_type=DocumentType.IMAGE,
+        formats=frozenset({FORMAT_JPEG, FORMAT_PNG, FORMAT_GIF, FORMAT_WEBP}),
+        extensions=frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp"}),
+        extract=DocumentProcessor._process_image,
+        cost=COST_MEDIUM,
+        max_size_mb=5,
+        size_after_extract=True
+    ))
+    registry.register(Extractor(
+        name="xlsx",
+        document_type=DocumentType.EXCEL,
+        formats=frozenset({FORMAT_XLSX}),
+        extensions=frozenset({".xlsx", ".xlsm", ".xls"}),
+        extract=DocumentProcessor._process_excel,
+        cost=COST_HIGH,
+        streaming=True
+    ))
+    registry.register(Extractor(
+        name="xls",
+        document_type=DocumentType.EXCEL,
+        formats=frozenset({FORMAT_OLE2}),
+        extensions=frozenset({".xls"}),
+        extract=DocumentProcessor._process_excel,
+        cost=COST_HIGH
+    ))
+    registry.register(Extractor(
+        name="docx",
+        document_type=DocumentType.WORD,
+        formats=frozenset({FORMAT_DOCX}),
+        extensions=frozenset({".docx"}),
+        extract=DocumentProcessor._process_word,
+        cost=COST_MEDIUM,
+        streaming=True
+    ))
+    registry.register(Extractor(
+        name="text",
+        document_type=DocumentType.TEXT,
+        formats=frozenset({FORMAT_TEXT}),
+        extensions=frozenset({".txt", ".md", ".log"}),
+        extract=DocumentProcessor._process_text,
+        cost=COST_LOW
+    ))
+    registry.register(Extractor(
+        name="csv",
+        document_type=DocumentType.CSV,
+        formats=frozenset({FORMAT_CSV, FORMAT_TEXT}),
+        extensions=frozenset({".csv", ".tsv"}),
+        extract=DocumentProcessor._process_csv,
+        cost=COST_LOW,
+        streaming=True
+    ))
+    return registry
@@ -0,0 +1,132 @@
+"""
+Extracción de texto de DOCX en una sola pasada
+
+Recorre word/document.xml con lxml.iterparse en lugar de construir el
+modelo de objetos de python-docx: los párrafos y las tablas salen en el
+orden del documento, cada celda combinada se emite una sola vez y la
+lectura se detiene al agotar el presupuesto de caracteres.
+"""
+import zipfile
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .text_budget import TextBudget
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+_P = f"{{{W_NS}}}p"
+_T = f"{{{W_NS}}}t"
+_TAB = f"{{{W_NS}}}tab"
+_BR = f"{{{W_NS}}}br"
+_CR = f"{{{W_NS}}}cr"
+_TBL = f"{{{W_NS}}}tbl"
+_TR = f"{{{W_NS}}}tr"
+_TC = f"{{{W_NS}}}tc"
+_VMERGE = f"{{{W_NS}}}vMerge"
+_VAL = f"{{{W_NS}}}val"
+
+
+@dataclass
+class DocxStats:
+    """Elementos leídos de un DOCX"""
+    paragraphs: int = 0
+    tables: int = 0
+    rows: int = 0
+    truncated: bool = False
+
+
+class _Cell:
+    """Celda en construcción; las celdas de continuación de una combinación vertical se emiten vacías"""
+    
+    def __init__(self):
+        self.parts: List[str] = []
+        self.merged_continuation = False
+
+
+def extract_docx_text(file_path: str, max_chars: int = 0) -> Tuple[str, DocxStats]:
+    """
+    Extrae el texto de un DOCX respetando el orden de párrafos y tablas
+    
+    Las filas de tabla se escriben como celdas separadas por " | ". Las
+    celdas anidadas se aplanan dentro de la celda que las contiene.
+    
+    Args:
+        file_path: Ruta al archivo .docx
+        max_chars: Máximo de caracteres extraídos (0 = sin límite)
+    
+    Returns:
+        Tupla (texto, estadísticas)
+    """
+    from lxml import etree
+    
+    budget = TextBudget(max_chars)
+    stats = DocxStats()
+    
+    paragraph: List[str] = []
+    cells: List[_Cell] = []
+    rows: List[List[str]] = []
+    table_depth = 0
+    
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as xml:
+            for event, elem in etree.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                
+                if event == "start":
+                    if tag == _TBL:
+                        table_depth += 1
+                        if table_depth == 1:
+                            stats.tables += 1
+                            if not budget.append(f"[Tabla {stats.tables}]"):
+                                break
+                    elif tag == _TR:
+                        rows.append([])
+                    elif tag == _TC:
+                        cells.append(_Cell())
+                    continue
+                
+                if tag == _T:
+                    paragraph.append(elem.text or "")
+                elif tag == _TAB:
+                    paragraph.append("\t")
+                elif tag in (_BR, _CR):
+                    paragraph.append("\n")
+                elif tag == _VMERGE and cells:
+                    # Sin w:val (o con "continue") la celda repite la de arriba
+                    if elem.get(_VAL, "continue") == "continue":
+                        cells[-1].merged_continuation = True
+                elif tag == _P:
+                    text = "".join(paragraph).strip()
+                    paragraph = []
+                    if text:
+                        if cells:
+                            cells[-1].parts.append(text)
+                        else:
+                            stats.paragraphs += 1
+                            if not budget.append(text + "\n"):
+                                break
+                elif tag == _TC:
+                    cell = cells.pop()
+                    rows[-1].append("" if cell.merged_continuation else " ".join(cell.parts))
+                elif tag == _TR:
+                    row = " | ".join(rows.pop())
+                    if cells:
+                        # Fila de una tabla anidada: se añade a la celda exterior
+                        cells[-1].parts.append(row)
+                    else:
+                        stats.rows += 1
+                        if not budget.append(row):
+                            break
+                elif tag == _TBL:
+                    table_depth -= 1
+                    if table_depth == 0 and not budget.append(""):
+                        break
+                
+                # Liberar lo ya procesado para que la memoria no crezca con el documento
+                if tag in (_P, _TBL) or (tag == _TR and table_depth <= 1):
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+    
+    stats.truncated = budget.truncated
+    return budget.getvalue(), stats
@@ -0,0 +1,239 @@
+"""
+Detección de formato por contenido y registro de extractores
+
+El formato se decide leyendo los primeros bytes del archivo (firmas
+"mágicas" y, para ZIP, el directorio central) en lugar de fiarse solo de la
+extensión. Cada extractor declara qué formatos y extensiones acepta, su
+coste relativo y si procesa en streaming; el procesador elige el más barato
+que encaja, de modo que un archivo mal etiquetado se rechaza (o se
+redirige al extractor correcto) antes de parsear nada, y los formatos
+nuevos se añaden registrando un extractor.
+"""
+import csv
+import logging
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, FrozenSet, List, Optional, Tuple
+
+from .models import Document, DocumentType
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 8192
+
+# Coste relativo de los extractores (orden de preferencia y de planificación)
+COST_LOW = 1
+COST_MEDIUM = 2
+COST_HIGH = 3
+
+FORMAT_PDF = "pdf"
+FORMAT_PNG = "png"
+FORMAT_JPEG = "jpeg"
+FORMAT_GIF = "gif"
+FORMAT_WEBP = "webp"
+FORMAT_DOCX = "docx"
+FORMAT_XLSX = "xlsx"
+FORMAT_ZIP = "zip"
+FORMAT_OLE2 = "ole2"
+FORMAT_TEXT = "text"
+FORMAT_CSV = "csv"
+
+FORMAT_MIME_TYPES = {
+    FORMAT_PDF: "application/pdf",
+    FORMAT_PNG: "image/png",
+    FORMAT_JPEG: "image/jpeg",
+    FORMAT_GIF: "image/gif",
+    FORMAT_WEBP: "image/webp",
+    FORMAT_DOCX: "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    FORMAT_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+_SIGNATURES = (
+    (b"%PDF-", FORMAT_PDF),
+    (b"\x89PNG\r\n\x1a\n", FORMAT_PNG),
+    (b"\xff\xd8\xff", FORMAT_JPEG),
+    (b"GIF87a", FORMAT_GIF),
+    (b"GIF89a", FORMAT_GIF),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", FORMAT_OLE2)
+)
+
+# Contenedores que no identifican el formato por sí solos: exigen además la extensión
+_AMBIGUOUS_FORMATS = {FORMAT_OLE2}
+
+# Formatos que refinan otro: un CSV sigue siendo texto para los extractores de texto
+_BASE_FORMATS = {FORMAT_CSV: FORMAT_TEXT}
+
+# Delimitadores con los que un texto se reconoce como CSV, y líneas que se comprueban
+_CSV_DELIMITERS = ",;\t"
+_CSV_SNIFF_LINES = 20
+
+_TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")
+
+
+def sniff_format(file_path: str) -> Optional[str]:
+    """
+    Identifica el formato de un archivo por su contenido
+    
+    Args:
+        file_path: Ruta al archivo
+    
+    Returns:
+        Formato detectado (FORMAT_*) o None si no se reconoce
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    
+    for signature, file_format in _SIGNATURES:
+        if head.startswith(signature):
+            return file_format
+    
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return FORMAT_WEBP
+    
+    if head.startswith(b"PK\x03\x04"):
+        return _sniff_zip(file_path)
+    
+    if _looks_like_text(head):
+        return FORMAT_CSV if _looks_like_csv(head) else FORMAT_TEXT
+    
+    return None
+
+
+def _sniff_zip(file_path: str) -> str:
+    """Distingue DOCX y XLSX por las entradas del ZIP (solo lee el directorio central)"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            names = set(archive.namelist())
+    except zipfile.BadZipFile:
+        return FORMAT_ZIP
+    if "word/document.xml" in names:
+        return FORMAT_DOCX
+    if "xl/workbook.xml" in names:
+        return FORMAT_XLSX
+    return FORMAT_ZIP
+
+
+def _looks_like_csv(head: bytes) -> bool:
+    """CSV si las primeras líneas completas tienen el mismo número (2 o más) de campos"""
+    text = head.decode("utf-8", errors="ignore").lstrip("\ufeff")
+    if len(head) >= SNIFF_BYTES:
+        # La última línea puede estar cortada por el límite de lectura
+        text = text[:text.rfind("\n") + 1]
+    lines = [line for line in text.splitlines() if line.strip()][:_CSV_SNIFF_LINES]
+    if len(lines) < 2:
+        return False
+    try:
+        dialect = csv.Sniffer().sniff("\n".join(lines), delimiters=_CSV_DELIMITERS)
+        widths = {len(row) for row in csv.reader(lines, dialect)}
+    except csv.Error:
+        return False
+    return len(widths) == 1 and widths.pop() >= 2
+
+
+def _looks_like_text(head: bytes) -> bool:
+    """Texto si tiene BOM o no contiene NUL y es UTF-8 válido (o casi todo imprimible)"""
+    if not head:
+        return True
+    if head.startswith(_TEXT_BOMS):
+        return True
+    if b"\x00" in head:
+        return False
+    try:
+        # El último carácter puede estar cortado por el límite de lectura
+        head.decode("utf-8") if len(head) < SNIFF_BYTES else head[:-4].decode("utf-8")
+        return True
+    except UnicodeDecodeError:
+        control = sum(1 for byte in head if byte < 32 and byte not in (9, 10, 12, 13))
+        return control / len(head) < 0.01
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """
+    Extractor registrado para un tipo de documento
+    
+    extract recibe (procesador, documento) y rellena el documento; debe ser
+    una función de módulo o un método de clase para que el procesador pueda
+    enviarse a los procesos del pool. max_size_mb (0 = sin límite) se
+    comprueba antes de llamar a extract o, con size_after_extract, después,
+    sobre lo que se va a enviar (payload_path o el archivo original).
+    """
+    name: str
+    document_type: DocumentType
+    formats: FrozenSet[str]
+    extensions: FrozenSet[str]
+    extract: Callable[[Any, Document], None]
+    cost: int = COST_MEDIUM
+    streaming: bool = False
+    max_size_mb: int = 0
+    size_after_extract: bool = False
+
+
+@dataclass
+class ExtractorRegistry:
+    """Registro ordenado de extractores"""
+    extractors: List[Extractor] = field(default_factory=list)
+    
+    def register(self, extractor: Extractor) -> None:
+        """
+        Añade un extractor
+        
+        Args:
+            extractor: Extractor a registrar (se sustituye si ya hay uno con el mismo nombre)
+        """
+        self.extractors = [item for item in self.extractors if item.name != extractor.name]
+        self.extractors.append(extractor)
+    
+    @property
+    def document_types(self) -> List[DocumentType]:
+        """Tipos de documento soportados"""
+        types = []
+        for extractor in self.extractors:
+            if extractor.document_type not in types:
+                types.append(extractor.document_type)
+        return types
+    
+    def resolve(self, file_path: str) -> Tuple[Extractor, Optional[str]]:
+        """
+        Elige el extractor de un archivo a partir de su contenido y extensión
+        
+        Se prefiere el extractor de la extensión si acepta el formato detectado;
+        si el contenido no coincide con la extensión se usa el extractor más
+        barato que acepte el formato real.
+        
+        Args:
+            file_path: Ruta al archivo
+        
+        Returns:
+            Tupla (extractor, formato detectado)
+        
+        Raises:
+            ValueError: Si ningún extractor acepta el contenido del archivo
+        """
+        file_name = Path(file_path).name
+        extension = Path(file_path).suffix.lower()
+        file_format = sniff_format(file_path)
+        
+        # Primero los extractores del formato exacto y después los del formato base (CSV -> texto)
+        by_format = []
+        for accepted in (file_format, _BASE_FORMATS.get(file_format)):
+            by_format += sorted(
+                (item for item in self.extractors if accepted in item.formats and item not in by_format),
+                key=lambda item: item.cost
+            )
+        by_extension = [item for item in by_format if extension in item.extensions]
+        
+        if by_extension:
+            return by_extension[0], file_format
+        
+        if by_format and file_format not in _AMBIGUOUS_FORMATS:
+            if any(extension in item.extensions for item in self.extractors):
+                logger.warning(f"{file_name}: el contenido es '{file_format}' aunque la extensión es {extension}")
+            return by_format[0], file_format
+        
+        if file_format == FORMAT_OLE2:
+            raise ValueError(f"Formato binario de Office 97-2003 no soportado: {file_name} (convertir a .docx/.xlsx)")
+        if file_format is None:
+            raise ValueError(f"Tipo de archivo no soportado: {file_name}")
+        raise ValueError(f"Tipo de archivo no soportado: {file_name} (contenido '{file_format}')")
@@ -0,0 +1,203 @@
+"""
+Optimización de imágenes antes de enviarlas a Claude
+
+Claude reescala internamente las imágenes cuyo lado mayor supera 1568 px o
+que superan ~1,15 megapíxeles, así que enviar una captura de 4K solo cuesta
+ancho de banda. Aquí se reescala al máximo efectivo (o a un máximo menor
+configurado, que sí ahorra tokens), se recodifica a JPEG o WebP y se
+descartan los metadatos (EXIF, perfiles, comentarios). El resultado se
+guarda en disco con el hash del contenido como nombre, de modo que la misma
+imagen no se vuelve a procesar.
+"""
+import hashlib
+import json
+import math
+import os
+import tempfile
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .document_cache import hash_file
+
+# Resolución máxima efectiva de Claude y coste aproximado por píxel
+CLAUDE_MAX_EDGE = 1568
+CLAUDE_MAX_PIXELS = 1_150_000
+PIXELS_PER_TOKEN = 750
+
+DEFAULT_IMAGE_QUALITY = 85
+IMAGE_FORMATS = ("auto", "jpeg", "webp")
+
+_FORMAT_INFO = {
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "webp": ("WEBP", ".webp", "image/webp")
+}
+
+# Claves de Image.info con metadatos que no se envían
+_METADATA_KEYS = ("exif", "icc_profile", "comment", "xmp", "XML:com.adobe.xmp")
+
+
+def fit_within(width: int, height: int, max_edge: int, max_pixels: int = CLAUDE_MAX_PIXELS) -> Tuple[int, int]:
+    """
+    Calcula las dimensiones tras reducir una imagen a los límites dados
+    
+    Args:
+        width: Ancho original
+        height: Alto original
+        max_edge: Máximo del lado mayor
+        max_pixels: Máximo de píxeles totales
+    
+    Returns:
+        Tupla (ancho, alto), nunca mayor que el original
+    """
+    scale = min(1.0, max_edge / max(width, height), math.sqrt(max_pixels / (width * height)))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estima los tokens de entrada de una imagen
+    
+    Aplica el reescalado que hace Claude antes de contar (ancho x alto / 750).
+    
+    Args:
+        width: Ancho en píxeles
+        height: Alto en píxeles
+    
+    Returns:
+        Tokens estimados
+    """
+    width, height = fit_within(width, height, CLAUDE_MAX_EDGE)
+    return math.ceil(width * height / PIXELS_PER_TOKEN)
+
+
+@dataclass
+class ImageOptimization:
+    """Resultado de optimizar una imagen"""
+    source_path: str
+    output_path: str
+    mime_type: str
+    applied: bool
+    original_bytes: int
+    optimized_bytes: int
+    original_size: Tuple[int, int]
+    optimized_size: Tuple[int, int]
+    tokens_before: int
+    tokens_after: int
+    
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+    
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["bytes_saved"] = self.bytes_saved
+        data["tokens_saved"] = self.tokens_saved
+        return data
+
+
+def default_output_dir() -> Path:
+    """Directorio de imágenes optimizadas cuando no hay caché de documentos"""
+    return Path(tempfile.gettempdir()) / "consulta-rag" / "images"
+
+
+def optimize_image(
+    source_path: str,
+    output_dir: Optional[Path] = None,
+    max_edge: int = CLAUDE_MAX_EDGE,
+    quality: int = DEFAULT_IMAGE_QUALITY,
+    image_format: str = "auto"
+) -> ImageOptimization:
+    """
+    Reescala y recodifica una imagen sin metadatos
+    
+    Si el resultado no es más pequeño que el original, no hacía falta
+    reescalar y el original no lleva metadatos, se conserva el original
+    (applied=False) y se borra la copia recodificada. Si lleva metadatos se
+    usa la copia aunque ocupe algo más, para no enviarlos.
+    
+    Args:
+        source_path: Ruta de la imagen original
+        output_dir: Directorio donde guardar (y buscar) la versión optimizada
+        max_edge: Máximo del lado mayor en píxeles
+        quality: Calidad de compresión (1-100)
+        image_format: jpeg, webp o auto (WebP si hay transparencia, JPEG si no)
+    
+    Returns:
+        Resultado de la optimización
+    """
+    from PIL import Image, ImageOps
+    
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Formato de imagen no soportado: {image_format}. Disponibles: {', '.join(IMAGE_FORMATS)}")
+    
+    output_dir = Path(output_dir) if output_dir else default_output_dir()
+    original_bytes = os.path.getsize(source_path)
+    
+    with Image.open(source_path) as img:
+        original_mime = Image.MIME.get(img.format, "image/jpeg")
+        # Antes de aplicar la orientación, que quita la etiqueta del EXIF
+        has_metadata = any(img.info.get(name) for name in _METADATA_KEYS) or len(img.getexif()) > 0
+        img = ImageOps.exif_transpose(img) if not getattr(img, "is_animated", False) else img
+        original_size = img.size
+        tokens_before = estimate_image_tokens(*original_size)
+        
+        unchanged = ImageOptimization(
+            source_path=source_path, output_path=source_path, mime_type=original_mime, applied=False,
+            original_bytes=original_bytes, optimized_bytes=original_bytes,
+            original_size=original_size, optimized_size=original_size,
+            tokens_before=tokens_before, tokens_after=tokens_before
+        )
+        
+        # Los GIF animados perderían la animación al recodificarlos
+        if getattr(img, "is_animated", False):
+            return unchanged
+        
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        target_format = image_format if image_format != "auto" else ("webp" if has_alpha else "jpeg")
+        pil_format, extension, mime_type = _FORMAT_INFO[target_format]
+        target_size = fit_within(*original_size, max_edge)
+        
+        settings = json.dumps([target_size, quality, target_format])
+        key = f"{hash_file(source_path)}-{hashlib.blake2b(settings.encode('utf-8'), digest_size=8).hexdigest()}"
+        output_path = output_dir / f"{key}{extension}"
+        
+        if not output_path.exists():
+            if target_size != original_size:
+                img = img.resize(target_size, Image.LANCZOS)
+            keep_alpha = has_alpha and target_format == "webp"
+            img = img.convert("RGBA" if keep_alpha else "RGB")
+            
+            output_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                # Sin exif/icc_profile: los metadatos no se copian
+                if pil_format == "JPEG":
+                    img.save(f, format=pil_format, quality=quality, optimize=True, progressive=True)
+                else:
+                    img.save(f, format=pil_format, quality=quality, method=4)
+            os.replace(tmp_path, output_path)
+        else:
+            os.utime(output_path)
+    
+    optimized_bytes = os.path.getsize(output_path)
+    if target_size == original_size and optimized_bytes >= original_bytes and not has_metadata:
+        output_path.unlink(missing_ok=True)
+        return unchanged
+    
+    return ImageOptimization(
+        source_path=source_path,
+        output_path=str(output_path),
+        mime_type=mime_type,
+        applied=True,
+        original_bytes=original_bytes,
+        optimized_bytes=optimized_bytes,
+        original_size=original_size,
+        optimized_size=target_size,
+        tokens_before=tokens_before,
+        tokens_after=estimate_image_tokens(*target_size)
+    )
@@ -0,0 +1,253 @@
+"""
+Resumen de archivos de log en una pasada
+
+Los adjuntos de incidencias suelen ser logs con miles de líneas casi
+iguales. En lugar de enviarlos completos, cada línea se reduce a una
+plantilla (números, fechas, IDs y direcciones enmascarados) y se cuentan
+las apariciones de cada plantilla con su primera y última marca de tiempo.
+Las líneas ERROR/WARN se conservan con unas líneas de contexto la primera
+vez que aparece su plantilla. La memoria queda acotada por el número de
+plantillas, no por el tamaño del archivo.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .text_budget import TextBudget
+
+MAX_LINE_CHARS = 1000
+
+# Una marca de tiempo ISO 8601 / "fecha hora", o de syslog ("Oct  1 23:23:23")
+_TIMESTAMP = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+    r"|\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) +\d{1,2} \d{2}:\d{2}:\d{2}\b"
+)
+_LEVEL = re.compile(
+    r"\b(FATAL|CRITICAL|ERROR|SEVERE|WARN|WARNING|INFO|DEBUG|TRACE)\b"
+    r"|\blevel=\"?(fatal|critical|error|warn|warning|info|debug|trace)\b"
+)
+
+# Orden importante: primero lo más específico
+_MASKS = (
+    (_TIMESTAMP, "<TS>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    # Identificadores hexadecimales o numéricos de 8+ caracteres (hashes, IDs de traza)
+    (re.compile(r"\b(?:0x)?(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{8,}\b"), "<HEX>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<N>")
+)
+
+_ALERT_LEVELS = {"FATAL", "CRITICAL", "ERROR", "SEVERE", "WARN", "WARNING"}
+_LEVEL_NAMES = {"WARNING": "WARN", "SEVERE": "ERROR", "CRITICAL": "FATAL"}
+
+
+@dataclass
+class LogTemplate:
+    """Apariciones de una plantilla de línea"""
+    template: str
+    level: Optional[str]
+    count: int = 0
+    first_line: int = 0
+    first_timestamp: Optional[str] = None
+    last_timestamp: Optional[str] = None
+
+
+@dataclass
+class LogExcerpt:
+    """Primera línea ERROR/WARN de una plantilla con su contexto"""
+    template: LogTemplate
+    line_number: int
+    before: List[str]
+    line: str
+    after: List[str] = field(default_factory=list)
+
+
+@dataclass
+class LogStats:
+    """Resultado de resumir un log"""
+    lines: int = 0
+    templates: int = 0
+    overflow_lines: int = 0
+    levels: Dict[str, int] = field(default_factory=dict)
+    first_timestamp: Optional[str] = None
+    last_timestamp: Optional[str] = None
+    truncated: bool = False
+
+
+def mask_line(line: str) -> str:
+    """
+    Convierte una línea de log en su plantilla
+    
+    Args:
+        line: Línea original
+    
+    Returns:
+        Línea con fechas, UUIDs, IPs, hexadecimales y números enmascarados
+    """
+    for pattern, replacement in _MASKS:
+        line = pattern.sub(replacement, line)
+    return line
+
+
+def line_level(line: str) -> Optional[str]:
+    """Nivel de log de la línea (ERROR, WARN, INFO...) o None"""
+    match = _LEVEL.search(line)
+    if not match:
+        return None
+    level = (match.group(1) or match.group(2)).upper()
+    return _LEVEL_NAMES.get(level, level)
+
+
+def looks_like_log(file_path: str, sample_lines: int = 64, encoding: str = "utf-8") -> bool:
+    """
+    Indica si un archivo de texto parece un log
+    
+    Args:
+        file_path: Ruta al archivo
+        sample_lines: Líneas iniciales examinadas
+        encoding: Codificación del archivo
+    
+    Returns:
+        True si al menos la mitad de las líneas no vacías tienen fecha o nivel
+    """
+    matches = total = 0
+    with open(file_path, "r", encoding=encoding, errors="replace") as f:
+        for line in f:
+            line = line[:MAX_LINE_CHARS].strip()
+            if not line:
+                continue
+            total += 1
+            if _TIMESTAMP.search(line) or _LEVEL.search(line):
+                matches += 1
+            if total >= sample_lines:
+                break
+    return total > 0 and matches * 2 >= total
+
+
+def summarize_log(
+    file_path: str,
+    max_chars: int = 0,
+    context_lines: int = 2,
+    max_templates: int = 5000,
+    max_excerpts: int = 50,
+    top_templates: int = 100,
+    encoding: str = "utf-8"
+) -> Tuple[str, LogStats]:
+    """
+    Resume un log: errores y avisos con contexto y plantillas más frecuentes
+    
+    Args:
+        file_path: Ruta al log
+        max_chars: Máximo de caracteres del resumen (0 = sin límite)
+        context_lines: Líneas de contexto antes y después de cada error/aviso
+        max_templates: Máximo de plantillas distintas en memoria (el resto se cuenta aparte)
+        max_excerpts: Máximo de errores/avisos distintos conservados con contexto
+        top_templates: Plantillas más frecuentes incluidas en el resumen
+        encoding: Codificación del archivo (los bytes inválidos se sustituyen)
+    
+    Returns:
+        Tupla (texto, estadísticas)
+    """
+    stats = LogStats()
+    templates: Dict[str, LogTemplate] = {}
+    excerpts: List[LogExcerpt] = []
+    open_excerpts: List[LogExcerpt] = []
+    recent: Deque[str] = deque(maxlen=context_lines)
+    
+    with open(file_path, "r", encoding=encoding, errors="replace") as f:
+        for raw_line in f:
+            line = raw_line.rstrip("\r\n")[:MAX_LINE_CHARS]
+            stats.lines += 1
+            
+            # Las líneas de contexto posteriores se añaden antes de procesar la actual
+            if open_excerpts:
+                for excerpt in open_excerpts:
+                    excerpt.after.append(line)
+                open_excerpts = [excerpt for excerpt in open_excerpts if len(excerpt.after) < context_lines]
+            
+            if not line.strip():
+                recent.append(line)
+                continue
+            
+            match = _TIMESTAMP.search(line)
+            timestamp = match.group(0) if match else None
+            if timestamp:
+                if stats.first_timestamp is None:
+                    stats.first_timestamp = timestamp
+                stats.last_timestamp = timestamp
+            
+            template_text = mask_line(line)
+            template = templates.get(template_text)
+            if template is None:
+                level = line_level(line)
+                if level:
+                    stats.levels[level] = stats.levels.get(level, 0) + 1
+                if len(templates) >= max_templates:
+                    stats.overflow_lines += 1
+                    recent.append(line)
+                    continue
+                template = LogTemplate(template_text, level, first_line=stats.lines, first_timestamp=timestamp)
+                templates[template_text] = template
+                
+                if level in _ALERT_LEVELS and len(excerpts) < max_excerpts:
+                    excerpt = LogExcerpt(template, stats.lines, list(recent), line)
+                    excerpts.append(excerpt)
+                    if context_lines > 0:
+                        open_excerpts.append(excerpt)
+            elif template.level:
+                stats.levels[template.level] = stats.levels.get(template.level, 0) + 1
+            
+            template.count += 1
+            if timestamp:
+                template.last_timestamp = timestamp
+            recent.append(line)
+    
+    stats.templates = len(templates)
+    budget = TextBudget(max_chars)
+    
+    period = ""
+    if stats.first_timestamp:
+        period = f", desde {stats.first_timestamp} hasta {stats.last_timestamp}"
+    budget.append(f"Líneas: {stats.lines}, plantillas distintas: {stats.templates}{period}")
+    if stats.levels:
+        budget.append("Niveles: " + ", ".join(f"{level} {count}" for level, count in sorted(stats.levels.items())))
+    if stats.overflow_lines:
+        budget.append(f"[... {stats.overflow_lines} líneas fuera del límite de {max_templates} plantillas ...]")
+    
+    if excerpts:
+        budget.append("")
+        budget.append("=== Errores y avisos (primera aparición, con contexto) ===")
+        for excerpt in excerpts:
+            template = excerpt.template
+            budget.append("")
+            if not budget.append(f"--- línea {excerpt.line_number}: {template.count} apariciones{_period(template)} ---"):
+                break
+            for line in excerpt.before:
+                budget.append(f"  {line}")
+            budget.append(f"> {excerpt.line}")
+            for line in excerpt.after:
+                budget.append(f"  {line}")
+            if budget.exhausted:
+                break
+    
+    budget.append("")
+    budget.append("=== Plantillas más frecuentes ===")
+    ranked = sorted(templates.values(), key=lambda item: (-item.count, item.first_line))
+    for template in ranked[:top_templates]:
+        if not budget.append(f"{template.count:>7}x{_period(template)}  {template.template}"):
+            break
+    if len(ranked) > top_templates:
+        budget.append(f"[... {len(ranked) - top_templates} plantillas menos frecuentes omitidas ...]")
+    
+    stats.truncated = budget.truncated
+    return budget.getvalue(), stats
+
+
+def _period(template: LogTemplate) -> str:
+    """Primera y última marca de tiempo de una plantilla"""
+    if not template.first_timestamp:
+        return ""
+    if template.first_timestamp == template.last_timestamp:
+        return f" [{template.first_timestamp}]"
+    return f" [{template.first_timestamp} .. {template.last_timestamp}]"
@@ -1,9 +1,11 @@
 """
 Modelos de datos compartidos
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Iterator
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from .base64_stream import Base64File
 
 
 class DocumentType(str, Enum):
@@ -13,6 +15,7 @@ class DocumentType(str, Enum):
     EXCEL = "excel"
     WORD = "word"
     TEXT = "text"
+    CSV = "csv"
     UNKNOWN = "unknown"
 
 
@@ -25,9 +28,95 @@ class Document(BaseModel):
     base64_content: Optional[str] = None
     mime_type: Optional[str] = None
     size_bytes: int = 0
+    # Archivo cuyo contenido se envía en base64 si no es el original (p. ej. la imagen optimizada)
+    payload_path: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    
+    # Cargadores de campos que se calculan en el primer acceso (p. ej. el texto de un PDF)
+    _loaders: Dict[str, Callable[[], Any]] = PrivateAttr(default_factory=dict)
     
     class Config:
         use_enum_values = True
+    
+    def set_lazy(self, field: str, loader: Callable[[], Any]) -> None:
+        """
+        Difiere el cálculo de un campo hasta que alguien lo lea
+        
+        Args:
+            field: Nombre del campo (debe estar en LAZY_FIELDS)
+            loader: Función sin argumentos que devuelve el valor; para poder
+                enviar el documento a otro proceso debe ser serializable con pickle
+        """
+        if field not in LAZY_FIELDS:
+            raise ValueError(f"El campo {field} no admite carga diferida")
+        self._loaders[field] = loader
+    
+    def is_loaded(self, field: str) -> bool:
+        """True si el campo no tiene una carga diferida pendiente"""
+        return field not in self._loaders
+    
+    def has_base64_content(self) -> bool:
+        """True si el documento tiene contenido base64, sin materializarlo"""
+        if not self.is_loaded("base64_content"):
+            return True
+        return bool(self.base64_content)
+    
+    def base64_size(self) -> int:
+        """Longitud del contenido base64, sin materializarlo si viene de un archivo"""
+        loader = self._loaders.get("base64_content")
+        if isinstance(loader, Base64File):
+            return loader.encoded_size
+        return len(self.base64_content or "")
+    
+    def iter_base64_chunks(self) -> Iterator[bytes]:
+        """
+        Genera el contenido base64 en bloques ASCII
+        
+        Si el base64 procede de un archivo y aún no se ha leído, se codifica
+        por bloques desde disco sin guardar la cadena completa en el documento.
+        
+        Returns:
+            Iterador de bloques base64
+        """
+        loader = self._loaders.get("base64_content")
+        if isinstance(loader, Base64File):
+            yield from loader.iter_chunks()
+        elif self.base64_content:
+            yield self.base64_content.encode("ascii")
+    
+    def __getattribute__(self, name: str) -> Any:
+        if name in LAZY_FIELDS:
+            private = object.__getattribute__(self, "__pydantic_private__")
+            loader = private["_loaders"].pop(name, None) if private else None
+            if loader is not None:
+                self.__dict__[name] = loader()
+        return super().__getattribute__(name)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Una asignación explícita sustituye a la carga diferida pendiente
+        if name in LAZY_FIELDS:
+            self._loaders.pop(name, None)
+        super().__setattr__(name, value)
+    
+    def model_copy(self, **kwargs) -> "Document":
+        copy = super().model_copy(**kwargs)
+        # Cada copia con sus propias cargas pendientes: resolverlas o sustituirlas no afecta al original
+        copy._loaders = dict(self._loaders)
+        return copy
+    
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        for field in list(self._loaders):
+            getattr(self, field)
+        return super().model_dump(**kwargs)
+    
+    def model_dump_json(self, **kwargs) -> str:
+        for field in list(self._loaders):
+            getattr(self, field)
+        return super().model_dump_json(**kwargs)
+
+
+# Campos de Document que admiten carga diferida con set_lazy()
+LAZY_FIELDS = frozenset({"content", "base64_content"})
 
 
 class QueryRequest(BaseModel):
@@ -78,4 +167,8 @@ class BedrockConfig(BaseModel):
     )
     max_tokens: int = Field(default=4096, description="Máximo de tokens")
     temperature: float = Field(default=0.7, description="Temperatura")
+    max_input_tokens: int = Field(
+        default=0,
+        description="Máximo de tokens de entrada (0 = ventana de contexto menos max_tokens)"
+    )
     profile_name: Optional[str] = Field(default=None, description="Perfil de AWS")
@@ -0,0 +1,197 @@
+"""
+Enrutado de PDFs según su capa de texto
+
+Enviar un PDF como bloque "document" hace que Claude procese cada página
+como imagen además de su texto (~1.500 tokens por página). Para PDFs con
+capa de texto completa basta con enviar el texto extraído; si solo algunas
+páginas son visuales (escaneos, diagramas) se envía el texto y un sub-PDF
+con esas páginas. El análisis usa pypdfium2 (dependencia de pdfplumber) y
+solo cuenta caracteres y área de imágenes, sin extraer texto.
+"""
+import hashlib
+import math
+import os
+import tempfile
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .document_cache import hash_file
+
+# Coste aproximado de una página de PDF enviada como documento (imagen de la página)
+PDF_PAGE_IMAGE_TOKENS = 1534
+CHARS_PER_TOKEN = 4
+
+# Una página es "de texto" si tiene suficientes caracteres y pocas imágenes
+MIN_CHARS_PER_TEXT_PAGE = 200
+MAX_IMAGE_COVERAGE_TEXT_PAGE = 0.3
+
+# Por encima de esta fracción de páginas visuales se envía el PDF completo
+MAX_VISUAL_FRACTION_MIXED = 0.5
+
+ROUTE_TEXT = "text"
+ROUTE_MIXED = "mixed"
+ROUTE_DOCUMENT = "document"
+
+
+@dataclass
+class PageAnalysis:
+    """Capa de texto e imágenes de una página"""
+    index: int
+    chars: int
+    image_coverage: float
+    
+    @property
+    def is_text(self) -> bool:
+        return self.chars >= MIN_CHARS_PER_TEXT_PAGE and self.image_coverage <= MAX_IMAGE_COVERAGE_TEXT_PAGE
+
+
+@dataclass
+class PdfRoute:
+    """Decisión de envío de un PDF y su coste estimado"""
+    route: str
+    total_pages: int
+    text_pages: List[int] = field(default_factory=list)
+    visual_pages: List[int] = field(default_factory=list)
+    text_chars: int = 0
+    tokens_document: int = 0
+    tokens_routed: int = 0
+    reason: str = ""
+    
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_document - self.tokens_routed
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["tokens_saved"] = self.tokens_saved
+        return data
+
+
+def analyze_pdf_pages(file_path: str, max_pages: int = 0) -> Tuple[int, List[PageAnalysis]]:
+    """
+    Mide caracteres y cobertura de imágenes de cada página
+    
+    Args:
+        file_path: Ruta al PDF
+        max_pages: Máximo de páginas a analizar (0 = todas)
+    
+    Returns:
+        Tupla (páginas totales, análisis de las páginas leídas en orden)
+    """
+    import pypdfium2
+    import pypdfium2.raw as pdfium_c
+    
+    pdf = pypdfium2.PdfDocument(file_path)
+    try:
+        total_pages = len(pdf)
+        pages = []
+        for index in range(total_pages if max_pages <= 0 else min(total_pages, max_pages)):
+            page = pdf[index]
+            width, height = page.get_size()
+            textpage = page.get_textpage()
+            chars = textpage.count_chars()
+            textpage.close()
+            
+            image_area = 0.0
+            for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE], max_depth=2):
+                # get_pos() en pypdfium2 4.x, get_bounds() en 5.x
+                left, bottom, right, top = obj.get_bounds() if hasattr(obj, "get_bounds") else obj.get_pos()
+                image_area += max(0.0, right - left) * max(0.0, top - bottom)
+            page.close()
+            
+            coverage = min(1.0, image_area / (width * height)) if width and height else 0.0
+            pages.append(PageAnalysis(index=index, chars=chars, image_coverage=round(coverage, 3)))
+        return total_pages, pages
+    finally:
+        pdf.close()
+
+
+def plan_pdf_route(pages: List[PageAnalysis], total_pages: int, max_chars: int = 0) -> PdfRoute:
+    """
+    Decide cómo enviar un PDF a partir del análisis de sus páginas
+    
+    Args:
+        pages: Análisis por página (puede cubrir solo las primeras páginas)
+        total_pages: Páginas totales del PDF
+        max_chars: Límite de caracteres del texto extraído (0 = sin límite)
+    
+    Returns:
+        Ruta elegida con el ahorro estimado de tokens
+    """
+    text_pages = [page.index for page in pages if page.is_text]
+    visual_pages = [page.index for page in pages if not page.is_text]
+    text_chars = sum(page.chars for page in pages)
+    text_tokens = math.ceil(text_chars / CHARS_PER_TOKEN)
+    tokens_document = text_tokens + total_pages * PDF_PAGE_IMAGE_TOKENS
+    
+    route = PdfRoute(
+        route=ROUTE_DOCUMENT,
+        total_pages=total_pages,
+        text_pages=text_pages,
+        visual_pages=visual_pages,
+        text_chars=text_chars,
+        tokens_document=tokens_document,
+        tokens_routed=tokens_document
+    )
+    
+    # El texto solo sustituye al PDF si se puede extraer completo
+    if len(pages) < total_pages:
+        route.reason = "páginas sin analizar por el límite de páginas"
+    elif max_chars > 0 and text_chars > max_chars:
+        route.reason = "el texto supera el límite de caracteres"
+    elif not text_pages:
+        route.reason = "sin capa de texto"
+    elif not visual_pages:
+        route.route = ROUTE_TEXT
+        route.tokens_routed = text_tokens
+        route.reason = "todas las páginas tienen capa de texto"
+    elif len(visual_pages) / total_pages <= MAX_VISUAL_FRACTION_MIXED:
+        route.route = ROUTE_MIXED
+        route.tokens_routed = text_tokens + len(visual_pages) * PDF_PAGE_IMAGE_TOKENS
+        route.reason = f"{len(visual_pages)} de {total_pages} páginas son visuales"
+    else:
+        route.reason = "la mayoría de páginas son visuales"
+    
+    return route
+
+
+def write_sub_pdf(file_path: str, page_indices: List[int], output_dir: Optional[Path] = None) -> str:
+    """
+    Crea un PDF con un subconjunto de páginas
+    
+    El nombre incluye el hash del original y las páginas, así que se reutiliza
+    si ya existe.
+    
+    Args:
+        file_path: PDF original
+        page_indices: Páginas a conservar (base 0)
+        output_dir: Directorio de salida (por defecto el temporal)
+    
+    Returns:
+        Ruta del sub-PDF
+    """
+    import pypdfium2
+    
+    output_dir = Path(output_dir) if output_dir else Path(tempfile.gettempdir()) / "consulta-rag" / "pdf"
+    pages_hash = hashlib.blake2b(repr(page_indices).encode("ascii"), digest_size=8).hexdigest()
+    output_path = output_dir / f"{hash_file(file_path)}-{pages_hash}.pdf"
+    
+    if output_path.exists():
+        os.utime(output_path)
+        return str(output_path)
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    source = pypdfium2.PdfDocument(file_path)
+    subset = pypdfium2.PdfDocument.new()
+    try:
+        subset.import_pages(source, page_indices)
+        fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            subset.save(f)
+        os.replace(tmp_path, output_path)
+    finally:
+        subset.close()
+        source.close()
+    
+    return str(output_path)
@@ -0,0 +1,189 @@
+"""
+Extracción de texto de PDFs por rangos de páginas
+
+El texto de un PDF solo se usa como referencia (el PDF se envía a Claude en
+base64), así que la extracción está acotada por páginas y caracteres y puede
+repartirse entre procesos por rangos de páginas.
+"""
+import logging
+from typing import List, Tuple
+
+from .text_budget import TextBudget
+
+logger = logging.getLogger(__name__)
+
+PDF_BACKENDS = ("pdfplumber", "pypdfium2")
+
+# Por debajo de este número de páginas el arranque del pool cuesta más que la extracción
+MIN_PAGES_FOR_PARALLEL = 16
+
+
+def count_pdf_pages(file_path: str, backend: str = "pdfplumber") -> int:
+    """
+    Cuenta las páginas de un PDF
+    
+    Args:
+        file_path: Ruta al PDF
+        backend: Librería a usar (pdfplumber o pypdfium2)
+    
+    Returns:
+        Número de páginas
+    """
+    if backend == "pypdfium2":
+        import pypdfium2
+        
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    
+    import pdfplumber
+    
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_range(file_path: str, start: int, end: int, backend: str = "pdfplumber") -> List[str]:
+    """
+    Extrae el texto de las páginas [start, end) de un PDF
+    
+    Se ejecuta en los procesos del pool, por eso abre el PDF por su cuenta.
+    
+    Args:
+        file_path: Ruta al PDF
+        start: Primera página (base 0)
+        end: Página final (excluida)
+        backend: Librería a usar (pdfplumber o pypdfium2)
+    
+    Returns:
+        Texto de cada página en orden (cadena vacía si no tiene capa de texto)
+    """
+    texts = []
+    
+    if backend == "pypdfium2":
+        import pypdfium2
+        
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            for index in range(start, end):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
+        return texts
+    
+    import pdfplumber
+    
+    with pdfplumber.open(file_path) as pdf:
+        for index in range(start, end):
+            page = pdf.pages[index]
+            texts.append(page.extract_text() or "")
+            page.close()
+    return texts
+
+
+def split_page_ranges(total_pages: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Divide las páginas en rangos contiguos de tamaño similar
+    
+    Args:
+        total_pages: Número de páginas a repartir
+        parts: Número máximo de rangos
+    
+    Returns:
+        Lista de rangos (inicio, fin) con fin excluido
+    """
+    parts = max(1, min(parts, total_pages))
+    size, remainder = divmod(total_pages, parts)
+    ranges = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < remainder else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def extract_pdf_text(
+    file_path: str,
+    backend: str = "pdfplumber",
+    max_pages: int = 0,
+    max_chars: int = 0,
+    workers: int = 1
+) -> str:
+    """
+    Extrae el texto de un PDF respetando los límites de páginas y caracteres
+    
+    Args:
+        file_path: Ruta al PDF
+        backend: Librería a usar (pdfplumber o pypdfium2)
+        max_pages: Máximo de páginas leídas (0 = todas)
+        max_chars: Máximo de caracteres extraídos (0 = sin límite)
+        workers: Procesos para extraer rangos de páginas en paralelo
+    
+    Returns:
+        Texto del PDF con las páginas separadas por líneas en blanco
+    """
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Backend de PDF no soportado: {backend}. Disponibles: {', '.join(PDF_BACKENDS)}")
+    
+    total_pages = count_pdf_pages(file_path, backend)
+    pages_to_read = min(total_pages, max_pages) if max_pages > 0 else total_pages
+    budget = TextBudget(max_chars)
+    
+    for text in _iter_page_texts(file_path, backend, pages_to_read, workers):
+        if text and not budget.append(text + "\n"):
+            break
+    
+    notes = []
+    if pages_to_read < total_pages:
+        notes.append(f"[... texto limitado a las primeras {pages_to_read} de {total_pages} páginas ...]")
+    if budget.truncated:
+        notes.append(f"[... texto truncado a {max_chars} caracteres ...]")
+    
+    logger.info(
+        f"Texto de PDF extraído ({backend}): {pages_to_read}/{total_pages} páginas, {budget.size} caracteres"
+    )
+    
+    text = budget.getvalue()
+    if notes:
+        text += "\n\n" + "\n".join(notes)
+    return text
+
+
+def _iter_page_texts(file_path: str, backend: str, pages: int, workers: int):
+    """Genera el texto de cada página en orden, en paralelo si compensa"""
+    if workers <= 1 or pages < MIN_PAGES_FOR_PARALLEL:
+        for start, end in split_page_ranges(pages, max(1, pages // 8)):
+            yield from extract_page_range(file_path, start, end, backend)
+        return
+    
+    # multiprocessing solo se importa cuando hace falta (cold start)
+    from concurrent.futures import ProcessPoolExecutor
+    
+    executor = None
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [
+            executor.submit(extract_page_range, file_path, start, end, backend)
+            for start, end in split_page_ranges(pages, workers * 2)
+        ]
+    except (OSError, NotImplementedError) as e:
+        # Entornos sin soporte de multiprocessing (p. ej. Lambda sin /dev/shm)
+        logger.warning(f"Extracción paralela no disponible, se usa un solo proceso: {str(e)}")
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        yield from _iter_page_texts(file_path, backend, pages, 1)
+        return
+    
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Si el consumidor agota el presupuesto, los rangos pendientes se descartan
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,102 @@
+"""
+Construcción del cuerpo JSON de InvokeModel sin copias de los adjuntos
+
+El esqueleto del mensaje (prompt, textos, metadatos) se serializa con json
+como siempre, pero el base64 de PDFs e imágenes se sustituye por marcadores.
+Después se reserva un único bytearray del tamaño exacto del cuerpo y los
+adjuntos se vuelcan por bloques directamente desde disco (o desde la cadena
+ya cargada), sin crear la cadena base64 completa ni copiarla al serializar.
+"""
+import json
+import re
+import secrets
+from typing import Any, Dict, List
+
+from .models import Document
+
+
+class RequestBodyBuilder:
+    """
+    Serializa un cuerpo de petición con adjuntos base64 en un solo buffer
+    
+    Uso:
+        builder = RequestBodyBuilder()
+        source = {"type": "base64", "media_type": "application/pdf", "data": builder.payload(doc)}
+        ...
+        body = builder.build({"messages": messages, ...})
+    """
+    
+    def __init__(self):
+        # El sufijo aleatorio evita colisiones con texto del usuario
+        self._token = secrets.token_hex(8)
+        self._documents: List[Document] = []
+    
+    def payload(self, document: Document) -> str:
+        """
+        Reserva un marcador para el base64 de un documento
+        
+        Args:
+            document: Documento con contenido base64 (cargado o diferido)
+        
+        Returns:
+            Marcador a usar como valor del campo "data"
+        """
+        self._documents.append(document)
+        return f"@@payload:{len(self._documents) - 1}:{self._token}@@"
+    
+    @property
+    def payload_bytes(self) -> int:
+        """Bytes de base64 que se volcarán en el cuerpo"""
+        return sum(document.base64_size() for document in self._documents)
+    
+    def build(self, body: Dict[str, Any]) -> bytearray:
+        """
+        Serializa el cuerpo sustituyendo los marcadores por el base64
+        
+        Args:
+            body: Cuerpo de la petición con los marcadores de payload()
+        
+        Returns:
+            Cuerpo JSON en UTF-8, listo para pasar a boto3
+        
+        Raises:
+            ValueError: Si un adjunto cambia de tamaño durante la construcción
+        """
+        skeleton = json.dumps(body).encode("utf-8")
+        marker = re.compile(rb'"@@payload:(\d+):' + self._token.encode("ascii") + rb'@@"')
+        parts = marker.split(skeleton)
+        
+        # parts alterna fragmentos JSON e índices de documento: [json, idx, json, idx, json]
+        fragments = parts[0::2]
+        documents = [self._documents[int(index)] for index in parts[1::2]]
+        
+        total = sum(len(fragment) for fragment in fragments)
+        total += sum(document.base64_size() + 2 for document in documents)
+        
+        buffer = bytearray(total)
+        view = memoryview(buffer)
+        position = 0
+        
+        def write(data: bytes) -> None:
+            nonlocal position
+            end = position + len(data)
+            if end > total:
+                raise ValueError("El contenido de un adjunto ha cambiado durante la construcción de la petición")
+            view[position:end] = data
+            position = end
+        
+        try:
+            for fragment, document in zip(fragments, documents):
+                write(fragment)
+                write(b'"')
+                for chunk in document.iter_base64_chunks():
+                    write(chunk)
+                write(b'"')
+            write(fragments[-1])
+        finally:
+            view.release()
+        
+        if position != total:
+            raise ValueError("El contenido de un adjunto ha cambiado durante la construcción de la petición")
+        
+        return buffer
@@ -0,0 +1,144 @@
+"""
+Lectura de respuestas en streaming de InvokeModelWithResponseStream
+
+ModelStream recorre los eventos de Claude (message_start,
+content_block_delta, message_delta, message_stop) y entrega los
+fragmentos de texto en cuanto llegan. Al agotarse deja en .response la
+misma QueryResponse que devolvería invoke_model, con los tokens reales y
+la latencia hasta el primer token.
+"""
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from .models import QueryResponse
+
+
+class ModelStream:
+    """
+    Iterador de fragmentos de texto de una respuesta en streaming
+    
+    Uso:
+        with client.invoke_model_stream(request) as stream:
+            for text in stream:
+                print(text, end="")
+        stream.response.output_tokens
+    
+    Un stream que no se consume hasta el final debe cerrarse (close() o
+    with) para liberar la conexión y la reserva del control de admisión.
+    """
+    
+    def __init__(
+        self,
+        events: Iterable[Dict[str, Any]],
+        model_id: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        started_at: Optional[float] = None,
+        on_finish: Optional[Callable[[Optional[QueryResponse]], None]] = None
+    ):
+        """
+        Inicializa el iterador
+        
+        Args:
+            events: Eventos del body de invoke_model_with_response_stream
+            model_id: ID del modelo invocado
+            metadata: Metadatos que se copian a la respuesta final
+            started_at: Instante (perf_counter) en que se envió la petición
+            on_finish: Se llama una sola vez con la respuesta (None si hubo error
+                o no se completó) al agotar o cerrar el stream
+        """
+        self._events = events
+        self.model_id = model_id
+        self.metadata = dict(metadata or {})
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.first_token_ms: Optional[float] = None
+        self.response: Optional[QueryResponse] = None
+        self._parts = []
+        self._input_tokens = 0
+        self._output_tokens = 0
+        self._stop_reason = None
+        self._on_finish = on_finish
+        self._finished = False
+    
+    def __iter__(self) -> Iterator[str]:
+        try:
+            yield from self._read_events()
+        finally:
+            self._finish()
+    
+    def __enter__(self) -> "ModelStream":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Cierra la conexión del stream (si no se ha agotado) y llama a on_finish"""
+        if self._finished:
+            return
+        close = getattr(self._events, "close", None)
+        if close is not None:
+            close()
+        self._finish()
+    
+    def _finish(self) -> None:
+        if self._finished:
+            return
+        self._finished = True
+        if self._on_finish is not None:
+            self._on_finish(self.response)
+    
+    def _read_events(self) -> Iterator[str]:
+        for event in self._events:
+            chunk = event.get("chunk")
+            if not chunk:
+                # Los errores a mitad de stream llegan como eventos (throttlingException, modelStreamErrorException...)
+                for name, error in event.items():
+                    if name.endswith("Exception"):
+                        raise Exception(f"Error en el streaming de Bedrock ({name}): {error.get('message', error)}")
+                continue
+            data = json.loads(chunk["bytes"])
+            event_type = data.get("type")
+            
+            if event_type == "message_start":
+                message = data.get("message", {})
+                self.metadata.setdefault("model", message.get("model"))
+                self.metadata.setdefault("role", message.get("role"))
+                self._input_tokens = message.get("usage", {}).get("input_tokens", 0)
+            elif event_type == "content_block_delta":
+                text = data.get("delta", {}).get("text")
+                if text:
+                    if self.first_token_ms is None:
+                        self.first_token_ms = (time.perf_counter() - self.started_at) * 1000
+                    self._parts.append(text)
+                    yield text
+            elif event_type == "message_delta":
+                self._stop_reason = data.get("delta", {}).get("stop_reason", self._stop_reason)
+                self._output_tokens = data.get("usage", {}).get("output_tokens", self._output_tokens)
+            elif event_type == "message_stop":
+                metrics = data.get("amazon-bedrock-invocationMetrics", {})
+                self._input_tokens = metrics.get("inputTokenCount", self._input_tokens)
+                self._output_tokens = metrics.get("outputTokenCount", self._output_tokens)
+        
+        if self.first_token_ms is not None:
+            self.metadata["first_token_ms"] = round(self.first_token_ms)
+        self.metadata["total_ms"] = round((time.perf_counter() - self.started_at) * 1000)
+        self.response = QueryResponse(
+            response="".join(self._parts),
+            model_id=self.model_id,
+            input_tokens=self._input_tokens,
+            output_tokens=self._output_tokens,
+            stop_reason=self._stop_reason,
+            metadata=self.metadata
+        )
+    
+    def collect(self) -> QueryResponse:
+        """
+        Consume el stream completo
+        
+        Returns:
+            Respuesta final
+        """
+        for _ in self:
+            pass
+        return self.response
@@ -0,0 +1,76 @@
+"""
+Acumulador de texto con límite de caracteres para la extracción de documentos
+"""
+from typing import List
+
+
+class TextBudget:
+    """
+    Acumula líneas de texto hasta un máximo de caracteres
+    
+    Los extractores escriben línea a línea y dejan de leer el documento en
+    cuanto append() devuelve False, de modo que el coste queda acotado por el
+    presupuesto y no por el tamaño del fichero.
+    """
+    
+    def __init__(self, max_chars: int):
+        """
+        Inicializa el acumulador
+        
+        Args:
+            max_chars: Máximo de caracteres a conservar (0 o negativo = sin límite)
+        """
+        self.max_chars = max_chars
+        self.truncated = False
+        self._parts: List[str] = []
+        self._size = 0
+    
+    @property
+    def size(self) -> int:
+        """Caracteres acumulados"""
+        return self._size
+    
+    @property
+    def exhausted(self) -> bool:
+        """True si ya no cabe más texto"""
+        return self.truncated or (self.max_chars > 0 and self._size >= self.max_chars)
+    
+    def append(self, line: str) -> bool:
+        """
+        Añade una línea (se le agrega el salto de línea)
+        
+        Si la línea no cabe completa se recorta y el acumulador queda agotado.
+        
+        Args:
+            line: Texto a añadir
+        
+        Returns:
+            False si se ha alcanzado el límite y el llamante debe dejar de leer
+        """
+        if self.exhausted:
+            self.truncated = True
+            return False
+        
+        text = line + "\n"
+        if self.max_chars > 0 and self._size + len(text) > self.max_chars:
+            text = text[:self.max_chars - self._size]
+            self.truncated = True
+        
+        self._parts.append(text)
+        self._size += len(text)
+        return not self.truncated
+    
+    def getvalue(self, truncation_note: str = "") -> str:
+        """
+        Devuelve el texto acumulado
+        
+        Args:
+            truncation_note: Aviso que se agrega al final si hubo truncado
+        
+        Returns:
+            Texto acumulado
+        """
+        text = "".join(self._parts).rstrip("\n")
+        if self.truncated and truncation_note:
+            text += f"\n\n{truncation_note}"
+        return text
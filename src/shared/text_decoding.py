@@ -0,0 +1,122 @@
+"""
+Detección de codificación y lectura incremental de archivos de texto
+
+La codificación se decide con un prefijo acotado del archivo (BOM, UTF-8
+válido o charset_normalizer) y después el archivo se decodifica por bloques
+con un decodificador incremental, de modo que un log grande en cp1252 se
+lee una sola vez y la lectura se detiene al agotar el presupuesto de
+caracteres.
+"""
+import codecs
+import io
+from dataclasses import dataclass
+from typing import List, Tuple
+
+SNIFF_BYTES = 64 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+
+# Codificaciones habituales en adjuntos en español/inglés. charset_normalizer
+# elige a veces una página de códigos centroeuropea o de Mac para texto
+# repetitivo en cp1252, así que se prueban primero estas.
+PREFERRED_ENCODINGS = ["cp1252", "iso8859_15", "latin_1", "cp850", "mac_roman"]
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16")
+)
+
+
+@dataclass
+class TextReadStats:
+    """Resultado de leer un archivo de texto"""
+    encoding: str
+    chars: int = 0
+    bytes_read: int = 0
+    truncated: bool = False
+
+
+def detect_encoding(head: bytes) -> str:
+    """
+    Detecta la codificación a partir de los primeros bytes
+    
+    Args:
+        head: Prefijo del archivo (puede cortar un carácter multibyte al final)
+    
+    Returns:
+        Nombre de codificación de Python (utf-8 si no se puede decidir)
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    
+    from charset_normalizer import from_bytes
+    
+    best = from_bytes(head, cp_isolation=PREFERRED_ENCODINGS).best() or from_bytes(head).best()
+    # Sin candidato, latin-1 decodifica cualquier byte
+    return best.encoding if best is not None else "latin-1"
+
+
+def detect_file_encoding(file_path: str) -> str:
+    """
+    Detecta la codificación de un archivo leyendo solo su prefijo
+    
+    Args:
+        file_path: Ruta al archivo
+    
+    Returns:
+        Nombre de codificación de Python
+    """
+    with open(file_path, "rb") as f:
+        return detect_encoding(f.read(SNIFF_BYTES))
+
+
+def read_text(file_path: str, encoding: str = "", max_chars: int = 0) -> Tuple[str, TextReadStats]:
+    """
+    Lee un archivo de texto por bloques hasta un máximo de caracteres
+    
+    Los bytes inválidos en la codificación detectada se sustituyen en lugar
+    de provocar una segunda lectura con otra codificación.
+    
+    Args:
+        file_path: Ruta al archivo
+        encoding: Codificación (vacío = detectarla con el prefijo)
+        max_chars: Máximo de caracteres leídos (0 = sin límite)
+    
+    Returns:
+        Tupla (texto, estadísticas)
+    """
+    parts: List[str] = []
+    size = 0
+    
+    with open(file_path, "rb") as f:
+        chunk = f.read(READ_CHUNK_BYTES)
+        stats = TextReadStats(encoding=encoding or detect_encoding(chunk[:SNIFF_BYTES]))
+        # Saltos de línea universales, como open() en modo texto
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder(stats.encoding)(errors="replace"),
+            translate=True
+        )
+        
+        while True:
+            stats.bytes_read += len(chunk)
+            text = decoder.decode(chunk, final=not chunk)
+            if max_chars > 0 and size + len(text) > max_chars:
+                text = text[:max_chars - size]
+                stats.truncated = True
+            parts.append(text)
+            size += len(text)
+            if stats.truncated or not chunk:
+                break
+            chunk = f.read(READ_CHUNK_BYTES)
+    
+    stats.chars = size
+    return "".join(parts), stats
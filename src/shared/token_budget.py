@@ -0,0 +1,308 @@
+"""
+Estimación local de tokens de entrada y ajuste de la consulta a un presupuesto
+
+Antes de construir el body se estima cuántos tokens de entrada costará la
+consulta: el texto por caracteres, las imágenes por sus dimensiones y los
+PDFs por páginas (o por la decisión de enrutado ya calculada). Si la
+estimación supera el máximo configurado, los PDFs con capa de texto pasan a
+enviarse solo como texto y después se recortan los textos más largos; si ni
+así cabe, se rechaza la consulta sin subir nada a Bedrock.
+"""
+import math
+import os
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional
+
+from .image_optimizer import CLAUDE_MAX_EDGE, estimate_image_tokens
+from .models import Document, DocumentType, QueryRequest
+from .pdf_routing import CHARS_PER_TOKEN, PDF_PAGE_IMAGE_TOKENS, ROUTE_MIXED
+
+# Ventana de contexto de los modelos Claude en Bedrock
+CLAUDE_CONTEXT_TOKENS = 200_000
+
+# Tokens fijos por mensaje y por bloque de contenido (rol, delimitadores)
+MESSAGE_OVERHEAD_TOKENS = 10
+BLOCK_OVERHEAD_TOKENS = 5
+
+# Tamaño medio por página para estimar PDFs sin analizar que solo llegan en base64
+BYTES_PER_PDF_PAGE = 60 * 1024
+
+TRIM_NOTE = "[... recortado para ajustarse al presupuesto de tokens ...]"
+
+
+@dataclass
+class DocumentEstimate:
+    """Tokens estimados de un documento"""
+    file_name: str
+    document_type: str
+    tokens: int
+    text_tokens: int = 0
+    method: str = ""
+
+
+@dataclass
+class TokenEstimate:
+    """Tokens de entrada estimados de una consulta"""
+    prompt_tokens: int
+    documents: List[DocumentEstimate] = field(default_factory=list)
+    overhead_tokens: int = MESSAGE_OVERHEAD_TOKENS
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.overhead_tokens + sum(doc.tokens for doc in self.documents)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["total_tokens"] = self.total_tokens
+        return data
+
+
+@dataclass
+class BudgetPlan:
+    """Consulta ajustada al presupuesto y cambios aplicados"""
+    request: QueryRequest
+    estimate: TokenEstimate
+    original_tokens: int
+    max_input_tokens: int
+    actions: List[str] = field(default_factory=list)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "estimated_input_tokens": self.estimate.total_tokens,
+            "original_estimated_tokens": self.original_tokens,
+            "max_input_tokens": self.max_input_tokens,
+            "actions": self.actions
+        }
+
+
+def estimate_text_tokens(text: Optional[str]) -> int:
+    """
+    Estima los tokens de un texto
+    
+    Args:
+        text: Texto (None = vacío)
+    
+    Returns:
+        Tokens estimados
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def text_block_header(document: Document) -> str:
+    """Cabecera con la que los clientes envían el texto de un documento"""
+    if document.document_type == DocumentType.PDF and document.has_base64_content():
+        return f"=== Texto de {document.file_name} ===\n\n"
+    return f"=== Contenido de {document.file_name} ===\n\n"
+
+
+def sends_text(document: Document) -> bool:
+    """True si el cliente enviará document.content como bloque de texto"""
+    if document.document_type == DocumentType.PDF and document.has_base64_content():
+        return document.metadata.get("pdf_routing", {}).get("route") == ROUTE_MIXED
+    if document.document_type == DocumentType.IMAGE and document.has_base64_content():
+        return False
+    return True
+
+
+def estimate_document_tokens(document: Document) -> DocumentEstimate:
+    """
+    Estima los tokens de un documento tal como lo enviarán los clientes
+    
+    El texto de un PDF solo se lee (y se extrae, si era diferido) cuando se
+    va a enviar.
+    
+    Args:
+        document: Documento procesado
+    
+    Returns:
+        Estimación del documento
+    """
+    estimate = DocumentEstimate(document.file_name, str(document.document_type), 0)
+    
+    if sends_text(document) and document.content:
+        estimate.text_tokens = estimate_text_tokens(text_block_header(document) + document.content) + BLOCK_OVERHEAD_TOKENS
+    
+    if document.document_type == DocumentType.IMAGE and document.has_base64_content():
+        estimate.tokens = _estimate_image(document, estimate) + BLOCK_OVERHEAD_TOKENS
+    elif document.document_type == DocumentType.PDF and document.has_base64_content():
+        estimate.tokens = _estimate_pdf(document, estimate) + BLOCK_OVERHEAD_TOKENS
+    else:
+        estimate.method = "texto"
+    
+    estimate.tokens += estimate.text_tokens
+    return estimate
+
+
+def _estimate_image(document: Document, estimate: DocumentEstimate) -> int:
+    """Tokens de una imagen por sus dimensiones (las optimizadas si existen)"""
+    optimization = document.metadata.get("image_optimization")
+    if optimization:
+        estimate.method = "dimensiones"
+        return estimate_image_tokens(*optimization["optimized_size"])
+    
+    if document.file_path and os.path.exists(document.file_path):
+        try:
+            from PIL import Image
+            
+            # Image.open solo lee la cabecera
+            with Image.open(document.file_path) as img:
+                estimate.method = "dimensiones"
+                return estimate_image_tokens(*img.size)
+        except Exception:
+            pass
+    
+    # Sin dimensiones: el máximo que Claude procesa por imagen
+    estimate.method = "máximo"
+    return estimate_image_tokens(CLAUDE_MAX_EDGE, CLAUDE_MAX_EDGE)
+
+
+def _estimate_pdf(document: Document, estimate: DocumentEstimate) -> int:
+    """Tokens de la parte de un PDF enviada como documento (sin el texto aparte)"""
+    routing = document.metadata.get("pdf_routing")
+    if routing:
+        estimate.method = "enrutado"
+        if routing["route"] == ROUTE_MIXED:
+            return len(routing["visual_pages"]) * PDF_PAGE_IMAGE_TOKENS
+        return routing["tokens_document"]
+    
+    if document.file_path and os.path.exists(document.file_path):
+        try:
+            from .pdf_text import count_pdf_pages
+            
+            estimate.method = "páginas"
+            return count_pdf_pages(document.file_path, backend="pypdfium2") * PDF_PAGE_IMAGE_TOKENS
+        except Exception:
+            pass
+    
+    estimate.method = "tamaño"
+    size_bytes = document.size_bytes or document.base64_size() * 3 // 4
+    return max(1, math.ceil(size_bytes / BYTES_PER_PDF_PAGE)) * PDF_PAGE_IMAGE_TOKENS
+
+
+def estimate_request_tokens(request: QueryRequest) -> TokenEstimate:
+    """
+    Estima los tokens de entrada de una consulta
+    
+    Args:
+        request: Consulta con sus documentos
+    
+    Returns:
+        Estimación por documento y total
+    """
+    return TokenEstimate(
+        prompt_tokens=estimate_text_tokens(request.prompt) + BLOCK_OVERHEAD_TOKENS,
+        documents=[estimate_document_tokens(document) for document in request.documents]
+    )
+
+
+def input_token_limit(max_input_tokens: int, max_tokens: int) -> int:
+    """
+    Máximo de tokens de entrada efectivo
+    
+    Args:
+        max_input_tokens: Máximo configurado (0 = ventana de contexto menos la salida)
+        max_tokens: Máximo de tokens de salida de la consulta
+    
+    Returns:
+        Máximo de tokens de entrada
+    """
+    context_limit = CLAUDE_CONTEXT_TOKENS - max_tokens
+    return min(max_input_tokens, context_limit) if max_input_tokens > 0 else context_limit
+
+
+def fit_request_to_budget(request: QueryRequest, max_input_tokens: int) -> BudgetPlan:
+    """
+    Ajusta una consulta al máximo de tokens de entrada
+    
+    Los documentos modificados son copias: los originales no cambian.
+    
+    Args:
+        request: Consulta original
+        max_input_tokens: Máximo de tokens de entrada
+    
+    Returns:
+        Plan con la consulta (la misma si ya cabe), la estimación final y los cambios
+    
+    Raises:
+        ValueError: Si ni recortando los textos cabe en el presupuesto
+    """
+    estimate = estimate_request_tokens(request)
+    plan = BudgetPlan(request, estimate, estimate.total_tokens, max_input_tokens)
+    if estimate.total_tokens <= max_input_tokens:
+        return plan
+    
+    documents = list(request.documents)
+    excess = estimate.total_tokens - max_input_tokens
+    
+    # 1. PDFs enviados como documento con capa de texto: solo el texto
+    candidates = []
+    for index, document in enumerate(documents):
+        routing = document.metadata.get("pdf_routing")
+        if document.document_type == DocumentType.PDF and document.has_base64_content() and routing and routing["text_pages"]:
+            text_only = document.model_copy(update={"metadata": dict(document.metadata)})
+            text_only.base64_content = None
+            savings = estimate.documents[index].tokens - estimate_document_tokens(text_only).tokens
+            if savings > 0:
+                candidates.append((savings, index, text_only))
+    
+    for savings, index, text_only in sorted(candidates, key=lambda item: -item[0]):
+        if excess <= 0:
+            break
+        documents[index] = text_only
+        excess -= savings
+        plan.actions.append(f"{text_only.file_name}: PDF enviado solo como texto (~{savings} tokens menos)")
+    
+    # 2. Recortar los textos más largos hasta que todo quepa (reparto max-min)
+    estimate = estimate_request_tokens(request.model_copy(update={"documents": documents}))
+    excess = estimate.total_tokens - max_input_tokens
+    if excess > 0:
+        text_tokens = {index: doc.text_tokens for index, doc in enumerate(estimate.documents) if doc.text_tokens}
+        # Margen de un token por documento por el redondeo de caracteres a tokens
+        available = sum(text_tokens.values()) - excess - len(text_tokens)
+        if available < 0:
+            raise ValueError(
+                f"La consulta necesita ~{estimate.total_tokens} tokens de entrada y el máximo es "
+                f"{max_input_tokens}; las imágenes y PDFs no caben aunque se recorten los textos"
+            )
+        
+        cap = _water_level(list(text_tokens.values()), available)
+        for index, tokens in text_tokens.items():
+            if tokens <= cap:
+                continue
+            document = documents[index]
+            overhead_chars = len(text_block_header(document)) + len(TRIM_NOTE) + 2
+            max_chars = max(0, (cap - BLOCK_OVERHEAD_TOKENS) * CHARS_PER_TOKEN - overhead_chars)
+            trimmed = document.model_copy(update={"metadata": dict(document.metadata)})
+            trimmed.content = _trim_text(document.content, max_chars)
+            trimmed.metadata["token_budget_trimmed"] = True
+            documents[index] = trimmed
+            plan.actions.append(f"{document.file_name}: texto recortado de ~{tokens} a ~{cap} tokens")
+    
+    plan.request = request.model_copy(update={"documents": documents})
+    plan.estimate = estimate_request_tokens(plan.request)
+    return plan
+
+
+def _water_level(sizes: List[int], available: int) -> int:
+    """
+    Máximo por documento para que la suma de min(tamaño, máximo) no supere available
+    
+    Los textos cortos se conservan completos y el recorte se reparte entre los largos.
+    """
+    remaining = available
+    pending = sorted(sizes)
+    while pending:
+        share = remaining // len(pending)
+        if pending[0] > share:
+            return share
+        remaining -= pending.pop(0)
+    return max(sizes, default=0)
+
+
+def _trim_text(text: str, max_chars: int) -> str:
+    """Conserva el principio y el final del texto (dos tercios y un tercio)"""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    return f"{text[:head]}\n{TRIM_NOTE}\n{text[len(text) - tail:] if tail else ''}"
@@ -1,13 +1,13 @@
 """
 Utilidades compartidas
 """
-import base64
 import mimetypes
 import os
 from pathlib import Path
 from typing import Optional, Tuple
 import logging
 
+from .base64_stream import encode_file_base64
 from .models import DocumentType
 
 logger = logging.getLogger(__name__)
@@ -30,14 +30,16 @@ def encode_file_to_base64(file_path: str) -> str:
     """
     Codifica un archivo a base64
     
+    Para no materializar la cadena completa, usar Base64File como carga
+    diferida del documento o iter_file_base64 (ver base64_stream).
+    
     Args:
         file_path: Ruta al archivo
         
     Returns:
         Contenido del archivo en base64
     """
-    with open(file_path, "rb") as file:
-        return base64.b64encode(file.read()).decode("utf-8")
+    return encode_file_base64(file_path)
 
 
 def get_mime_type(file_path: str) -> Optional[str]:
@@ -75,7 +77,8 @@ def detect_document_type(file_path: str) -> DocumentType:
         '.webp': DocumentType.IMAGE,
         '.xlsx': DocumentType.EXCEL,
         '.xls': DocumentType.EXCEL,
-        '.csv': DocumentType.EXCEL,
+        '.csv': DocumentType.CSV,
+        '.tsv': DocumentType.CSV,
         '.docx': DocumentType.WORD,
         '.doc': DocumentType.WORD,
         '.txt': DocumentType.TEXT,
@@ -0,0 +1,14 @@
+"""
+Configuración común de las pruebas: importa los paquetes desde la raíz del repositorio
+
+El analizador de incidencias usa imports planos y recibe shared desde su
+capa, así que también se añaden src y src/incident_analyzer (como en los
+benchmarks).
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for path in (ROOT_DIR, ROOT_DIR / "src", ROOT_DIR / "src" / "incident_analyzer"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
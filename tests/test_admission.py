@@ -0,0 +1,117 @@
+"""
+Pruebas del control de admisión con FakeClock (sin esperas reales)
+"""
+import pytest
+
+from src.shared.admission import AdmissionController, AdmissionRejected, FakeClock
+
+
+def test_rpm_limit_queues_until_the_bucket_refills():
+    """Agotado el bucket de peticiones, la siguiente espera a que se reponga una"""
+    clock = FakeClock()
+    controller = AdmissionController(requests_per_minute=60, clock=clock)
+    
+    for _ in range(60):
+        with controller.acquire(tokens=10) as admission:
+            assert admission.waited_ms == 0
+    
+    with controller.acquire(tokens=10) as admission:
+        assert admission.waited_ms == pytest.approx(1000)
+    
+    snapshot = controller.snapshot()
+    assert snapshot["admitted"] == 61
+    assert snapshot["queued"] == 1
+    assert snapshot["in_flight"] == 0
+
+
+def test_rpm_limit_rejects_when_predicted_wait_exceeds_max_wait():
+    """Si la espera prevista supera el máximo se rechaza sin encolar, con Retry-After"""
+    controller = AdmissionController(requests_per_minute=6, max_wait_seconds=5, clock=FakeClock())
+    for _ in range(6):
+        controller.acquire(tokens=10).release()
+    
+    with pytest.raises(AdmissionRejected) as error:
+        controller.acquire(tokens=10)
+    
+    assert error.value.status_code == 429
+    assert error.value.retry_after_seconds == 10
+    assert controller.snapshot()["queued_now"] == 0
+
+
+def test_concurrency_limit_rejects_after_max_wait():
+    """Sin huecos de concurrencia, la petición espera max_wait_seconds y se rechaza"""
+    clock = FakeClock()
+    controller = AdmissionController(max_concurrency=1, max_wait_seconds=5, clock=clock)
+    held = controller.acquire(tokens=10)
+    
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(tokens=10)
+    
+    assert clock.now() == pytest.approx(5)
+    snapshot = controller.snapshot()
+    assert snapshot["rejected"] == 1
+    assert snapshot["queued_now"] == 0
+    assert snapshot["in_flight"] == 1
+    
+    held.release()
+    with controller.acquire(tokens=10, max_wait_seconds=0) as admission:
+        assert admission.waited_ms == 0
+
+
+def test_concurrency_limit_without_wait_rejects_immediately():
+    """Con max_wait_seconds=0 (coberturas) se rechaza sin esperar"""
+    clock = FakeClock()
+    controller = AdmissionController(max_concurrency=1, clock=clock)
+    
+    with controller.acquire(tokens=10):
+        with pytest.raises(AdmissionRejected):
+            controller.acquire(tokens=10, max_wait_seconds=0)
+    
+    assert clock.now() == 0
+
+
+def test_settle_refunds_unused_tokens():
+    """Al conciliar, los tokens estimados y no usados vuelven al bucket"""
+    controller = AdmissionController(tokens_per_minute=1000, clock=FakeClock())
+    
+    with controller.acquire(tokens=600) as admission:
+        assert controller.tokens.available() == pytest.approx(400)
+        admission.settle(100)
+    
+    assert controller.tokens.available() == pytest.approx(900)
+
+
+def test_settle_of_request_larger_than_capacity_charges_actual_usage():
+    """Una estimación mayor que la capacidad se cobra limitada y se concilia contra lo cobrado"""
+    controller = AdmissionController(tokens_per_minute=1000, clock=FakeClock())
+    
+    with controller.acquire(tokens=5000) as admission:
+        assert admission.tokens == 1000
+        assert controller.tokens.available() == pytest.approx(0)
+        admission.settle(1200)
+    
+    # El uso real por encima de lo cobrado deja el saldo en negativo
+    assert controller.tokens.available() == pytest.approx(-200)
+
+
+def test_settle_twice_only_adjusts_once():
+    """settle es idempotente"""
+    controller = AdmissionController(tokens_per_minute=1000, clock=FakeClock())
+    
+    with controller.acquire(tokens=600) as admission:
+        admission.settle(100)
+        admission.settle(100)
+    
+    assert controller.tokens.available() == pytest.approx(900)
+
+
+def test_disabled_controller_keeps_in_flight_balanced():
+    """Sin límites no se espera nunca y el contador de invocaciones en curso no se desajusta"""
+    controller = AdmissionController(clock=FakeClock())
+    
+    with controller.acquire(tokens=10) as admission:
+        assert controller.in_flight == 1
+        admission.settle(5)
+    
+    assert not controller.enabled
+    assert controller.in_flight == 0
@@ -0,0 +1,39 @@
+"""
+Pruebas del desalojo LRU de la caché de documentos
+"""
+import os
+
+from src.shared.document_cache import DocumentCache
+from src.shared.models import Document, DocumentType
+
+
+def _put_with_blob(cache, tmp_path, name, blob_bytes, mtime):
+    """Guarda una entrada con un archivo derivado y fecha ambos en mtime"""
+    source = tmp_path / f"{name}.txt"
+    source.write_text(name)
+    blob = cache.blob_dir / f"{name}.bin"
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    blob.write_bytes(b"x" * blob_bytes)
+    
+    key = cache.key_for(str(source), {})
+    document = Document(file_path=str(source), file_name=source.name, document_type=DocumentType.IMAGE)
+    document.payload_path = str(blob)
+    cache.put(key, document)
+    for path in (cache._entry_path(key), blob):
+        os.utime(path, (mtime, mtime))
+    return key, blob
+
+
+def test_hit_keeps_the_payload_of_a_hot_entry(tmp_path):
+    """Un acierto renueva también el archivo derivado, que no se desaloja antes que su entrada"""
+    cache = DocumentCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    hot_key, hot_blob = _put_with_blob(cache, tmp_path, "hot", 4096, mtime=1_000)
+    _, cold_blob = _put_with_blob(cache, tmp_path, "cold", 4096, mtime=2_000)
+    
+    assert cache.get(hot_key) is not None
+    
+    cache.max_bytes = 6000
+    cache.evict()
+    
+    assert hot_blob.exists()
+    assert not cold_blob.exists()
@@ -0,0 +1,42 @@
+"""
+Pruebas de la detección de formato y la elección de extractor para CSV
+"""
+import pytest
+
+from src.shared.document_processor import default_extractors
+from src.shared.extractors import FORMAT_CSV, FORMAT_TEXT, sniff_format
+from src.shared.models import DocumentType
+
+CSV_CONTENT = "host,cpu,mem\n" + "".join(f"web{i},{i * 3},{i * 7}\n" for i in range(40))
+
+
+@pytest.mark.parametrize("name, content, extractor, file_format", [
+    ("h.csv", CSV_CONTENT, "csv", FORMAT_CSV),
+    ("h.xlsx", CSV_CONTENT, "csv", FORMAT_CSV),
+    ("h.dat", CSV_CONTENT, "csv", FORMAT_CSV),
+    ("h.txt", CSV_CONTENT, "text", FORMAT_CSV),
+    ("one.csv", "a\nb\nc\n", "csv", FORMAT_TEXT),
+    ("notes.txt", "hola mundo\nesto es texto, con comas\nsin estructura\n", "text", FORMAT_TEXT)
+])
+def test_csv_content_is_routed_to_the_csv_extractor(tmp_path, name, content, extractor, file_format):
+    """Un CSV va al extractor csv por contenido, salvo que su extensión sea de texto"""
+    path = tmp_path / name
+    path.write_text(content)
+    
+    chosen, detected = default_extractors().resolve(str(path))
+    
+    assert detected == file_format
+    assert chosen.name == extractor
+
+
+def test_csv_extractor_reports_csv_documents():
+    """Los CSV ya no se presentan como Excel"""
+    csv_extractor = next(item for item in default_extractors().extractors if item.name == "csv")
+    assert csv_extractor.document_type == DocumentType.CSV
+
+
+def test_single_line_is_not_csv(tmp_path):
+    """Con una sola línea no hay con qué comparar el número de campos"""
+    path = tmp_path / "a.txt"
+    path.write_text("uno,dos,tres\n")
+    assert sniff_format(str(path)) == FORMAT_TEXT
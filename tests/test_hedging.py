@@ -0,0 +1,161 @@
+"""
+Pruebas de las coberturas (hedging) con fuentes de eventos falsas
+"""
+import json
+import threading
+
+import pytest
+
+from hedging import Hedger, HedgePolicy
+
+
+def _chunk(data):
+    return {"chunk": {"bytes": json.dumps(data).encode("utf-8")}}
+
+
+def _answer(text="ok", input_tokens=10, output_tokens=2):
+    """Fuente que responde en el acto"""
+    def source(attempt):
+        return iter([
+            _chunk({"type": "message_start", "message": {"model": "m", "usage": {"input_tokens": input_tokens}}}),
+            _chunk({"type": "content_block_delta", "delta": {"text": text}}),
+            _chunk({"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+                "inputTokenCount": input_tokens, "outputTokenCount": output_tokens
+            }})
+        ])
+    return source
+
+
+def _stalled(input_tokens=0, release=None):
+    """Fuente que no envía el primer token hasta que se corta (o hasta release)"""
+    def source(attempt):
+        aborted = threading.Event()
+        attempt.set_abort(aborted.set)
+        
+        def events():
+            if input_tokens:
+                yield _chunk({"type": "message_start", "message": {"usage": {"input_tokens": input_tokens}}})
+            if release is not None:
+                release.wait(5)
+                yield from _answer("tarde")(attempt)
+                return
+            if not aborted.wait(5):
+                raise AssertionError("el intento perdedor no se cortó")
+            raise ConnectionError("stream cortado")
+        return events()
+    return source
+
+
+def _failing(message):
+    def source(attempt):
+        raise RuntimeError(message)
+    return source
+
+
+def _hedger(**policy):
+    policy = dict(dict(enabled=True, initial_delay_ms=50, min_samples=1000, max_hedge_rate=1.0), **policy)
+    return Hedger(HedgePolicy(**policy), max_workers=4)
+
+
+def test_no_hedge_when_the_first_token_arrives_before_the_delay():
+    """Si el principal responde antes del retardo, la cobertura no se lanza"""
+    hedger = _hedger()
+    launched = []
+    
+    body, details = hedger.invoke(_answer("rápido"), "primary", lambda attempt: launched.append(attempt) or [], "hedge")
+    
+    assert details["hedged"] is False
+    assert details["winner"] == "primary"
+    assert body["content"][0]["text"] == "rápido"
+    assert launched == []
+    assert hedger.snapshot()["hedged"] == 0
+
+
+def test_hedge_wins_and_the_stalled_primary_is_cut():
+    """La cobertura gana y el principal, aún sin primer evento, se corta al momento"""
+    hedger = _hedger()
+    
+    body, details = hedger.invoke(_stalled(), "primary", _answer("cobertura"), "hedge")
+    hedger._executor.shutdown(wait=True)
+    
+    assert details["hedged"] is True
+    assert details["winner"] == "hedge"
+    assert details["model_id"] == "hedge"
+    assert body["content"][0]["text"] == "cobertura"
+    assert hedger.snapshot()["hedge_wins"] == 1
+
+
+def test_first_attempt_to_finish_wins_even_if_both_are_done():
+    """Gana el primero en terminar aunque el otro termine antes de que despierte el invocador"""
+    hedger = _hedger()
+    release = threading.Event()
+    
+    def hedge(attempt):
+        # El principal termina justo después de la cobertura
+        def events():
+            yield from _answer("cobertura")(attempt)
+            release.set()
+        return events()
+    
+    body, details = hedger.invoke(_stalled(release=release), "primary", hedge, "hedge")
+    
+    assert details["winner"] == "hedge"
+    assert body["content"][0]["text"] == "cobertura"
+
+
+def test_rate_cap_blocks_the_hedge():
+    """Con el tope alcanzado no se lanza la cobertura y se espera al principal"""
+    hedger = _hedger(max_hedge_rate=0.0)
+    release = threading.Event()
+    threading.Timer(0.2, release.set).start()
+    
+    body, details = hedger.invoke(_stalled(release=release), "primary", _answer("cobertura"), "hedge")
+    
+    assert details["hedged"] is False
+    assert body["content"][0]["text"] == "tarde"
+    snapshot = hedger.snapshot()
+    assert snapshot["rate_capped"] == 1
+    assert snapshot["hedged"] == 0
+
+
+def test_rate_cap_is_not_exceeded_by_concurrent_invocations():
+    """La reserva es atómica: invocaciones concurrentes no superan el tope"""
+    hedger = _hedger(max_hedge_rate=0.1)
+    hedger._hedged.extend([False] * 18)
+    allowed = []
+    barrier = threading.Barrier(8)
+    
+    def reserve():
+        barrier.wait()
+        allowed.append(hedger._allow_hedge())
+    
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # 2 coberturas sobre 20 peticiones es justo el 10 %
+    assert sum(allowed) == 2
+    assert hedger.snapshot()["hedge_rate"] == pytest.approx(0.1)
+    assert hedger.snapshot()["rate_capped"] == 6
+
+
+def test_loser_token_spend_is_accounted():
+    """Los tokens que ya consumió el intento perdedor se contabilizan aparte"""
+    hedger = _hedger()
+    
+    hedger.invoke(_stalled(input_tokens=100), "primary", _answer(input_tokens=10, output_tokens=2), "hedge")
+    hedger._executor.shutdown(wait=True)
+    
+    snapshot = hedger.snapshot()
+    assert snapshot["extra_input_tokens"] == 100
+    assert snapshot["extra_output_tokens"] == 0
+
+
+def test_both_attempts_failing_raise_the_primary_error():
+    """Si fallan los dos intentos se propaga el error del principal"""
+    hedger = _hedger(initial_delay_ms=0)
+    
+    with pytest.raises(RuntimeError, match="principal"):
+        hedger.invoke(_failing("principal"), "primary", _failing("cobertura"), "hedge")
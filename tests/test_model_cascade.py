@@ -0,0 +1,46 @@
+"""
+Pruebas de la cascada de modelos del analizador de incidencias
+"""
+from incident_analyzer import CascadePolicy, IncidentAnalyzer
+from timing import StageTimer
+
+
+def _analyzer(fast_response):
+    """Analizador con cascada cuya invocación al modelo devuelve fast_response"""
+    analyzer = IncidentAnalyzer(
+        knowledge_base_id="kb",
+        s3_bucket="bucket",
+        cascade=CascadePolicy(enabled=True)
+    )
+    analyzer._invoke_claude_analysis = lambda context, priority, model_id=None: fast_response
+    return analyzer
+
+
+def test_unparsable_fast_output_escalates_with_low_confidence():
+    """Sin JSON en la respuesta del modelo rápido, la confianza es 0.0 y se escala"""
+    analyzer = _analyzer({
+        "content": [{"type": "text", "text": "no json"}],
+        "usage": {"input_tokens": 120, "output_tokens": 7}
+    })
+    
+    response, escalation = analyzer._try_fast_analysis("contexto", [], priority=0, timer=StageTimer())
+    
+    assert response is None
+    assert escalation["reason"] == "low_confidence"
+    assert escalation["confidence_score"] == 0.0
+    assert escalation["input_tokens"] == 120
+    assert escalation["output_tokens"] == 7
+
+
+def test_confident_fast_output_is_returned():
+    """Con confianza suficiente responde el modelo rápido"""
+    analyzer = _analyzer({
+        "content": [{"type": "text", "text": '{"diagnosis": "d", "confidence_score": "0.9"}'}],
+        "usage": {"input_tokens": 100, "output_tokens": 20}
+    })
+    
+    response, escalation = analyzer._try_fast_analysis("contexto", [], priority=0, timer=StageTimer())
+    
+    assert escalation is None
+    assert response.confidence_score == 0.9
+    assert response.diagnosis == "d"